@@ -229,6 +229,19 @@ INTERNAL_IPS = "127.0.0.1"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Modules only needed by the ingestion worker, that should not be imported by the web processes
+# (checked by `manage.py profile_imports`). Markdown is not listed because rest_framework imports it when installed.
+WEB_FORBIDDEN_IMPORTS = [
+    "aiohttp",
+    "bs4",
+    "discord_webhook",
+    "pycurl",
+    "scrapfly",
+    "slack_webhook",
+    "spacy",
+    "tweepy",
+]
+
 # Settings for background tasks
 MAX_ATTEMPTS = 60
 MAX_RUN_TIME = 300
@@ -236,6 +249,113 @@ BACKOFF_MULTIPLIER = 2.3
 # Doesn't seem to be working when True
 BACKGROUND_TASK_RUN_ASYNC = False
 
+# Minimum time (in seconds) between runs of the periodic scans of the ingestion tasks
+REDDIT_FOOTBALLHIGHLIGHTS_SCAN_INTERVAL = 60 * 15
+SOFASCORE_FULL_DAY_SCAN_INTERVAL = 60 * 30
+SOFASCORE_FULL_DAY_INVERSE_SCAN_INTERVAL = 60 * 60 * 3
+# A scan is due this many seconds earlier, so that the jitter of the task runs doesn't push it to the next run
+SCHEDULER_DUE_GRACE_SECONDS = 30
+
+# Each run pages the /new listing of a subreddit until the newest post seen by the last complete run
+# (RedditListingCursor), up to REDDIT_LISTING_MAX_PAGES. A full scan (REDDIT_LISTING_FULL_SCAN_PAGES pages) only runs
+# to recover: no mark yet, requested (request_reddit_full_scan), a gap left by the last run, or no complete run in
+# REDDIT_LISTING_RECOVERY_GAP_SECONDS (downtime)
+REDDIT_LISTING_MAX_PAGES = 5
+REDDIT_LISTING_FULL_SCAN_PAGES = 10
+REDDIT_LISTING_RECOVERY_GAP_SECONDS = 60 * 30
+# Posts up to this many seconds older than the mark are still paged (they can show up late in /new)
+REDDIT_LISTING_CURSOR_OVERLAP_SECONDS = 60
+
+# Pooled keep-alive session of the Reddit API calls (RedditClient), shared by the ingestion threads
+REDDIT_HTTP_POOL_SIZE = 10
+# Retries of the connection errors and 429 / 5xx responses, waiting backoff * 2^(retry - 1) seconds between them
+REDDIT_HTTP_RETRIES = 3
+REDDIT_HTTP_BACKOFF_FACTOR = 0.5
+# Seconds (to connect and between bytes of the response) of the comment requests and of the listing requests
+REDDIT_HTTP_TIMEOUT = 5
+REDDIT_LISTING_TIMEOUT = 10
+# When the requests left in the rate limit period (x-ratelimit-remaining) are down to this, the next ones wait for
+# its reset (x-ratelimit-reset)
+REDDIT_RATELIMIT_RESERVE = 5
+# Seconds to wait after a 429 without rate limit headers
+REDDIT_RATELIMIT_DEFAULT_WAIT = 60
+# Asyncio pipeline of the Reddit ingestion (listing => parse => match / mirrors), instead of a page at a time
+REDDIT_PIPELINE_ENABLED = True
+# Listing pages fetched ahead of the parse stage, and parsed posts waiting for a worker
+REDDIT_PIPELINE_PAGES_QUEUE_SIZE = 2
+REDDIT_PIPELINE_JOBS_QUEUE_SIZE = 50
+# Posts matched / mirror searched at the same time (in a thread pool of the pipeline)
+REDDIT_PIPELINE_WORKERS = 10
+# Threads of the pipeline's other blocking calls (page parse, headers, heartbeat, cursors), apart from the workers
+REDDIT_PIPELINE_IO_WORKERS = 3
+
+# Completed background tasks older than this are summarized in TaskRunSummary and deleted
+COMPLETED_TASKS_RETENTION_DAYS = 7
+COMPLETED_TASKS_RETENTION_CHUNK_SIZE = 5000
+COMPLETED_TASKS_RETENTION_MAX_CHUNKS = 50
+
+# Max seconds for a change of the affiliate terms (in another process) to be seen by AffiliateMatcher
+AFFILIATE_TERMS_CHECK_SECONDS = 30
+
+# Same as the pg_trgm.similarity_threshold used by the trigram_similar lookups
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+# In-memory index of the teams of the matches around now, used by find_match instead of the trigram lookups
+TEAM_INDEX_ENABLED = True
+TEAM_INDEX_REFRESH_SECONDS = 60 * 10
+# Has to cover the 72 hours that find_match looks back, plus the time between refreshes
+TEAM_INDEX_PAST_HOURS = 76
+# Has to cover the day after the post that find_match looks ahead, plus the time between refreshes
+TEAM_INDEX_FUTURE_HOURS = 48
+
+# Matches loaded once per Reddit ingestion cycle (with their teams, tournament and category) for all its posts
+MATCH_WINDOW_ENABLED = True
+# The same window as the team index, so that its candidates are in it
+MATCH_WINDOW_PAST_HOURS = TEAM_INDEX_PAST_HOURS
+MATCH_WINDOW_FUTURE_HOURS = TEAM_INDEX_FUTURE_HOURS
+
+# Mirror searches (matches/mirrors_scheduler.py): a recurring task of their own pulls the due videos
+# (next_mirrors_check) from the database in batches, the most overdue first. When disabled, the videos are searched
+# when their post shows up again in the listings
+MIRRORS_SCHEDULER_ENABLED = True
+MIRRORS_CHECK_BATCH_SIZE = 50
+MIRRORS_CHECK_WORKERS = 5
+# Max seconds of a run (the rest of the due videos are left to the next one)
+MIRRORS_CHECK_MAX_SECONDS = 50
+# Videos older than this are no longer searched
+MIRRORS_CHECK_MAX_AGE_HOURS = 24
+# A claimed video can't be claimed by another run for this long (if its search doesn't finish)
+MIRRORS_CHECK_LEASE_SECONDS = 60 * 5
+# Each search in a row without new mirrors multiplies the interval to the next one, up to the max interval
+MIRRORS_CHECK_BACKOFF_MULTIPLIER = 2
+MIRRORS_CHECK_MAX_INTERVAL_MINUTES = 60 * 3
+# Newest replies (sort=new) fetched by the r/soccer searches after the first one of a video. The comments already
+# scanned (VideoGoal.mirrors_scanned_until) are skipped
+MIRRORS_COMMENTS_LIMIT = 100
+# Bounds of the comment trees walked by the r/footballhighlights searches: replies deeper than this (the post's comments
+# being depth 0) and comments after this many of a post are not searched
+MIRRORS_COMMENTS_MAX_DEPTH = 10
+MIRRORS_COMMENTS_MAX_NODES = 2000
+# The errors of a post's comments are sent in a single monitoring message, with the first ones
+MIRRORS_COMMENTS_ERRORS_SHOWN = 5
+
+# Reddit posts already processed (SeenPosts), kept across the ingestion cycles so that the posts seen again in the
+# listings are not looked up until the mirror search of their video is due
+SEEN_POSTS_CACHE_SIZE = 20000
+# Max seconds for a change made elsewhere (e.g. a post linked to its video in the admin) to be seen
+SEEN_POSTS_CACHE_SECONDS = 60 * 10
+
+# Title fragments already resolved to a team (TeamResolution), checked by find_matches before the fuzzy matching
+TEAM_RESOLUTION_ENABLED = True
+TEAM_RESOLUTION_CACHE_SIZE = 20000
+# Max seconds for a resolution learned in another process (e.g. a correction in the admin) to be used
+TEAM_RESOLUTION_CACHE_SECONDS = 60 * 10
+# The names of a corrected post are only learned in an orientation (home / away or swapped) whose summed similarity to
+# the names of the teams is higher than the other one's by at least this
+TEAM_RESOLUTION_ORIENTATION_MARGIN = 0.2
+# The names of a found match are only learned when found by the regex names with at least this score (the sum of the
+# similarities of both names, up to 2)
+TEAM_RESOLUTION_MIN_LEARN_SCORE = 1.2
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-file<s/
 
@@ -249,6 +369,30 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 NER_MODEL_FOLDER = os.path.join(BASE_DIR, "ner/goals_zone_model")
+# How often (at most) the NER model folder is checked for a new model to be reloaded
+NER_MODEL_RELOAD_CHECK_SECONDS = 60
+# Management commands that load the NER model on startup instead of on the first title
+NER_WARM_UP_COMMANDS = ["process_tasks"]
+# Number of titles handed to the NER model at once when processing a whole Reddit listing page
+NER_BATCH_SIZE = 100
+# Number of processes running NER for the Reddit ingestion (0 runs NER in the worker process itself)
+NER_ENGINE_WORKERS = int(os.environ.get("NER_ENGINE_WORKERS", 0))
+NER_ENGINE_CHUNK_SIZE = 25
+NER_ENGINE_START_METHOD = "spawn"
+# Max seconds for all the workers of the NER process pool to start and load their models
+NER_ENGINE_WARM_UP_TIMEOUT = 120
+# When set (e.g. http://127.0.0.1:8765), NER runs in the shared service started with `manage.py run_ner_server`
+NER_SERVICE_URL = os.environ.get("NER_SERVICE_URL")
+NER_SERVICE_TIMEOUT = 10
+# When the NER service fails, load the model in the calling process instead of going without NER results. Off by
+# default, as it defeats the point of the service (a single model per host)
+NER_SERVICE_LOCAL_FALLBACK = bool(os.environ.get("NER_SERVICE_LOCAL_FALLBACK"))
+
+# Cache of the team names extracted from Reddit titles (regex + NER)
+TITLE_PARSE_CACHE_SIZE = 5000
+# Also keep the results in the default cache (memcached), shared by all the processes
+TITLE_PARSE_CACHE_SHARED = True
+TITLE_PARSE_CACHE_TIMEOUT = 60 * 60 * 24 * 7
 
 GEOIP_PATH = os.path.join(STATICFILES_DIRS[0] if DEBUG else str(STATIC_ROOT), "geoip2/GeoLite2-City.mmdb")
 
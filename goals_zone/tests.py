@@ -1,8 +1,73 @@
 import datetime
+import importlib
+import json
+import os
+import timeit
+from io import StringIO
 
-from django.test import TestCase
+from background_task.models import CompletedTask
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-from matches.goals_populator import extract_names_from_title_regex, find_match
+from matches.affiliates import AffiliateMatcher
+from matches.goals_populator import (
+    MatchCandidate,
+    RedditClient,
+    RedditRateLimiter,
+    _get_comment_time,
+    _learn_team_resolutions,
+    _parse_comments_for_mirrors,
+    _parse_title,
+    _split_soccer_posts,
+    calculate_next_mirrors_check,
+    extract_names_from_title_regex,
+    find_match,
+    find_matches,
+    get_mirrors_comments_url,
+)
+from matches.match_window import MatchWindow, get_match_window, preloaded_match_window
+from matches.mirror_links import extract_html_links, extract_reply_links
+from matches.mirrors_scheduler import claim_due_videogoals
+from matches.models import (
+    AffiliateTerm,
+    Match,
+    PostMatch,
+    RedditListingCursor,
+    TaskRunSummary,
+    Team,
+    TeamAlias,
+    TeamResolution,
+    VideoGoal,
+)
+from matches.reddit_cursor import (
+    ListingPlan,
+    get_listing_plan,
+    get_newest_post,
+    reaches_known_posts,
+    save_listing_cursor,
+)
+from matches.reddit_pipeline import RedditPipeline, StageStats, get_subreddit_spec
+from matches.scheduling import claim_if_due, record_task_run
+from matches.seen_posts import SeenPosts
+from matches.task_retention import compact_completed_tasks_older_than
+from matches.team_index import TeamIndex, get_trigrams
+from matches.team_resolution import TeamResolver
+from matches.title_parse_cache import TitleParseCache, normalize_title
+from matches.utils import get_url_hash, normalize_name
+from matches.views import MatchWeekSearchView
+from ner.engine import NerEngine
+from ner.utils import (
+    NerModelRegistry,
+    NerUnavailableError,
+    extract_names_from_title_ner,
+    extract_names_from_titles_ner,
+)
 
 
 class AffiliateTeamsTestCase(TestCase):
@@ -481,3 +546,633 @@ class AffiliateTeamsTestCase(TestCase):
         assert len(matches) > 0
         match_id = matches.first().id
         assert match_id == 8604
+
+
+class UrlHashTestCase(SimpleTestCase):
+    @staticmethod
+    def test_equivalent_urls_same_hash() -> None:
+        url_hash = get_url_hash("https://streamin.one/v/abc123")
+        assert get_url_hash(" http://www.Streamin.one/v/abc123/#t=1 ") == url_hash
+        assert get_url_hash("https://streamin.one/v/abc124") != url_hash
+        assert get_url_hash("https://streamin.one/v/ABC123") != url_hash
+        assert get_url_hash(None) is None
+
+
+class NerModelRegistryTestCase(SimpleTestCase):
+    @staticmethod
+    def test_model_loaded_once() -> None:
+        registry = NerModelRegistry()
+        model = registry.get_model()
+        load_count = registry.get_metrics()["load_count"]
+        assert NerModelRegistry() is registry
+        assert registry.get_model() is model
+        extract_names_from_title_ner("Club Brugge 1-[3] Real Madrid - Luka Modric 90'+1'")
+        assert registry.get_metrics()["load_count"] == load_count
+        assert registry.version is not None
+
+    @staticmethod
+    def test_model_reload_swaps_instance() -> None:
+        registry = NerModelRegistry()
+        model = registry.get_model()
+        reloaded = registry.reload()
+        assert reloaded is not model
+        assert registry.get_model() is reloaded
+
+    @staticmethod
+    def test_batch_same_as_single_titles() -> None:
+        titles = [
+            "Club Brugge 1-[3] Real Madrid - Luka Modric 90'+1'",
+            "",
+            "Great goal by Erling Haaland against Arsenal 34'",
+            "[Liverpool] 2-0 Everton - Mohamed Salah 12'",
+        ]
+        assert extract_names_from_titles_ner(titles) == [extract_names_from_title_ner(title) for title in titles]
+
+    @override_settings(TITLE_PARSE_CACHE_SHARED=False)
+    def test_service_down_without_local_fallback(self) -> None:
+        title = "Club Brugge 1-[2] Real Madrid - Karim Benzema 80'"
+        # Nothing listens on the discard port
+        with override_settings(NER_SERVICE_URL="http://127.0.0.1:9", NER_SERVICE_LOCAL_FALLBACK=False):
+            with self.assertRaises(NerUnavailableError):
+                extract_names_from_titles_ner([title])
+            # Only the regex results, not cached
+            result = _parse_title(title)
+            assert result.regex_home_team == "Club Brugge" and result.ner_home_team is None
+            assert TitleParseCache().get(title) is None
+        with override_settings(NER_SERVICE_URL="http://127.0.0.1:9", NER_SERVICE_LOCAL_FALLBACK=True):
+            assert extract_names_from_titles_ner([title])[0][0] is not None
+            assert _parse_title(title).ner_home_team is not None
+            assert TitleParseCache().get(title) is not None
+
+
+class NerEngineTestCase(SimpleTestCase):
+    @staticmethod
+    def test_pool_warm_up_and_reload() -> None:
+        engine = NerEngine()
+        engine.workers = 2
+        try:
+            pids = engine.warm_up()
+            assert len(pids) == 2
+            assert engine.extract(["Club Brugge 1-[3] Real Madrid - Luka Modric 90'+1'"])[0][0] is not None
+            assert engine.warm_up() == pids
+            # The workers load the reloaded model in a new pool
+            NerModelRegistry().reload()
+            new_pids = engine.warm_up()
+            assert len(new_pids) == 2 and not new_pids & pids
+        finally:
+            engine.shutdown()
+            engine.workers = settings.NER_ENGINE_WORKERS
+
+
+@override_settings(TITLE_PARSE_CACHE_SHARED=False)
+class TitleParseCacheTestCase(SimpleTestCase):
+    @staticmethod
+    def test_normalized_title_hit() -> None:
+        cache = TitleParseCache()
+        title = "Bayern Munich [3]-1 Tottenham - Coutinho 64'"
+        assert normalize_title(f"  {title.replace(' ', '   ')} ") == title
+        result = _parse_title(title)
+        hits = cache.get_stats()["hits"]
+        assert _parse_title(f"{title.replace(' - ', '  -  ')}\n") == result
+        assert cache.get_stats()["hits"] == hits + 1
+        assert result.regex_home_team == "Bayern Munich"
+        assert result.regex_away_team == "Tottenham"
+
+
+class UrlConfTestCase(SimpleTestCase):
+    @staticmethod
+    def test_urlconf_import_without_queries() -> None:
+        # SimpleTestCase fails on any database query
+        import goals_zone.urls
+
+        importlib.reload(goals_zone.urls)
+        assert len(goals_zone.urls.urlpatterns) > 0
+
+
+class SchedulerStateTestCase(TestCase):
+    @staticmethod
+    def test_claim_if_due() -> None:
+        assert claim_if_due("test_full_scan", 60 * 60)
+        assert not claim_if_due("test_full_scan", 60 * 60)
+        assert claim_if_due("test_full_scan", 0)
+
+    @staticmethod
+    def test_record_task_run() -> None:
+        assert record_task_run("test_task") == 1
+        assert record_task_run("test_task") == 2
+
+
+@override_settings(COMPLETED_TASKS_RETENTION_CHUNK_SIZE=7)
+class CompletedTaskRetentionTestCase(TestCase):
+    @staticmethod
+    def test_old_completed_tasks_summarized() -> None:
+        old = timezone.now() - datetime.timedelta(days=10)
+        CompletedTask.objects.bulk_create(
+            [
+                CompletedTask(
+                    task_name="fetch_test",
+                    task_hash="hash",
+                    run_at=old,
+                    locked_at=old + datetime.timedelta(seconds=i),
+                    failed_at=old if i == 0 else None,
+                )
+                for i in range(20)
+            ]
+            + [CompletedTask(task_name="fetch_test", task_hash="hash", run_at=timezone.now())]
+        )
+        assert compact_completed_tasks_older_than(7) == 20
+        assert CompletedTask.objects.filter(task_name="fetch_test").count() == 1
+        summary = TaskRunSummary.objects.get(task_name="fetch_test", day=old.date())
+        assert summary.run_count == 20
+        assert summary.failed_count == 1
+        assert summary.mean_start_delay_seconds == 9.5
+
+
+class TeamIndexTestCase(TestCase):
+    @staticmethod
+    def test_trigrams_as_pg_trgm() -> None:
+        assert get_trigrams("Word") == {"  w", " wo", "wor", "ord", "rd "}
+        assert get_trigrams("São-Paulo") == get_trigrams("sao paulo")
+        assert get_trigrams(" ") == frozenset()
+
+    @staticmethod
+    def test_find_recent_match() -> None:
+        home_team = Team.objects.create(id=1001, name="Manchester City", short_name="Man City", slug="mancity")
+        away_team = Team.objects.create(id=1002, name="Tottenham Hotspur", short_name="Tottenham", slug="spurs")
+        match = Match.objects.create(
+            home_team=home_team, away_team=away_team, datetime=timezone.now(), slug="mancity-spurs"
+        )
+        index = TeamIndex()
+        index.refresh()
+        now = datetime.datetime.utcnow()
+        from_date = now - datetime.timedelta(hours=72)
+        to_date = now + datetime.timedelta(days=1)
+        assert index.find_match_scores("Man City", "Spurs", from_date, to_date) == {}
+        TeamAlias.objects.create(alias="Spurs", team=away_team)
+        assert index.find_match_scores("Man City", "Spurs", from_date, to_date) == {match.id: 2.0}
+        assert index.find_match_scores("Spurs", "Man City", from_date, to_date) == {}
+        assert index.find_match_scores("Man City", "Spurs", datetime.datetime(2019, 1, 1), to_date) is None
+
+
+class FindMatchesTestCase(TestCase):
+    @staticmethod
+    def test_swapped_hypothesis_ranked() -> None:
+        home_team = Team.objects.create(id=1001, name="Manchester City", short_name="Man City", slug="mancity")
+        away_team = Team.objects.create(id=1002, name="Tottenham Hotspur", short_name="Tottenham", slug="spurs")
+        match = Match.objects.create(
+            home_team=home_team, away_team=away_team, datetime=timezone.now(), slug="mancity-spurs"
+        )
+        TeamIndex().refresh()
+        now = datetime.datetime.utcnow()
+        to_date = now + datetime.timedelta(days=1)
+        candidates = find_matches([("Tottenham", "Man City"), ("Man City", "Tottenham")], to_date, now)
+        assert [(c.match.id, c.hypothesis) for c in candidates] == [(match.id, 1)]
+        assert find_matches([("Arsenal", "Chelsea")], to_date, now) == []
+
+
+class AffiliateMatcherTestCase(TestCase):
+    @staticmethod
+    def test_teams_classified_on_terms_change() -> None:
+        team = Team.objects.create(id=1001, name="Real Madrid u19", short_name="Real Madrid", slug="real-madrid-u19")
+        assert Team.objects.get(id=team.id).affiliate_suffix == ""
+        AffiliateTerm.objects.create(term="U19", is_prefix=False)
+        assert Team.objects.get(id=team.id).affiliate_suffix == "U19"
+        AffiliateTerm.objects.filter(term="U19").delete()
+        AffiliateTerm.objects.create(term="U19", is_prefix=False)
+        AffiliateTerm.objects.create(term="Women U19", is_prefix=False)
+        women = Team.objects.create(id=1002, name="Chelsea Women U19", short_name="Chelsea", slug="chelsea-w-u19")
+        assert women.affiliate_suffix == "Women U19"
+
+    @staticmethod
+    def test_titles_case_sensitive() -> None:
+        AffiliateTerm.objects.create(term="U19", is_prefix=False)
+        AffiliateTerm.objects.create(term="Jong", is_prefix=True)
+        matcher = AffiliateMatcher()
+        assert matcher.get_suffix("Real Madrid U19") == "U19"
+        assert matcher.get_suffix("Real Madrid u19") == ""
+        assert matcher.get_suffix("Real Madrid u19", ignore_case=True) == "U19"
+        assert matcher.get_prefix("Jong Ajax") == "Jong"
+        assert matcher.get_prefix("Jongajax") == ""
+
+
+class NormalizedTeamNamesTestCase(TestCase):
+    @staticmethod
+    def _explain_without_seqscan(queryset: QuerySet) -> str:
+        # The test tables are tiny, so the planner would always choose a sequential scan
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    @staticmethod
+    def test_normalized_on_save() -> None:
+        assert normalize_name("1. FC Köln") == "1 fc koln"
+        assert normalize_name("  Bodø/Glimt ") == "bodo glimt"
+        team = Team.objects.create(id=1001, name="1. FC Köln", short_name="Köln", slug="koln")
+        alias = TeamAlias.objects.create(alias="FC Cologne", team=team)
+        assert (team.normalized_name, team.normalized_short_name) == ("1 fc koln", "koln")
+        assert alias.normalized_alias == "fc cologne"
+
+    @staticmethod
+    def test_normalized_on_loaddata() -> None:
+        # Fixtures are saved raw, without calling save()
+        call_command("loaddata", "goals_zone/test/teams.json", "goals_zone/test/teamalias.json", verbosity=0)
+        assert not Team.objects.filter(normalized_name="").exists()
+        assert not TeamAlias.objects.filter(normalized_alias="").exists()
+
+    @staticmethod
+    def test_search_without_normalized_filter() -> None:
+        team = Team.objects.create(id=1001, name="1. FC Köln", short_name="Köln", slug="koln")
+        match = Match.objects.create(home_team=team, away_team=team, datetime=timezone.now())
+        VideoGoal.objects.create(match=match, url="https://streamable.com/koln")
+        view = MatchWeekSearchView()
+        view.request = Request(APIRequestFactory().get("/", {"filter": "koln"}))
+        assert list(view.get_queryset()) == [match]
+        view.request = Request(APIRequestFactory().get("/", {"filter": "- ."}))
+        assert not view.get_queryset().exists()
+
+    def test_trigram_lookups_use_indexes(self) -> None:
+        team = Team.objects.create(id=1001, name="1. FC Köln", short_name="Köln", slug="koln")
+        TeamAlias.objects.create(alias="FC Cologne", team=team)
+        plan = self._explain_without_seqscan(Team.objects.filter(normalized_name__trigram_similar="koln"))
+        assert "team_norm_name_trgm_idx" in plan
+        plan = self._explain_without_seqscan(Team.objects.filter(normalized_short_name__trigram_similar="koln"))
+        assert "team_norm_short_name_trgm_idx" in plan
+        plan = self._explain_without_seqscan(TeamAlias.objects.filter(normalized_alias__trigram_similar="cologne"))
+        assert "team_alias_norm_trgm_idx" in plan
+        # MatchWeekSearchView filter
+        plan = self._explain_without_seqscan(Team.objects.filter(normalized_name__contains="koln"))
+        assert "team_norm_name_trgm_idx" in plan
+
+
+class TeamResolutionTestCase(TestCase):
+    def setUp(self) -> None:
+        TeamResolver().clear()
+        self.home_team = Team.objects.create(id=1001, name="Manchester United", short_name="Man Utd", slug="manutd")
+        self.away_team = Team.objects.create(id=1002, name="FC Barcelona", short_name="Barcelona", slug="barca")
+        self.match = Match.objects.create(
+            home_team=self.home_team, away_team=self.away_team, datetime=timezone.now(), slug="manutd-barca"
+        )
+
+    def test_resolved_names_short_circuit(self) -> None:
+        now = datetime.datetime.utcnow()
+        to_date = now + datetime.timedelta(days=1)
+        assert TeamResolver().resolve(["United", "Barça"]) == {"United": frozenset(), "Barça": frozenset()}
+        TeamResolver().learn([("United", self.home_team.id), ("Barça", self.away_team.id)])
+        TeamResolver().learn([("united", self.home_team.id)])
+        assert TeamResolution.objects.get(fragment="united").hit_count == 2
+        assert TeamResolver().resolve(["UNITED", "Barca"]) == {
+            "UNITED": {self.home_team.id},
+            "Barca": {self.away_team.id},
+        }
+        with self.assertNumQueries(1):
+            candidates = find_matches([("Barça", "United"), ("United", "Barça")], to_date, now)
+        assert [(c.match.id, c.hypothesis, c.score) for c in candidates] == [(self.match.id, 1, 2.0)]
+
+    def test_learned_from_corrected_post(self) -> None:
+        videogoal = VideoGoal.objects.create(match=self.match, url="https://streamable.com/abc")
+        posts = [("abc", "Man United", "Blaugrana"), ("def", "Blaugranes", "Manchester Utd"), ("ghi", "Reds", "Blues")]
+        for permalink, home_team_str, away_team_str in posts:
+            post_match = PostMatch.objects.create(
+                permalink=f"/r/soccer/comments/{permalink}/", home_team_str=home_team_str, away_team_str=away_team_str
+            )
+            post_match.videogoal = videogoal
+            post_match.save()
+            # Only learned when it's first linked to the video
+            PostMatch.objects.get(id=post_match.id).save()
+            post_match.delete()
+        assert TeamResolution.objects.get(fragment=normalize_name("Man United")).hit_count == 1
+        # The swapped title is learned swapped, and the one without similar names not learned
+        assert TeamResolver().resolve(["Man United", "Blaugrana", "Blaugranes", "Manchester Utd", "Reds", "Blues"]) == {
+            "Man United": {self.home_team.id},
+            "Blaugrana": {self.away_team.id},
+            "Blaugranes": {self.away_team.id},
+            "Manchester Utd": {self.home_team.id},
+            "Reds": frozenset(),
+            "Blues": frozenset(),
+        }
+
+    def test_learned_only_from_high_scores(self) -> None:
+        _learn_team_resolutions("Man United", "Barça", MatchCandidate(self.match, 0, 0.6))
+        assert not TeamResolution.objects.exists()
+        _learn_team_resolutions("Man United", "Barça", MatchCandidate(self.match, 0, 1.6))
+        assert TeamResolver().resolve(["Man United", "Barça"]) == {
+            "Man United": {self.home_team.id},
+            "Barça": {self.away_team.id},
+        }
+
+    def test_resolved_names_affiliate_terms(self) -> None:
+        AffiliateTerm.objects.create(term="U19")
+        affiliate_team = Team.objects.create(
+            id=1003, name="Manchester United U19", short_name="Man Utd U19", slug="mu19"
+        )
+        affiliate_match = Match.objects.create(
+            home_team=affiliate_team, away_team=self.away_team, datetime=timezone.now(), slug="mu19-barca"
+        )
+        TeamResolver().learn(
+            [("United", self.home_team.id), ("United", affiliate_team.id), ("Barça", self.away_team.id)]
+        )
+        now = datetime.datetime.utcnow()
+        to_date = now + datetime.timedelta(days=1)
+        candidates = find_matches([("United", "Barça")], to_date, now)
+        # "United" is also resolved to the U19 team, but only a main team can be the team of a name without "U19"
+        assert [c.match.id for c in candidates] == [self.match.id]
+        assert Match.objects.filter(id=affiliate_match.id, home_team__affiliate_suffix="U19").exists()
+
+
+class MatchWindowTestCase(TestCase):
+    def setUp(self) -> None:
+        self.home_team = Team.objects.create(id=1001, name="Manchester City", short_name="Man City", slug="mancity")
+        self.away_team = Team.objects.create(id=1002, name="Tottenham Hotspur", short_name="Tottenham", slug="spurs")
+        self.match = Match.objects.create(
+            home_team=self.home_team, away_team=self.away_team, datetime=timezone.now(), slug="mancity-spurs"
+        )
+
+    def test_matches_copied_from_window(self) -> None:
+        match_window = MatchWindow.build()
+        assert match_window.size == 1
+        now = datetime.datetime.utcnow()
+        assert match_window.covers(now - datetime.timedelta(hours=72), now + datetime.timedelta(days=1))
+        assert not match_window.covers(datetime.date(2019, 1, 1), now)
+        with self.assertNumQueries(0):
+            match = match_window.get(self.match.id)
+            assert match is not None and match.home_team.name == "Manchester City"
+        match.score = "1-0"
+        window_match = match_window.get(self.match.id)
+        assert window_match is not None and window_match.score is None
+        from_date = now - datetime.timedelta(hours=72)
+        to_date = now + datetime.timedelta(days=1)
+        home_team_ids = frozenset({self.home_team.id})
+        away_team_ids = frozenset({self.away_team.id})
+        found = match_window.find(home_team_ids, away_team_ids, from_date, to_date)
+        assert [m.id for m in found] == [self.match.id]
+        assert match_window.find(away_team_ids, home_team_ids, from_date, to_date) == []
+        assert match_window.find(home_team_ids, away_team_ids, from_date, from_date) == []
+
+    def test_find_matches_from_window(self) -> None:
+        TeamIndex().refresh()
+        now = datetime.datetime.utcnow()
+        to_date = now + datetime.timedelta(days=1)
+        with preloaded_match_window() as match_window:
+            assert get_match_window() is match_window
+            find_matches([("Man City", "Tottenham")], to_date, now)
+            with self.assertNumQueries(0):
+                candidates = find_matches([("Man City", "Tottenham")], to_date, now)
+            assert [(c.match.id, c.hypothesis) for c in candidates] == [(self.match.id, 0)]
+        assert get_match_window() is None
+
+
+class RedditClientTestCase(SimpleTestCase):
+    @staticmethod
+    def test_shared_pooled_session() -> None:
+        assert RedditClient() is RedditClient()
+        adapter = RedditClient().session.get_adapter("https://oauth.reddit.com/r/soccer/new")
+        assert adapter is RedditClient().session.get_adapter("https://oauth.reddit.com/comments/abc")
+        assert adapter._pool_maxsize == settings.REDDIT_HTTP_POOL_SIZE
+        assert adapter.max_retries.total == settings.REDDIT_HTTP_RETRIES
+        assert 429 in adapter.max_retries.status_forcelist
+
+
+class RedditPipelineTestCase(SimpleTestCase):
+    @staticmethod
+    def test_rate_limiter() -> None:
+        rate_limiter = RedditRateLimiter()
+        rate_limiter.clear()
+        assert rate_limiter.get_delay() == 0
+        rate_limiter.update(200, {"x-ratelimit-remaining": "6", "x-ratelimit-reset": "30"})
+        # The request is counted before its response
+        assert rate_limiter.get_delay() == 0
+        assert 29 < rate_limiter.get_delay() <= 30
+        rate_limiter.update(200, {"x-ratelimit-remaining": "100", "x-ratelimit-reset": "0"})
+        assert rate_limiter.get_delay() == 0
+        rate_limiter.update(429, {"retry-after": "10"})
+        assert 9 < rate_limiter.get_delay() <= 10
+        rate_limiter.clear()
+
+    @staticmethod
+    def test_stage_stats() -> None:
+        stats = StageStats("match")
+        assert stats.throughput is None
+        start = timeit.default_timer() - 2
+        stats.record(start)
+        stats.record(start, error=True)
+        assert (stats.items, stats.errors) == (2, 1)
+        throughput = stats.throughput
+        assert throughput is not None and 0.9 < throughput <= 1
+        assert set(RedditPipeline([]).run()) == {"listing", "parse", "match", "mirrors"}
+
+    @staticmethod
+    def test_listing_error() -> None:
+        # A listing that fails before its first page (an invalid spec) ends the run without hanging its stages
+        spec = get_subreddit_spec(ListingPlan("soccer", False, "", None))._replace(pages=None)  # type: ignore
+        stats = RedditPipeline([spec]).run()
+        assert (stats["listing"].errors, stats["parse"].items, stats["match"].items) == (1, 0, 0)
+
+
+class RedditListingCursorTestCase(TestCase):
+    @staticmethod
+    def _page(*posts: tuple[str, float]) -> list[dict]:
+        return [{"data": {"name": name, "created_utc": created_utc}} for name, created_utc in posts]
+
+    def test_listing_cursor(self) -> None:
+        plan = get_listing_plan("soccer")
+        # No mark yet
+        assert plan.full_scan
+        page = self._page(("t3_c", 3000.0), ("t3_b", 2000.0))
+        assert not reaches_known_posts(plan, page)
+        save_listing_cursor(plan, get_newest_post(None, page), False)
+        plan = get_listing_plan("soccer")
+        assert not plan.full_scan
+        assert (plan.last_fullname, plan.last_created_utc) == ("t3_c", 3000.0)
+        # Newer posts only, then the page with the mark (or older than it)
+        assert not reaches_known_posts(plan, self._page(("t3_e", 5000.0), ("t3_d", 4000.0)))
+        assert reaches_known_posts(plan, self._page(("t3_d", 4000.0), ("t3_c", 3000.0)))
+        assert reaches_known_posts(plan, self._page(("t3_x", 1000.0)))
+        # The posts slightly older than the mark are still paged
+        assert not reaches_known_posts(plan, self._page(("t3_y", 2990.0)))
+        newest = get_newest_post(get_newest_post(None, self._page(("t3_d", 4000.0))), self._page(("t3_e", 5000.0)))
+        assert newest is not None and newest["name"] == "t3_e"
+
+    def test_recovery_full_scan(self) -> None:
+        save_listing_cursor(get_listing_plan("soccer"), {"name": "t3_a", "created_utc": 1000.0}, True)
+        plan = get_listing_plan("soccer")
+        # A gap left behind: all the pages used without reaching the mark
+        save_listing_cursor(plan, {"name": "t3_b", "created_utc": 2000.0}, False)
+        plan = get_listing_plan("soccer")
+        assert plan.full_scan
+        save_listing_cursor(plan, {"name": "t3_c", "created_utc": 3000.0}, False)
+        assert not get_listing_plan("soccer").full_scan
+        # Downtime
+        RedditListingCursor.objects.filter(subreddit="soccer").update(
+            updated_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        assert get_listing_plan("soccer").full_scan
+        # Requested by hand
+        save_listing_cursor(get_listing_plan("soccer"), None, True)
+        assert not get_listing_plan("soccer").full_scan
+        call_command("request_reddit_full_scan", "soccer", stdout=StringIO())
+        assert get_listing_plan("soccer").full_scan
+        assert get_listing_plan("soccer").last_created_utc is None
+
+
+class SeenPostsTestCase(TestCase):
+    def setUp(self) -> None:
+        SeenPosts().clear()
+        home_team = Team.objects.create(id=1001, name="Liverpool", short_name="Liverpool", slug="liverpool")
+        away_team = Team.objects.create(id=1002, name="Everton", short_name="Everton", slug="everton")
+        match = Match.objects.create(
+            home_team=home_team, away_team=away_team, datetime=timezone.now(), slug="liverpool-everton"
+        )
+        now = timezone.now()
+        PostMatch.objects.create(permalink="/r/soccer/comments/not_found/")
+        for permalink, next_mirrors_check in [
+            ("/r/soccer/comments/due/", now - datetime.timedelta(minutes=1)),
+            ("/r/soccer/comments/not_due/", now + datetime.timedelta(hours=1)),
+        ]:
+            videogoal = VideoGoal.objects.create(
+                match=match, url=f"https://streamable.com/{permalink}", next_mirrors_check=next_mirrors_check
+            )
+            PostMatch.objects.create(permalink=permalink, videogoal=videogoal)
+
+    @staticmethod
+    def _page(*names: str) -> list[dict]:
+        return [
+            {
+                "data": {
+                    "permalink": f"/r/soccer/comments/{name}/",
+                    "url": f"https://streamable.com/{name}",
+                    "link_flair_text": "Media",
+                    "title": "Liverpool [1] - 0 Everton - Salah 10'",
+                    "created_utc": 1700000000.0,
+                }
+            }
+            for name in names
+        ]
+
+    def test_page_looked_up_at_once(self) -> None:
+        page = self._page("not_found", "due", "not_due", "new")
+        with self.assertNumQueries(1):
+            mirror_checks, new_posts = _split_soccer_posts(page)
+        # The due mirrors are searched by the mirrors scheduler
+        assert mirror_checks == []
+        assert [post["permalink"] for post, _, _ in new_posts] == ["/r/soccer/comments/new/"]
+        # Only the new post is looked up again
+        with self.assertNumQueries(1):
+            mirror_checks, new_posts = _split_soccer_posts(page)
+        assert mirror_checks == [] and len(new_posts) == 1
+        with self.assertNumQueries(0):
+            assert _split_soccer_posts(self._page("not_found", "due", "not_due")) == ([], [])
+        assert SeenPosts().get_stats()["size"] == 3
+
+
+class MirrorsSchedulerTestCase(TestCase):
+    def setUp(self) -> None:
+        home_team = Team.objects.create(id=1001, name="Sevilla", short_name="Sevilla", slug="sevilla")
+        away_team = Team.objects.create(id=1002, name="Real Betis", short_name="Betis", slug="betis")
+        self.match = Match.objects.create(
+            home_team=home_team, away_team=away_team, datetime=timezone.now(), slug="sevilla-betis"
+        )
+
+    def _create_videogoal(self, name: str, next_mirrors_check: datetime.datetime) -> VideoGoal:
+        videogoal = VideoGoal.objects.create(
+            match=self.match, url=f"https://streamable.com/{name}", next_mirrors_check=next_mirrors_check
+        )
+        PostMatch.objects.create(permalink=f"/r/soccer/comments/{name}/", videogoal=videogoal)
+        return videogoal
+
+    def test_due_videos_claimed_once(self) -> None:
+        now = timezone.now()
+        overdue = self._create_videogoal("overdue", now - datetime.timedelta(minutes=10))
+        due = self._create_videogoal("due", now - datetime.timedelta(minutes=1))
+        self._create_videogoal("not_due", now + datetime.timedelta(minutes=10))
+        old = self._create_videogoal("old", now - datetime.timedelta(minutes=10))
+        VideoGoal.objects.filter(id=old.id).update(created_at=now - datetime.timedelta(days=2))
+        assert [videogoal.id for videogoal in claim_due_videogoals(1)] == [overdue.id]
+        assert [videogoal.id for videogoal in claim_due_videogoals(10)] == [due.id]
+        # Leased
+        assert claim_due_videogoals(10) == []
+        assert VideoGoal.objects.get(id=due.id).next_mirrors_check > now
+
+    def test_backoff_without_new_mirrors(self) -> None:
+        videogoal = self._create_videogoal("backoff", timezone.now())
+        VideoGoal.objects.filter(id=videogoal.id).update(created_at=timezone.now() - datetime.timedelta(hours=5))
+        videogoal.refresh_from_db()
+        intervals = []
+        for found_new_mirrors in [None, False, False, True]:
+            calculate_next_mirrors_check(videogoal, found_new_mirrors)
+            intervals.append(round((videogoal.next_mirrors_check - timezone.now()).total_seconds() / 60))
+        assert intervals == [60, 120, 180, 60]
+        assert VideoGoal.objects.get(id=videogoal.id).mirrors_checks_without_new == 0
+
+    def test_comments_scanned_once(self) -> None:
+        videogoal = self._create_videogoal("comments", timezone.now())
+
+        def comment(name: str, created_utc: float, replies: list[dict], edited: float | bool = False) -> dict:
+            return {
+                "kind": "t1",
+                "data": {
+                    "author": name,
+                    "body_html": f'<a href="https://streamable.com/{name}">Mirror</a>',
+                    "created_utc": created_utc,
+                    "edited": edited,
+                    "replies": {"data": {"children": replies}} if replies else "",
+                },
+            }
+
+        assert _get_comment_time(comment("a", 1000.0, [])["data"]) == 1000.0
+        assert _get_comment_time(comment("a", 1000.0, [], edited=3000.0)["data"]) == 3000.0
+        tree = comment("old", 1000.0, [comment("new", 2500.0, []), comment("old_reply", 1500.0, [])])
+        assert _parse_comments_for_mirrors([tree], videogoal, 2000.0) == 2500.0
+        assert [mirror.url for mirror in videogoal.mirrors.all()] == ["https://streamable.com/new"]
+        assert _parse_comments_for_mirrors([tree], videogoal) == 2500.0
+        assert videogoal.mirrors.count() == 3
+
+    def test_comments_walk_bounds(self) -> None:
+        videogoal = self._create_videogoal("bounds", timezone.now())
+
+        def comment(name: str, created_utc: float, replies: list[dict], body_html: str | None = None) -> dict:
+            data = {"author": name, "created_utc": created_utc, "replies": {"data": {"children": replies}}}
+            if body_html is not None:
+                data["body_html"] = body_html
+            return {"kind": "t1", "data": data}
+
+        # A thread deeper than the max depth, with a broken comment and a "load more comments" placeholder
+        thread: list[dict] = []
+        for depth in reversed(range(settings.MIRRORS_COMMENTS_MAX_DEPTH + 5)):
+            thread = [comment(str(depth), depth, thread, f'<a href="https://streamable.com/{depth}">Mirror</a>')]
+        more = {"kind": "more", "data": {"children": ["x"]}}
+        comments = [comment("broken", 100.0, []), *thread, more]
+        assert _parse_comments_for_mirrors(comments, videogoal) == 100.0
+        urls = [mirror.url for mirror in videogoal.mirrors.order_by("id")]
+        assert urls == [f"https://streamable.com/{depth}" for depth in range(settings.MIRRORS_COMMENTS_MAX_DEPTH + 1)]
+
+        # Only the first comments of a huge post
+        comments = [comment(str(i), i, [], "") for i in range(settings.MIRRORS_COMMENTS_MAX_NODES + 100)]
+        assert _parse_comments_for_mirrors(comments, videogoal) == settings.MIRRORS_COMMENTS_MAX_NODES - 1
+
+    def test_comments_url(self) -> None:
+        videogoal = self._create_videogoal("url", timezone.now())
+        videogoal = VideoGoal.objects.select_related("post_match").get(id=videogoal.id)
+        post_url = "https://oauth.reddit.com/r/soccer/comments/url/"
+        # The post's page, to find the AutoModerator comment
+        assert get_mirrors_comments_url(videogoal) == post_url
+        videogoal.auto_moderator_comment_id = "automod"
+        assert get_mirrors_comments_url(videogoal) == f"{post_url}automod?sort=new"
+        videogoal.mirrors_scanned_until = 1000.0
+        limit = settings.MIRRORS_COMMENTS_LIMIT
+        assert get_mirrors_comments_url(videogoal) == f"{post_url}automod?sort=new&limit={limit}"
+        videogoal.source = VideoGoal.RedditSource.FootballHighlights
+        assert get_mirrors_comments_url(videogoal) == f"{post_url}?sort=new"
+
+
+class MirrorLinksTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        with open(os.path.join(settings.BASE_DIR, "goals_zone", "test", "mirror_links.json")) as corpus_file:
+            self.corpus = json.load(corpus_file)
+
+    def test_html_links(self) -> None:
+        for case in self.corpus["html"]:
+            assert [list(link) for link in extract_html_links(case["html"])] == case["links"], case["html"]
+
+    def test_reply_links(self) -> None:
+        for case in self.corpus["replies"]:
+            assert [list(link) for link in extract_reply_links(case["body"])] == case["links"], case["body"]
@@ -1,6 +1,18 @@
 from django.contrib import admin
 
-from .models import AffiliateTerm, Category, Match, Season, Team, TeamAlias, Tournament, VideoGoal
+from .models import (
+    AffiliateTerm,
+    Category,
+    Match,
+    PostMatch,
+    RedditListingCursor,
+    Season,
+    Team,
+    TeamAlias,
+    TeamResolution,
+    Tournament,
+    VideoGoal,
+)
 
 
 class VideoGoalAdmin(admin.ModelAdmin):
@@ -21,6 +33,25 @@ class TeamAliasAdmin(admin.ModelAdmin):
     search_fields = ["alias", "team__name"]
 
 
+class TeamResolutionAdmin(admin.ModelAdmin):
+    autocomplete_fields = ["team"]
+    search_fields = ["fragment", "team__name"]
+    list_display = ["fragment", "team", "hit_count", "last_used_at"]
+
+
+class PostMatchAdmin(admin.ModelAdmin):
+    # Linking a not found post to its video (a correction) teaches the resolution of its team names
+    raw_id_fields = ["videogoal"]
+    search_fields = ["permalink", "title", "home_team_str", "away_team_str"]
+    list_display = ["title", "home_team_str", "away_team_str", "videogoal", "fetched"]
+
+
+class RedditListingCursorAdmin(admin.ModelAdmin):
+    # Checking needs_full_scan makes the next run of the subreddit a full scan
+    list_display = ["subreddit", "last_fullname", "last_created_utc", "needs_full_scan", "updated_at"]
+    list_editable = ["needs_full_scan"]
+
+
 class TournamentAdmin(admin.ModelAdmin):
     search_fields = ["name"]
 
@@ -42,3 +73,6 @@ admin.site.register(VideoGoal, VideoGoalAdmin)
 admin.site.register(Team, TeamAdmin)
 admin.site.register(TeamAlias, TeamAliasAdmin)
 admin.site.register(AffiliateTerm)
+admin.site.register(TeamResolution, TeamResolutionAdmin)
+admin.site.register(PostMatch, PostMatchAdmin)
+admin.site.register(RedditListingCursor, RedditListingCursorAdmin)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+import timeit
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+AFFILIATE_TERMS_VERSION_KEY = "affiliate_terms_version"
+
+
+class AffiliateMatcher:
+    """
+    Affiliate terms (U19, Women, II, ...) compiled into regexes, loaded once per process.
+
+    A change of the terms (in any process) bumps a version in the shared cache, which is checked at most every
+    AFFILIATE_TERMS_CHECK_SECONDS. When more than one term matches, the longest one wins.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> AffiliateMatcher:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = Lock()
+        self._loaded = False
+        self._version: str | None = None
+        self._last_check: float = 0.0
+        self._prefix_regex: re.Pattern | None = None
+        self._prefix_regex_ignore_case: re.Pattern | None = None
+        self._suffix_regex: re.Pattern | None = None
+        self._suffix_regex_ignore_case: re.Pattern | None = None
+        # Lowercase term => term as it is in AffiliateTerm
+        self._terms: dict[str, str] = {}
+
+    @staticmethod
+    def _get_shared_version() -> str | None:
+        try:
+            return caches["default"].get(AFFILIATE_TERMS_VERSION_KEY)
+        except Exception as ex:
+            logger.warning(f"Error reading affiliate terms version from shared cache: {ex}")
+            # Can't know if the terms changed, so they are reloaded
+            return f"unknown-{time.time()}"
+
+    @staticmethod
+    def _compile(terms: list[str], pattern: str, flags: int = 0) -> re.Pattern | None:
+        if len(terms) == 0:
+            return None
+        # Longest first, so that the longest matching term wins
+        alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        return re.compile(pattern.format(alternatives), flags)
+
+    def _load(self, version: str | None) -> None:
+        from matches.models import AffiliateTerm
+
+        prefix_terms: list[str] = []
+        suffix_terms: list[str] = []
+        for term, is_prefix in AffiliateTerm.objects.values_list("term", "is_prefix"):
+            (prefix_terms if is_prefix else suffix_terms).append(term)
+        self._prefix_regex = self._compile(prefix_terms, r"^({}) ")
+        self._prefix_regex_ignore_case = self._compile(prefix_terms, r"^({}) ", re.IGNORECASE)
+        self._suffix_regex = self._compile(suffix_terms, r" ({})$")
+        self._suffix_regex_ignore_case = self._compile(suffix_terms, r" ({})$", re.IGNORECASE)
+        self._terms = {term.lower(): term for term in prefix_terms + suffix_terms}
+        self._version = version
+        self._loaded = True
+        logger.info(f"Affiliate terms loaded: {len(prefix_terms)} prefixes | {len(suffix_terms)} suffixes")
+
+    def _check(self) -> None:
+        now = timeit.default_timer()
+        if self._loaded and now - self._last_check < settings.AFFILIATE_TERMS_CHECK_SECONDS:
+            return
+        with self._lock:
+            if self._loaded and now - self._last_check < settings.AFFILIATE_TERMS_CHECK_SECONDS:
+                return
+            version = self._get_shared_version()
+            if not self._loaded or version != self._version:
+                self._load(version)
+            self._last_check = now
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+    def _find_term(self, regex: re.Pattern | None, name: str) -> str:
+        if regex is None:
+            return ""
+        found = regex.search(name)
+        # The term as it is in AffiliateTerm, whatever the case in the name
+        return self._terms.get(found.group(1).lower(), found.group(1)) if found else ""
+
+    def get_prefix(self, name: str, ignore_case: bool = False) -> str:
+        """
+        Prefix affiliate term of a name ("" if none). Titles are matched with the case of the term (as they
+        always were) and team names ignoring it.
+        """
+        self._check()
+        return self._find_term(self._prefix_regex_ignore_case if ignore_case else self._prefix_regex, name)
+
+    def get_suffix(self, name: str, ignore_case: bool = False) -> str:
+        self._check()
+        return self._find_term(self._suffix_regex_ignore_case if ignore_case else self._suffix_regex, name)
+
+
+def classify_teams_affiliates() -> None:
+    """
+    Recomputes the affiliate columns of every team with a single UPDATE per term (after a change of the terms).
+    """
+    from matches.models import AffiliateTerm, Team
+
+    start = timeit.default_timer()
+    with transaction.atomic():
+        Team.objects.exclude(affiliate_prefix="", affiliate_suffix="").update(affiliate_prefix="", affiliate_suffix="")
+        # Shortest first, so that the longest matching term is the last one written
+        for term, is_prefix in sorted(AffiliateTerm.objects.values_list("term", "is_prefix"), key=lambda t: len(t[0])):
+            if is_prefix:
+                Team.objects.filter(name__istartswith=f"{term} ").update(affiliate_prefix=term)
+            else:
+                Team.objects.filter(name__iendswith=f" {term}").update(affiliate_suffix=term)
+    end = timeit.default_timer()
+    logger.info(f"Teams affiliate terms classified | {(end - start):.2f} elapsed")
+
+
+def handle_affiliate_terms_change() -> None:
+    AffiliateMatcher().invalidate()
+    classify_teams_affiliates()
+    try:
+        caches["default"].set(AFFILIATE_TERMS_VERSION_KEY, str(time.time()), timeout=None)
+    except Exception as ex:
+        logger.warning(f"Error writing affiliate terms version to shared cache: {ex}")
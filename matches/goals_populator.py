@@ -4,7 +4,7 @@ import concurrent.futures
 import datetime
 import json
 import logging
-import os
+import operator
 import re
 import time
 import timeit
@@ -13,37 +13,88 @@ from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
 from datetime import date, timedelta
 from difflib import SequenceMatcher
-from html import unescape
+from functools import partial, reduce
 from threading import Lock
-from xml.etree import ElementTree as ETree
+from typing import Callable, Mapping, NamedTuple
 
-import markdown as markdown
 import requests
 from background_task import background
-from background_task.models import CompletedTask, Task
-from bs4 import BeautifulSoup
+from background_task.models import Task
 from discord_webhook import DiscordWebhook
-from django.core.exceptions import ValidationError
-from django.core.validators import URLValidator
+from django.contrib.postgres.search import TrigramSimilarity
 from django.db import models
-from django.db.models import Q, QuerySet
+from django.db.models import (
+    Case,
+    Exists,
+    FloatField,
+    Func,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from retry import retry
 from slack_webhook import Slack
-
-from goals_zone.settings import REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET
+from urllib3.util import Retry
+
+from goals_zone.settings import (
+    MIRRORS_CHECK_BACKOFF_MULTIPLIER,
+    MIRRORS_CHECK_MAX_INTERVAL_MINUTES,
+    MIRRORS_COMMENTS_ERRORS_SHOWN,
+    MIRRORS_COMMENTS_LIMIT,
+    MIRRORS_COMMENTS_MAX_DEPTH,
+    MIRRORS_COMMENTS_MAX_NODES,
+    MIRRORS_SCHEDULER_ENABLED,
+    REDDIT_CLIENT_ID,
+    REDDIT_CLIENT_SECRET,
+    REDDIT_FOOTBALLHIGHLIGHTS_SCAN_INTERVAL,
+    REDDIT_HTTP_BACKOFF_FACTOR,
+    REDDIT_HTTP_POOL_SIZE,
+    REDDIT_HTTP_RETRIES,
+    REDDIT_HTTP_TIMEOUT,
+    REDDIT_LISTING_TIMEOUT,
+    REDDIT_PIPELINE_ENABLED,
+    REDDIT_RATELIMIT_DEFAULT_WAIT,
+    REDDIT_RATELIMIT_RESERVE,
+    TEAM_INDEX_ENABLED,
+    TEAM_RESOLUTION_ENABLED,
+    TEAM_RESOLUTION_MIN_LEARN_SCORE,
+)
+from matches.affiliates import AffiliateMatcher
+from matches.match_window import MatchWindow, get_match_window, preloaded_match_window
+from matches.mirror_links import extract_html_links, extract_reply_links
 from matches.models import (
-    AffiliateTerm,
     Match,
     PostMatch,
     Team,
+    TeamAlias,
     VideoGoal,
     VideoGoalMirror,
 )
+from matches.reddit_cursor import (
+    ListingPlan,
+    get_listing_plan,
+    get_newest_post,
+    reaches_known_posts,
+    save_listing_cursor,
+)
+from matches.scheduling import claim_if_due, record_task_run
+from matches.seen_posts import SeenPosts
+from matches.team_index import TeamIndex
+from matches.team_resolution import TeamResolver
+from matches.title_parse_cache import TitleParseCache, TitleParseResult
+from matches.utils import get_url_hash, normalize_name
 from monitoring.models import MonitoringAccount
 from msg_events.models import MessageObject, Tweet, Webhook
+from ner.engine import NerEngine
 from ner.models import NerLog
-from ner.utils import extract_names_from_title_ner
+from ner.utils import NerUnavailableError, extract_names_from_title_ner
 
 executor = ThreadPoolExecutor(max_workers=10)
 
@@ -93,6 +144,121 @@ class RedditHeaders:
         return self._headers
 
 
+class RedditRateLimiter:
+    """
+    Rate limit of the Reddit API, shared by all the requests of the process (threads and asyncio pipeline).
+
+    It is updated with the x-ratelimit-remaining / x-ratelimit-reset headers of every response. When the requests
+    left in the period are down to REDDIT_RATELIMIT_RESERVE, the next requests wait for the reset of the period.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> RedditRateLimiter:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = Lock()
+        self._remaining: float | None = None
+        self._reset_at = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._remaining = None
+            self._reset_at = 0.0
+
+    def update(self, status_code: int, headers: Mapping[str, str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            try:
+                if headers.get("x-ratelimit-reset") is not None:
+                    self._reset_at = now + float(headers["x-ratelimit-reset"])
+                if headers.get("x-ratelimit-remaining") is not None:
+                    self._remaining = float(headers["x-ratelimit-remaining"])
+            except ValueError:
+                logger.warning(f"Invalid Reddit rate limit headers: {headers}")
+            if status_code == 429:
+                self._remaining = 0
+                if headers.get("x-ratelimit-reset") is None:
+                    retry_after = headers.get("retry-after")
+                    wait = (
+                        float(retry_after) if retry_after and retry_after.isdigit() else REDDIT_RATELIMIT_DEFAULT_WAIT
+                    )
+                    self._reset_at = now + wait
+
+    def get_delay(self) -> float:
+        """
+        Seconds to wait before the next request (0 if it can be made now, and then it's counted as made).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._remaining is None or now >= self._reset_at:
+                return 0.0
+            if self._remaining > REDDIT_RATELIMIT_RESERVE:
+                # Counted before its response, as other threads make requests meanwhile
+                self._remaining -= 1
+                return 0.0
+            return self._reset_at - now
+
+
+class RedditClient:
+    """
+    Keep-alive session of the Reddit API calls, with a connection pool shared by all the threads, so that the
+    listings and the comment trees don't open a new TLS connection each. Connection errors and 429 / 5xx responses
+    are retried with backoff.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> RedditClient:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        retries = Retry(
+            total=REDDIT_HTTP_RETRIES,
+            backoff_factor=REDDIT_HTTP_BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            # The last response is returned, so that the callers can log it as before
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=REDDIT_HTTP_POOL_SIZE, max_retries=retries)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._count_lock = Lock()
+        self.request_count = 0
+
+    @property
+    def session(self) -> requests.Session:
+        return self._session
+
+    def get(self, url: str, timeout: float = REDDIT_HTTP_TIMEOUT) -> requests.Response:
+        rate_limiter = RedditRateLimiter()
+        delay = rate_limiter.get_delay()
+        if delay > 0:
+            logger.info(f"Reddit rate limit reached, waiting {delay:.1f}s")
+            time.sleep(delay)
+        with self._count_lock:
+            self.request_count += 1
+        response = self._session.get(url, headers=RedditHeaders().get_headers(), timeout=timeout)
+        rate_limiter.update(response.status_code, response.headers)
+        return response
+
+
 @background(schedule=60)
 def fetch_videogoals() -> None:
     current = Task.objects.filter(task_name="matches.goals_populator.fetch_videogoals").first()
@@ -131,28 +297,35 @@ def _should_process_post(post: dict) -> bool:
 
 
 def _fetch_reddit_videos() -> None:
-    completed = CompletedTask.objects.filter(task_name="matches.goals_populator.fetch_videogoals").count()
-    logger.info(f"_fetch_reddit_videos completed: {completed}")
-    soccer_full_scan = False
-    footballhighlights_full_scan = False
-    if completed % 60 == 0:
-        soccer_full_scan = True
-    _fetch_reddit_soccer_videos(full_scan=soccer_full_scan)
-    if completed % 120 == 0:
-        footballhighlights_full_scan = True
-    if completed % 15 == 0:
-        _fetch_reddit_footballhighlights_videos(full_scan=footballhighlights_full_scan)
-
-
-def _fetch_reddit_footballhighlights_videos(full_scan: bool = False) -> None:
+    runs = record_task_run("matches.goals_populator.fetch_videogoals")
+    logger.info(f"_fetch_reddit_videos runs: {runs}")
+    # The matches around now are loaded once for all the posts of the cycle
+    with preloaded_match_window():
+        plans = [get_listing_plan("soccer")]
+        if claim_if_due("reddit_footballhighlights_scan", REDDIT_FOOTBALLHIGHLIGHTS_SCAN_INTERVAL):
+            plans.append(get_listing_plan("footballhighlights"))
+        if REDDIT_PIPELINE_ENABLED:
+            from matches.reddit_pipeline import RedditPipeline, get_subreddit_spec
+
+            RedditPipeline([get_subreddit_spec(plan) for plan in plans]).run()
+        else:
+            for plan in plans:
+                if plan.subreddit == "soccer":
+                    _fetch_reddit_soccer_videos(plan)
+                else:
+                    _fetch_reddit_footballhighlights_videos(plan)
+    logger.info(f"Title parse cache stats: {TitleParseCache().get_stats()}")
+    logger.info(f"Seen posts stats: {SeenPosts().get_stats()}")
+
+
+def _fetch_reddit_footballhighlights_videos(plan: ListingPlan) -> None:
     i = 0
     after = None
-    iterations = 1
-    new_posts_to_fetch = 10
-    if full_scan:
-        iterations = 10
-        new_posts_to_fetch = 50
+    iterations = plan.pages
+    new_posts_to_fetch = 50 if plan.full_scan else 10
     new_posts_count = 0
+    newest = None
+    reached_known_posts = False
     while i < iterations:
         futures: list = []
         try:
@@ -188,44 +361,27 @@ def _fetch_reddit_footballhighlights_videos(full_scan: bool = False) -> None:
             ### send_reddit_response_heartbeat()
             logger.info(f"{results} posts fetched...")
             lock = Lock()
-            local_new_posts_count = 0
-            old_posts_to_check_count = 0
-            for post in data["data"]["children"]:
-                post = post["data"]
-                # This if is to evaluate remove filter to flairs
-                html = post["selftext_html"]
-                if not html:
-                    continue
-                unescaped_html = unescape(html)
-                soup = BeautifulSoup(unescaped_html, "html.parser")
-                links_and_texts = [{"url": a["href"], "text": a.get_text()} for a in soup.find_all("a", href=True)]
-                post["links"] = links_and_texts
-                if len(links_and_texts) > 0:
-                    try:
-                        post_match = PostMatch.objects.get(permalink=post["permalink"])
-                        if post_match.videogoal and post_match.videogoal.next_mirrors_check < timezone.now():
-                            old_posts_to_check_count += 1
-                            future = executor.submit(
-                                find_footballhighlights_mirrors, post_match.videogoal, links_and_texts
-                            )
-                            futures.append(future)
-                    except PostMatch.DoesNotExist:
-                        local_new_posts_count += 1
-                        title = post["title"]
-                        title = _fix_title(title)
-                        post_created_date = datetime.datetime.fromtimestamp(post["created_utc"])
-                        # Allow matches to start one day after the post was created
-                        search_matches_until = post_created_date + timedelta(days=1)
-                        future = executor.submit(
-                            find_and_store_videogoal,
-                            post,
-                            title,
-                            search_matches_until,
-                            lock,
-                            VideoGoal.RedditSource.FootballHighlights,
-                            None,
-                        )
-                        futures.append(future)
+            mirror_checks, new_posts = _split_footballhighlights_posts(data["data"]["children"])
+            local_new_posts_count = len(new_posts)
+            old_posts_to_check_count = len(mirror_checks)
+            futures += [executor.submit(mirror_check) for mirror_check in mirror_checks]
+            # Parse all the new titles of the page at once (NER runs in a single batch)
+            prepared_posts = _prepare_new_posts(
+                [(post, title) for post, title, _ in new_posts], VideoGoal.RedditSource.FootballHighlights
+            )
+            for (post, title, search_matches_until), (known_match_id, parse_result) in zip(new_posts, prepared_posts):
+                future = executor.submit(
+                    find_and_store_videogoal,
+                    post,
+                    title,
+                    search_matches_until,
+                    lock,
+                    VideoGoal.RedditSource.FootballHighlights,
+                    None,
+                    parse_result,
+                    known_match_id,
+                )
+                futures.append(future)
         except Exception as ex:
             logger.error(f"Error fetching Reddit Football Highlights: {ex}")
             send_monitoring_message(
@@ -240,20 +396,24 @@ def _fetch_reddit_footballhighlights_videos(full_scan: bool = False) -> None:
         logger.info(f"{local_new_posts_count} are new posts of total {new_posts_count}")
         logger.info(f"{old_posts_to_check_count}/{results - local_new_posts_count} are old posts with mirror search")
         logger.info(f"{(end - start):.2f} elapsed")
+        newest = get_newest_post(newest, data["data"]["children"])
+        reached_known_posts = reaches_known_posts(plan, data["data"]["children"])
         after = data["data"]["after"]
         i += 1
+        if reached_known_posts or not after:
+            break
+    save_listing_cursor(plan, newest, reached_known_posts or not after)
     logger.info("Finished fetching r/footballhighlights videos")
 
 
-def _fetch_reddit_soccer_videos(full_scan: bool = False) -> None:
+def _fetch_reddit_soccer_videos(plan: ListingPlan) -> None:
     i = 0
     after = None
-    iterations = 1
-    new_posts_to_fetch = 25
-    if full_scan:
-        iterations = 10
-        new_posts_to_fetch = 100
+    iterations = plan.pages
+    new_posts_to_fetch = 100 if plan.full_scan else 25
     new_posts_count = 0
+    newest = None
+    reached_known_posts = False
     while i < iterations:
         start = timeit.default_timer()
         logger.info(f"Fetching Reddit r/soccer Videos {i + 1}/{iterations} | New Posts to fetch {new_posts_to_fetch}")
@@ -284,33 +444,27 @@ def _fetch_reddit_soccer_videos(full_scan: bool = False) -> None:
         send_reddit_response_heartbeat()
         logger.info(f"{results} posts fetched...")
         lock = Lock()
-        futures = []
-        old_posts_to_check_count = 0
-        local_new_posts_count = 0
-        for post in data["data"]["children"]:
-            post = post["data"]
-            if _should_process_post(post):
-                try:
-                    post_match = PostMatch.objects.get(permalink=post["permalink"])
-                    if post_match.videogoal and post_match.videogoal.next_mirrors_check < timezone.now():
-                        old_posts_to_check_count += 1
-                        future = executor.submit(find_soccer_mirrors, post_match.videogoal)
-                        futures.append(future)
-                except PostMatch.DoesNotExist:
-                    local_new_posts_count += 1
-                    title = post["title"]
-                    title = _fix_title(title)
-                    post_created_date = datetime.datetime.fromtimestamp(post["created_utc"])
-                    future = executor.submit(
-                        find_and_store_videogoal,
-                        post,
-                        title,
-                        post_created_date,
-                        lock,
-                        VideoGoal.RedditSource.Soccer,
-                        None,
-                    )
-                    futures.append(future)
+        mirror_checks, new_posts = _split_soccer_posts(data["data"]["children"])
+        local_new_posts_count = len(new_posts)
+        old_posts_to_check_count = len(mirror_checks)
+        futures = [executor.submit(mirror_check) for mirror_check in mirror_checks]
+        # Parse all the new titles of the page at once (NER runs in a single batch)
+        prepared_posts = _prepare_new_posts(
+            [(post, title) for post, title, _ in new_posts], VideoGoal.RedditSource.Soccer
+        )
+        for (post, title, post_created_date), (known_match_id, parse_result) in zip(new_posts, prepared_posts):
+            future = executor.submit(
+                find_and_store_videogoal,
+                post,
+                title,
+                post_created_date,
+                lock,
+                VideoGoal.RedditSource.Soccer,
+                None,
+                parse_result,
+                known_match_id,
+            )
+            futures.append(future)
         new_posts_count += local_new_posts_count
         concurrent.futures.wait(futures)
         end = timeit.default_timer()
@@ -318,28 +472,219 @@ def _fetch_reddit_soccer_videos(full_scan: bool = False) -> None:
         logger.info(f"{local_new_posts_count} are new posts of total {new_posts_count}")
         logger.info(f"{old_posts_to_check_count}/{results - local_new_posts_count} are old posts with mirror search")
         logger.info(f"{(end - start):.2f} elapsed")
+        newest = get_newest_post(newest, data["data"]["children"])
+        reached_known_posts = reaches_known_posts(plan, data["data"]["children"])
         after = data["data"]["after"]
         i += 1
+        if reached_known_posts or not after:
+            break
+    save_listing_cursor(plan, newest, reached_known_posts or not after)
     logger.info("Finished fetching r/soccer videos")
 
 
-def calculate_next_mirrors_check(videogoal: VideoGoal) -> None:
+def _split_soccer_posts(
+    children: list[dict],
+) -> tuple[list[Callable[[], bool]], list[tuple[dict, str, datetime.datetime]]]:
+    """
+    Splits the posts of a r/soccer listing page into the mirror searches due for the posts already saved and the
+    new posts (with their title and the date until which their match can start).
+    """
+    posts = [post["data"] for post in children if _should_process_post(post["data"])]
+    seen_posts, due_videogoals = _get_seen_posts([post["permalink"] for post in posts])
+    mirror_checks: list[Callable[[], bool]] = []
+    new_posts = []
+    for post in posts:
+        if post["permalink"] in due_videogoals:
+            mirror_checks.append(partial(find_soccer_mirrors, due_videogoals[post["permalink"]]))
+        elif post["permalink"] not in seen_posts:
+            title = _fix_title(post["title"])
+            post_created_date = datetime.datetime.fromtimestamp(post["created_utc"])
+            new_posts.append((post, title, post_created_date))
+    return mirror_checks, new_posts
+
+
+def _split_footballhighlights_posts(
+    children: list[dict],
+) -> tuple[list[Callable[[], bool]], list[tuple[dict, str, datetime.datetime]]]:
+    """
+    The same as _split_soccer_posts for a r/footballhighlights listing page, whose videos are the links of the post.
+    """
+    posts = []
+    for post in children:
+        post = post["data"]
+        # This if is to evaluate remove filter to flairs
+        html = post["selftext_html"]
+        if not html:
+            continue
+        links_and_texts = _get_html_links(html)
+        post["links"] = links_and_texts
+        if len(links_and_texts) > 0:
+            posts.append(post)
+    seen_posts, due_videogoals = _get_seen_posts([post["permalink"] for post in posts])
+    mirror_checks: list[Callable[[], bool]] = []
+    new_posts = []
+    for post in posts:
+        if post["permalink"] in due_videogoals:
+            mirror_checks.append(
+                partial(find_footballhighlights_mirrors, due_videogoals[post["permalink"]], post["links"])
+            )
+        elif post["permalink"] not in seen_posts:
+            title = _fix_title(post["title"])
+            post_created_date = datetime.datetime.fromtimestamp(post["created_utc"])
+            # Allow matches to start one day after the post was created
+            search_matches_until = post_created_date + timedelta(days=1)
+            new_posts.append((post, title, search_matches_until))
+    return mirror_checks, new_posts
+
+
+def _get_html_links(html: str) -> list[dict]:
+    return [{"url": url, "text": text} for text, url in extract_html_links(html)]
+
+
+def _get_seen_posts(permalinks: list[str]) -> tuple[set[str], dict[str, VideoGoal]]:
+    """
+    The permalinks of a listing page already processed (with a PostMatch), and the videos of the ones whose mirror
+    search is due (none with the mirrors scheduler, which searches them on its own). The posts not in SeenPosts are
+    looked up with a single query.
+    """
+    now = timezone.now()
+    seen_posts_cache = SeenPosts()
+    seen_posts = seen_posts_cache.get_not_due(permalinks, now)
+    due_videogoals: dict[str, VideoGoal] = {}
+    to_fetch = set(permalinks) - seen_posts
+    if len(to_fetch) == 0:
+        return seen_posts, due_videogoals
+    found: dict[str, datetime.datetime | None] = {}
+    for post_match in PostMatch.objects.filter(permalink__in=to_fetch).select_related("videogoal"):
+        videogoal = post_match.videogoal
+        found[post_match.permalink] = (
+            videogoal.next_mirrors_check if videogoal and not MIRRORS_SCHEDULER_ENABLED else None
+        )
+        seen_posts.add(post_match.permalink)
+        if videogoal and not MIRRORS_SCHEDULER_ENABLED and videogoal.next_mirrors_check < now:
+            due_videogoals[post_match.permalink] = videogoal
+    seen_posts_cache.add(found)
+    return seen_posts, due_videogoals
+
+
+def _get_post_video_url(post: dict, source: models.IntegerChoices) -> str | None:
+    if source == VideoGoal.RedditSource.FootballHighlights:
+        return post["links"][0]["url"] if post.get("links") else None
+    return post["url"]
+
+
+def _find_matches_by_known_urls(urls: list[str | None]) -> dict[str, int]:
+    """
+    Maps the hashes of the urls already stored as a video or a mirror to the id of their match.
+    """
+    url_hashes = {url_hash for url_hash in map(get_url_hash, urls) if url_hash is not None}
+    if len(url_hashes) == 0:
+        return {}
+    # Ordered by id, so the most recent video wins
+    known_matches = dict(
+        VideoGoal.objects.filter(url_hash__in=url_hashes).order_by("id").values_list("url_hash", "match_id")
+    )
+    mirrors_matches = VideoGoalMirror.objects.filter(url_hash__in=url_hashes - known_matches.keys()).values_list(
+        "url_hash", "videogoal__match_id"
+    )
+    for url_hash, match_id in mirrors_matches:
+        known_matches.setdefault(url_hash, match_id)
+    return known_matches
+
+
+def _prepare_new_posts(
+    posts_and_titles: list[tuple[dict, str]], source: models.IntegerChoices
+) -> list[tuple[int | None, TitleParseResult | None]]:
+    """
+    For each new post, returns the id of the match if its video url is already known,
+    otherwise the result of parsing its title.
+    """
+    if len(posts_and_titles) == 0:
+        return []
+    video_urls = [_get_post_video_url(post, source) for post, _ in posts_and_titles]
+    try:
+        known_matches = _find_matches_by_known_urls(video_urls)
+    except Exception as ex:
+        logger.error(f"Error finding matches by known urls: {ex}")
+        known_matches = {}
+    known_match_ids = [known_matches.get(get_url_hash(url)) if url else None for url in video_urls]  # type: ignore
+    to_parse = [i for i, match_id in enumerate(known_match_ids) if match_id is None]
+    logger.info(f"{len(posts_and_titles) - len(to_parse)}/{len(posts_and_titles)} new posts with known video urls")
+    parse_results: list[TitleParseResult | None] = [None] * len(posts_and_titles)
+    for i, parse_result in zip(to_parse, _parse_titles([posts_and_titles[i][1] for i in to_parse])):
+        parse_results[i] = parse_result
+    return list(zip(known_match_ids, parse_results))
+
+
+def _parse_titles(titles: list[str]) -> list[TitleParseResult | None]:
+    cache = TitleParseCache()
+    results = [cache.get(title) for title in titles]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if len(missing) == 0:
+        return results
+    try:
+        ner_results = NerEngine().extract([titles[i] for i in missing])
+    except NerUnavailableError as ex:
+        # Only the regex results, not cached so that the titles get their NER results once it is available again
+        logger.error(f"{ex}")
+        for i in missing:
+            results[i] = TitleParseResult(*extract_names_from_title_regex(titles[i]), None, None, None, None)
+        return results
+    except Exception as ex:
+        # Each worker will parse its own title
+        logger.error(f"Error running batched NER on {len(missing)} titles: {ex}")
+        return results
+    for i, ner_result in zip(missing, ner_results):
+        results[i] = TitleParseResult(*extract_names_from_title_regex(titles[i]), *ner_result)
+        cache.set(titles[i], results[i])  # type: ignore
+    return results
+
+
+def _parse_title(title: str) -> TitleParseResult:
+    cache = TitleParseCache()
+    result = cache.get(title)
+    if result is None:
+        try:
+            result = TitleParseResult(*extract_names_from_title_regex(title), *extract_names_from_title_ner(title))
+        except NerUnavailableError as ex:
+            # Not cached, as in _parse_titles
+            logger.error(f"{ex}")
+            return TitleParseResult(*extract_names_from_title_regex(title), None, None, None, None)
+        cache.set(title, result)
+    return result
+
+
+def calculate_next_mirrors_check(videogoal: VideoGoal, found_new_mirrors: bool | None = None) -> None:
+    """
+    Schedules the next mirror search of a video: more often while it's recent, and less with each search in a row that
+    found no new mirrors (found_new_mirrors is None before a search, which keeps the count).
+    """
+    if found_new_mirrors is not None:
+        videogoal.mirrors_checks_without_new = (
+            0 if found_new_mirrors else min(videogoal.mirrors_checks_without_new + 1, 20)
+        )
     now = timezone.now()
     created_how_long = now - videogoal.created_at
     intervals = [10, 30, 60, 120, 240]  # minutes
     durations = [1, 5, 10, 20, 30, 60]  # minutes
-    next_mirrors_check = now + datetime.timedelta(minutes=durations[-1])
+    duration = durations[-1]
     for i, interval in enumerate(intervals):
         if created_how_long < timedelta(minutes=interval):
-            next_mirrors_check = now + datetime.timedelta(minutes=durations[i])
+            duration = durations[i]
             break
-    videogoal.next_mirrors_check = next_mirrors_check
-    videogoal.save()
+    backoff = MIRRORS_CHECK_BACKOFF_MULTIPLIER**videogoal.mirrors_checks_without_new
+    duration = max(duration, min(duration * backoff, MIRRORS_CHECK_MAX_INTERVAL_MINUTES))
+    videogoal.next_mirrors_check = now + datetime.timedelta(minutes=duration)
+    # With the newest comment scanned by the search (find_soccer_mirrors / find_footballhighlights_mirrors)
+    videogoal.save(
+        update_fields=["next_mirrors_check", "mirrors_checks_without_new", "mirrors_scanned_until"]  # type: ignore
+    )
 
 
-def get_auto_moderator_comment_id(main_comments_link: str) -> str:
-    response = _make_reddit_api_request(main_comments_link)
-    data = json.loads(response.content)
+def get_auto_moderator_comment_id(main_comments_link: str, data: list | None = None) -> str:
+    if data is None:
+        response = _make_reddit_api_request(main_comments_link)
+        data = json.loads(response.content)
     auto_moderator_comments = [
         child
         for child in data[1]["data"]["children"]
@@ -355,32 +700,72 @@ def get_auto_moderator_comment_id(main_comments_link: str) -> str:
     return auto_moderator_comment["data"]["id"]
 
 
-def find_soccer_mirrors(videogoal: VideoGoal) -> bool:
+def get_mirrors_comments_url(videogoal: VideoGoal) -> str:
+    """
+    The first comments page requested by the mirror search of a video (prefetched by the mirrors scheduler): the
+    post's (to find the AutoModerator comment) or the replies to its AutoModerator comment on r/soccer, the post's on
+    r/footballhighlights.
+    """
+    main_comments_link = "https://oauth.reddit.com" + videogoal.post_match.permalink
+    if videogoal.source == VideoGoal.RedditSource.FootballHighlights:
+        return main_comments_link + "?sort=new"
+    if not videogoal.auto_moderator_comment_id:
+        return main_comments_link
+    children_url = main_comments_link + videogoal.auto_moderator_comment_id + "?sort=new"
+    # After the first search, only the newest replies (the ones until the last search)
+    if videogoal.mirrors_scanned_until is not None:
+        return children_url + f"&limit={MIRRORS_COMMENTS_LIMIT}"
+    return children_url
+
+
+def find_soccer_mirrors(videogoal: VideoGoal, comments: list | None = None) -> bool:
+    """
+    comments: the page of get_mirrors_comments_url, if already fetched.
+    """
     try:
         calculate_next_mirrors_check(videogoal)
+        mirrors_count = videogoal.mirrors.count()
         main_comments_link = "https://oauth.reddit.com" + videogoal.post_match.permalink
         if not videogoal.auto_moderator_comment_id:
-            videogoal.auto_moderator_comment_id = get_auto_moderator_comment_id(main_comments_link)
+            videogoal.auto_moderator_comment_id = get_auto_moderator_comment_id(main_comments_link, comments)
             videogoal.save()
+            # It was the post's page
+            comments = None
+        children_content = None
         try:
-            children_url = main_comments_link + videogoal.auto_moderator_comment_id
-            children_response = _make_reddit_api_request(children_url)
+            children_url = main_comments_link + videogoal.auto_moderator_comment_id + "?sort=new"
+            scanned_until = videogoal.mirrors_scanned_until
             try:
-                children = json.loads(children_response.content)
-                if (
-                    len(children) > 1
-                    and len(children[1]["data"]["children"]) > 0
-                    and "replies" in children[1]["data"]["children"][0]["data"]
-                    and isinstance(children[1]["data"]["children"][0]["data"]["replies"], dict)
+                if comments is None:
+                    children_content = _make_reddit_api_request(get_mirrors_comments_url(videogoal)).content
+                    comments = json.loads(children_content)
+                children = _get_auto_moderator_children(comments)
+                replies = _get_auto_moderator_replies(children)
+                if scanned_until is not None and (
+                    # The limit also counts the nested replies, and the rest of the replies are left in a "load
+                    # more comments" placeholder
+                    any(child.get("kind") == "more" for child in children)
+                    or (
+                        len(replies) >= MIRRORS_COMMENTS_LIMIT
+                        and all(_get_comment_time(reply["data"]) > scanned_until for reply in replies)
+                    )
                 ):
-                    replies = children[1]["data"]["children"][0]["data"]["replies"]["data"]["children"]
-                    for reply in replies:
+                    # More new replies than the limit: all of them
+                    children_content = _make_reddit_api_request(children_url).content
+                    replies = _get_auto_moderator_replies(_get_auto_moderator_children(json.loads(children_content)))
+                newest = scanned_until
+                for reply in replies:
+                    comment_time = _get_comment_time(reply["data"])
+                    if scanned_until is None or comment_time > scanned_until:
                         _parse_reply_for_mirrors(reply, videogoal)
+                    newest = comment_time if newest is None else max(newest, comment_time)
+                videogoal.mirrors_scanned_until = newest
+                calculate_next_mirrors_check(videogoal, videogoal.mirrors.count() > mirrors_count)
             except Exception as ex:
                 tb = traceback.format_exc()
                 logger.error(f"{tb}")
                 logger.error(f"{ex}")
-                logger.error(f"{children_response.content!r}")
+                logger.error(f"{children_content!r}")
                 return True
         except Exception as ex:
             tb = traceback.format_exc()
@@ -393,21 +778,64 @@ def find_soccer_mirrors(videogoal: VideoGoal) -> bool:
     return True
 
 
-def find_footballhighlights_mirrors(videogoal: VideoGoal, post_links: list | None = None) -> bool:
+def _get_auto_moderator_children(children: list) -> list[dict]:
+    """
+    The replies to the AutoModerator comment of its comments page, with the "load more comments" placeholders.
+    """
+    if (
+        len(children) > 1
+        and len(children[1]["data"]["children"]) > 0
+        and "replies" in children[1]["data"]["children"][0]["data"]
+        and isinstance(children[1]["data"]["children"][0]["data"]["replies"], dict)
+    ):
+        return children[1]["data"]["children"][0]["data"]["replies"]["data"]["children"]
+    return []
+
+
+def _get_auto_moderator_replies(children: list[dict]) -> list[dict]:
+    # Without the "load more comments" placeholders
+    return [reply for reply in children if reply.get("kind") == "t1"]
+
+
+def _get_comment_time(comment_data: dict) -> float:
+    """
+    When a comment (or post) was created, or edited if it was (an edit can add a mirror).
+    """
+    edited = comment_data.get("edited")
+    edited_time = edited if isinstance(edited, (int, float)) and not isinstance(edited, bool) else 0
+    return max(float(comment_data.get("created_utc") or 0), float(edited_time))
+
+
+def find_footballhighlights_mirrors(
+    videogoal: VideoGoal, post_links: list | None = None, comments: list | None = None
+) -> bool:
+    """
+    comments: the page of get_mirrors_comments_url, if already fetched.
+    """
     try:
         calculate_next_mirrors_check(videogoal)
+        mirrors_count = videogoal.mirrors.count()
+        scanned_until = videogoal.mirrors_scanned_until
+
+        data = comments
+        if data is None:
+            response = _make_reddit_api_request(get_mirrors_comments_url(videogoal))
+            data = json.loads(response.content)
+        if post_links is None:
+            # Not from the listing (mirrors scheduler): the post is the first element of the comments page
+            post = data[0]["data"]["children"][0]["data"]
+            post_links = []
+            if post.get("selftext_html") and (scanned_until is None or _get_comment_time(post) > scanned_until):
+                post_links = _get_html_links(post["selftext_html"])
 
         # Insert new mirrors on post body
-        if post_links:
-            for link in post_links:
-                _insert_or_update_mirror(videogoal, link["text"], link["url"], videogoal.author)
+        for link in post_links:
+            _insert_or_update_mirror(videogoal, link["text"], link["url"], videogoal.author)
 
-        main_comments_link = "https://oauth.reddit.com" + videogoal.post_match.permalink
-        response = _make_reddit_api_request(main_comments_link)
-        data = json.loads(response.content)
-        comments = data[1]["data"]["children"]
-        for comment in comments:
-            _parse_comment_for_mirrors(comment, videogoal)
+        newest = _parse_comments_for_mirrors(data[1]["data"]["children"], videogoal, scanned_until)
+        if newest is not None and (scanned_until is None or newest > scanned_until):
+            videogoal.mirrors_scanned_until = newest
+        calculate_next_mirrors_check(videogoal, videogoal.mirrors.count() > mirrors_count)
     except Exception as ex:
         logger.error(f"An exception as occurred trying to find mirrors. {ex}")
         send_monitoring_message(
@@ -419,86 +847,63 @@ def find_footballhighlights_mirrors(videogoal: VideoGoal, post_links: list | Non
     return True
 
 
-def _parse_comment_for_mirrors(comment: dict, videogoal: VideoGoal) -> None:
-    try:
-        comment_data = comment["data"]
-        html = comment_data["body_html"]
-        unescaped_html = unescape(html)
-        soup = BeautifulSoup(unescaped_html, "html.parser")
-        links_and_texts = [{"url": a["href"], "text": a.get_text()} for a in soup.find_all("a", href=True)]
-        for link in links_and_texts:
-            _insert_or_update_mirror(videogoal, link["text"], link["url"], comment_data["author"])
-        if (
-            "replies" in comment_data
-            and "data" in comment_data["replies"]
-            and "children" in comment_data["replies"]["data"]
-        ):
-            replies = comment_data["replies"]["data"]["children"]
-            for reply in replies:
-                _parse_comment_for_mirrors(reply, videogoal)
-    except Exception as ex:
-        logger.error(f"An exception as occurred parsing comment for mirrors. {ex}")
+def _parse_comments_for_mirrors(
+    comments: list, videogoal: VideoGoal, scanned_until: float | None = None
+) -> float | None:
+    """
+    Inserts the mirrors of the comments of a post and their replies as they are walked (depth first, without
+    recursion), skipping the comments already scanned (created or edited until scanned_until, their replies are still
+    scanned). The replies deeper than MIRRORS_COMMENTS_MAX_DEPTH and the comments after MIRRORS_COMMENTS_MAX_NODES are
+    not walked, and the errors of the comments are sent in a single monitoring message. Returns the time of the newest
+    comment walked.
+    """
+    newest = None
+    errors = []
+    nodes = 0
+    skipped = 0
+    # (comment, depth), the next one last
+    stack = [(comment, 0) for comment in reversed(comments)]
+    while stack:
+        comment, depth = stack.pop()
+        # Without the "load more comments" placeholders
+        if comment.get("kind") != "t1":
+            continue
+        if nodes >= MIRRORS_COMMENTS_MAX_NODES:
+            skipped += len(stack) + 1
+            break
+        nodes += 1
+        try:
+            comment_data = comment["data"]
+            comment_time = _get_comment_time(comment_data)
+            newest = comment_time if newest is None else max(newest, comment_time)
+            if scanned_until is None or comment_time > scanned_until:
+                for text, url in extract_html_links(comment_data["body_html"]):
+                    _insert_or_update_mirror(videogoal, text, url, comment_data["author"])
+            replies = comment_data.get("replies")
+            if isinstance(replies, dict) and "children" in replies.get("data", {}):
+                if depth >= MIRRORS_COMMENTS_MAX_DEPTH:
+                    skipped += len(replies["data"]["children"])
+                else:
+                    stack.extend((reply, depth + 1) for reply in reversed(replies["data"]["children"]))
+        except Exception as ex:
+            errors.append(f"{comment.get('data', {}).get('id')}: {ex!r}")
+    if skipped:
+        logger.warning(f"{skipped} comments not walked for the mirrors of video {videogoal.id} ({nodes} walked)")
+    if errors:
+        logger.error(f"{len(errors)} errors parsing the comments for the mirrors of video {videogoal.id}: {errors}")
         send_monitoring_message(
-            "*_parse_comment_for_mirrors exception*\n" + str(ex),
+            f"*_parse_comments_for_mirrors exceptions*\n{len(errors)} comments of video {videogoal.id}\n"
+            + "\n".join(errors[:MIRRORS_COMMENTS_ERRORS_SHOWN]),
             is_alert=True,
             disable_notification=True,
         )
+    return newest
 
 
 def _parse_reply_for_mirrors(reply: dict, videogoal: VideoGoal) -> None:
-    body = reply["data"]["body"]
     author = reply["data"]["author"]
-    stripped_body = os.linesep.join([s for s in body.splitlines() if s])
-    links = []
-    try:
-        doc = ETree.fromstring(markdown.markdown(stripped_body))
-    except Exception as ex:
-        if "junk after document element" not in str(ex):
-            tb = traceback.format_exc()
-            logger.error(f"{tb}")
-            logger.error(f"{ex}")
-    else:
-        links = doc.findall(".//a")
-
-    if len(links) > 0:
-        _extract_links_from_comment(author, links, videogoal)
-    else:
-        _extract_urls_from_comment(author, body, videogoal)
-
-
-def _extract_urls_from_comment(author: str, body: str, videogoal: VideoGoal) -> None:
-    for line in body.splitlines():
-        urls = re.findall(
-            r"https?://(?:[a-zA-Z0-9%=.,-_]|[!*(),]|%[0-9a-fA-F][0-9a-fA-F])+",
-            line,
-        )
-        if len(urls) > 0:
-            for url in urls:
-                val = URLValidator()
-                try:
-                    val(url)
-                    text = line.replace(url, "")
-                    if ":" in text:
-                        text = text.split(":", 1)[0]
-                    if text.endswith("(") and url.endswith(")"):
-                        text = text[:-1]
-                        url = url[:-1]
-                    _insert_or_update_mirror(videogoal, text, url, author)
-                except ValidationError:
-                    pass
-
-
-def _extract_links_from_comment(author: str, links: list, videogoal: VideoGoal) -> None:
-    for link in links:
-        val = URLValidator()
-        try:
-            val(link.get("href"))
-            text = link.text
-            if link and text and "http" in text and link.tail is not None and len(link.tail) > 0:
-                text = link.tail
-            _insert_or_update_mirror(videogoal, text, link.get("href"), author)
-        except ValidationError:
-            pass
+    for text, url in extract_reply_links(reply["data"]["body"]):
+        _insert_or_update_mirror(videogoal, text, url, author)
 
 
 def _insert_or_update_mirror(videogoal: VideoGoal, text: str | None, url: str, author: str) -> None:
@@ -530,6 +935,10 @@ def _insert_or_update_mirror(videogoal: VideoGoal, text: str | None, url: str, a
         )
 
 
+# Match fields that send_messages reads and writes under the lock
+MESSAGE_STATE_FIELDS = ["last_tweet_time", "last_tweet_text", "first_msg_sent", "highlights_msg_sent"]
+
+
 def send_messages(
     match: Match,
     videogoal: VideoGoal | None,
@@ -541,7 +950,14 @@ def send_messages(
     lock_obj = lock or nullcontext()
     with lock_obj:
         logger.info(f"SEND MESSAGE LOG: Using Lock [{lock}]")
-        match.refresh_from_db()
+        # Only the fields written under the lock, so that the related objects already loaded are kept
+        match.refresh_from_db(fields=MESSAGE_STATE_FIELDS)
+        # The match may be a copy from the start of the cycle, sent since by another video of it
+        if (MessageObject.MessageEventType.MatchFirstVideo == event_filter and match.first_msg_sent) or (
+            MessageObject.MessageEventType.MatchHighlights == event_filter and match.highlights_msg_sent
+        ):
+            logger.info(f"Message for match {match} already sent. Skipping!")
+            return
         logger.info(
             f"SEND MESSAGE LOG: Match {match} | "
             f"videogoal: {videogoal.id if videogoal else None} => {videogoal} | "
@@ -579,10 +995,10 @@ def send_messages(
                 f"last_tweet_time: {match.last_tweet_time} | "
                 f"last_tweet_text: {match.last_tweet_text}",
             )
-            match.save()
+            match.save(update_fields=["last_tweet_time", "last_tweet_text"])  # type: ignore
         if MessageObject.MessageEventType.MatchFirstVideo == event_filter and match is not None:
             match.first_msg_sent = True
-            match.save()
+            match.save(update_fields=["first_msg_sent"])  # type: ignore
         if MessageObject.MessageEventType.Video == event_filter and videogoal is not None:
             videogoal.msg_sent = True
             videogoal.save()
@@ -591,7 +1007,7 @@ def send_messages(
             videogoal_mirror.save()
         if MessageObject.MessageEventType.MatchHighlights == event_filter and match is not None:
             match.highlights_msg_sent = True
-            match.save()
+            match.save(update_fields=["highlights_msg_sent"])  # type: ignore
 
 
 def format_event_message(
@@ -604,34 +1020,35 @@ def format_event_message(
 def check_conditions(
     match: Match, videogoal: VideoGoal | None, videogoal_mirror: VideoGoalMirror | None, msg_obj: MessageObject
 ) -> bool:
+    # With the ids of the related objects, so that they are never loaded just for the check
     if msg_obj.include_categories.all().count() > 0 and (
-        match.category is None or not msg_obj.include_categories.filter(id=match.category.id).exists()
+        match.category_id is None or not msg_obj.include_categories.filter(id=match.category_id).exists()
     ):
         return False
     if msg_obj.include_tournaments.all().count() > 0 and (
-        match.tournament is None or not msg_obj.include_tournaments.filter(id=match.tournament.id).exists()
+        match.tournament_id is None or not msg_obj.include_tournaments.filter(id=match.tournament_id).exists()
     ):
         return False
     if msg_obj.include_teams.all().count() > 0 and (
-        (match.home_team is None and match.away_team is None)
+        (match.home_team_id is None and match.away_team_id is None)
         or (
-            not msg_obj.include_teams.filter(id=match.home_team.id).exists()
-            and not msg_obj.include_teams.filter(id=match.away_team.id).exists()
+            not msg_obj.include_teams.filter(id=match.home_team_id).exists()
+            and not msg_obj.include_teams.filter(id=match.away_team_id).exists()
         )
     ):
         return False
     if msg_obj.exclude_categories.all().count() > 0 and (
-        match.category is None or msg_obj.exclude_categories.filter(id=match.category.id).exists()
+        match.category_id is None or msg_obj.exclude_categories.filter(id=match.category_id).exists()
     ):
         return False
     if msg_obj.exclude_tournaments.all().count() > 0 and (
-        match.tournament is None or msg_obj.exclude_tournaments.filter(id=match.tournament.id).exists()
+        match.tournament_id is None or msg_obj.exclude_tournaments.filter(id=match.tournament_id).exists()
     ):
         return False
     if msg_obj.exclude_teams.all().count() > 0 and (
-        (match.home_team is None and match.away_team is None)
-        or msg_obj.exclude_teams.filter(id=match.home_team.id).exists()
-        or msg_obj.exclude_teams.filter(id=match.away_team.id).exists()
+        (match.home_team_id is None and match.away_team_id is None)
+        or msg_obj.exclude_teams.filter(id=match.home_team_id).exists()
+        or msg_obj.exclude_teams.filter(id=match.away_team_id).exists()
     ):
         return False
     if videogoal is not None and videogoal.source != msg_obj.source:
@@ -882,6 +1299,12 @@ def save_ner_log(
     log.save()
 
 
+def _get_match(match_id: int) -> Match | None:
+    match_window = get_match_window()
+    match = match_window.get(match_id) if match_window is not None else None
+    return match if match is not None else Match.objects.filter(id=match_id).first()
+
+
 def find_and_store_videogoal(
     post: dict,
     title: str,
@@ -889,44 +1312,69 @@ def find_and_store_videogoal(
     lock: Lock,
     source: models.IntegerChoices,
     match_date: datetime.datetime | None = None,
+    parse_result: TitleParseResult | None = None,
+    known_match_id: int | None = None,
 ) -> bool:
     if match_date is None:
         match_date = datetime.datetime.utcnow()
-    regex_home_team, regex_away_team, regex_minute = extract_names_from_title_regex(title)
-    ner_home_team, ner_away_team, ner_player, ner_minute = extract_names_from_title_ner(title)
+    if known_match_id is None and parse_result is None:
+        video_url = _get_post_video_url(post, source)
+        known_match_id = _find_matches_by_known_urls([video_url]).get(get_url_hash(video_url))  # type: ignore
+    if known_match_id is not None:
+        # The video was already posted, no need to search for the match (NER only runs when the regex has no minute)
+        logger.info(f"Known video url for match {known_match_id}: {title}")
+        known_match = _get_match(known_match_id)
+        if known_match is not None:
+            if parse_result is not None:
+                minute_str = parse_result.regex_minute
+            else:
+                _, _, minute_str = extract_names_from_title_regex(title)
+            if minute_str is None:
+                if parse_result is None:
+                    parse_result = _parse_title(title)
+                minute_str = parse_result.ner_minute
+                save_ner_log(
+                    title,
+                    parse_result.regex_home_team,
+                    parse_result.regex_away_team,
+                    parse_result.ner_home_team,
+                    parse_result.ner_away_team,
+                )
+            _save_found_match(known_match, minute_str, post, lock, source)
+            return True
+    if parse_result is None:
+        parse_result = _parse_title(title)
+    (
+        regex_home_team,
+        regex_away_team,
+        regex_minute,
+        ner_home_team,
+        ner_away_team,
+        ner_player,
+        ner_minute,
+    ) = parse_result
     save_ner_log(title, regex_home_team, regex_away_team, ner_home_team, ner_away_team)
-    matches_results = None
-    minute_str = None
+    # (home team, away team, minute) in order of trust: regex before NER, and the title order before the swapped one
+    hypotheses = []
     if regex_home_team and regex_away_team:
-        minute_str = regex_minute
-        matches_results = find_match(
-            regex_home_team,
-            regex_away_team,
-            to_date=max_match_date,
-            from_date=match_date,  # it will remove 72 hours inside
-        )
-        if not matches_results.exists():
-            matches_results = find_match(
-                regex_away_team,
-                regex_home_team,
-                to_date=max_match_date,
-                from_date=match_date,  # it will remove 72 hours inside
-            )
-    if (not matches_results or not matches_results.exists()) and ner_home_team and ner_away_team:
-        minute_str = ner_minute
-        matches_results = find_match(ner_home_team, ner_away_team, to_date=max_match_date, from_date=match_date)
-        if not matches_results.exists():
-            matches_results = find_match(
-                ner_away_team,
-                ner_home_team,
-                to_date=max_match_date,
-                from_date=match_date,
-            )
-    if matches_results and matches_results.exists():
-        if source == VideoGoal.RedditSource.Soccer:
-            _save_found_soccer_match(matches_results, minute_str, post, lock)
-        elif source == VideoGoal.RedditSource.FootballHighlights:
-            _save_found_footballhighlights_match(matches_results, minute_str, post, lock)
+        hypotheses += [
+            (regex_home_team, regex_away_team, regex_minute),
+            (regex_away_team, regex_home_team, regex_minute),
+        ]
+    if ner_home_team and ner_away_team:
+        hypotheses += [(ner_home_team, ner_away_team, ner_minute), (ner_away_team, ner_home_team, ner_minute)]
+    candidates = find_matches(
+        [(home_team, away_team) for home_team, away_team, _ in hypotheses],
+        to_date=max_match_date,
+        from_date=match_date,  # it will remove 72 hours inside
+    )
+    if len(candidates) > 0:
+        best_candidate = candidates[0]
+        found_home_team, found_away_team, minute_str = hypotheses[best_candidate.hypothesis]
+        if regex_home_team and regex_away_team and best_candidate.hypothesis < 2:
+            # Only the regex names (the first two hypotheses) are learned, the NER ones are not trusted enough
+            _learn_team_resolutions(found_home_team, found_away_team, best_candidate)
+        _save_found_match(best_candidate.match, minute_str, post, lock, source)
     elif (regex_home_team and regex_away_team) or (ner_home_team and ner_away_team):
         try:
             home_team = regex_home_team
@@ -944,13 +1392,30 @@ def find_and_store_videogoal(
     return True
 
 
-def _save_found_soccer_match(
-    matches_results: QuerySet, minute_str: str | None, post: dict, lock: Lock | None = None
+def _learn_team_resolutions(home_team: str, away_team: str, candidate: MatchCandidate) -> None:
+    if not TEAM_RESOLUTION_ENABLED or candidate.score < TEAM_RESOLUTION_MIN_LEARN_SCORE:
+        return
+    match = candidate.match
+    try:
+        TeamResolver().learn([(home_team, match.home_team_id), (away_team, match.away_team_id)])
+    except Exception as ex:
+        # Never lose the video because of it
+        logger.error(f"Error learning team resolutions of match {match.id}: {ex}")
+
+
+def _save_found_match(
+    match: Match, minute_str: str | None, post: dict, lock: Lock, source: models.IntegerChoices
 ) -> None:
-    match = matches_results.first()
+    if source == VideoGoal.RedditSource.Soccer:
+        _save_found_soccer_match(match, minute_str, post, lock)
+    elif source == VideoGoal.RedditSource.FootballHighlights:
+        _save_found_footballhighlights_match(match, minute_str, post, lock)
+
+
+def _save_found_soccer_match(match: Match, minute_str: str | None, post: dict, lock: Lock | None = None) -> None:
     if match.videogoal_set.count() == 0:
         match.first_video_datetime = timezone.now()
-        match.save()
+        match.save(update_fields=["first_video_datetime"])  # type: ignore
     videogoal = VideoGoal()
     videogoal.next_mirrors_check = timezone.now()
     videogoal.match = match
@@ -972,13 +1437,12 @@ def _save_found_soccer_match(
 
 
 def _save_found_footballhighlights_match(
-    matches_results: QuerySet, minute_str: str | None, post: dict, lock: Lock | None = None
+    match: Match, minute_str: str | None, post: dict, lock: Lock | None = None
 ) -> None:
     try:
-        match = matches_results.first()
         if match.videogoal_set.count() == 0:
             match.first_video_datetime = timezone.now()
-            match.save()
+            match.save(update_fields=["first_video_datetime"])  # type: ignore
         videogoal = VideoGoal()
         videogoal.next_mirrors_check = timezone.now()
         videogoal.match = match
@@ -1013,12 +1477,8 @@ def _handle_messages_to_send(match: Match, videogoal: VideoGoal | None = None, l
                 MessageObject.MessageEventType(MessageObject.MessageEventType.Video),
                 lock,
             )
-        if (
-            match.videogoal_set.count() > 0
-            and not match.first_msg_sent
-            and match.home_team.name_code is not None
-            and match.away_team.name_code is not None
-        ):
+        # The video is already saved, so the match has videos
+        if not match.first_msg_sent and match.home_team.name_code is not None and match.away_team.name_code is not None:
             send_messages(
                 match,
                 None,
@@ -1043,14 +1503,17 @@ def _handle_messages_to_send(match: Match, videogoal: VideoGoal | None = None, l
             )
 
 
+def _get_similar_name_q(team_name: str) -> Q:
+    normalized_name = normalize_name(team_name)
+    return Q(normalized_name__trigram_similar=normalized_name) | Q(
+        alias__normalized_alias__trigram_similar=normalized_name
+    )
+
+
 def _handle_not_found_match(away_team: str | None, home_team: str | None, post: dict) -> None:
     post_match = PostMatch.objects.create(permalink=post["permalink"])
-    home_team_obj = Team.objects.filter(
-        Q(name__unaccent__trigram_similar=home_team) | Q(alias__alias__unaccent__trigram_similar=home_team)
-    )
-    away_team_obj = Team.objects.filter(
-        Q(name__unaccent__trigram_similar=away_team) | Q(alias__alias__unaccent__trigram_similar=away_team)
-    )
+    home_team_obj = Team.objects.filter(_get_similar_name_q(home_team)) if home_team else Team.objects.none()
+    away_team_obj = Team.objects.filter(_get_similar_name_q(away_team)) if away_team else Team.objects.none()
     post_match.permalink = post["permalink"]
     post_match.title = (post["title"][:195] + "..") if len(post["title"]) > 195 else post["title"]
     post_match.home_team_str = home_team
@@ -1086,96 +1549,237 @@ def extract_names_from_title_regex(title: str) -> tuple[str | None, str | None,
     return None, None, None
 
 
-def find_match(home_team: str | None, away_team: str | None, to_date: date, from_date: date | None = None) -> QuerySet:
-    home_team = home_team or ""
-    away_team = away_team or ""
-    if from_date is None:
-        from_date = date.today()
-    prefix_affiliate_terms = AffiliateTerm.objects.filter(is_prefix=True).values_list("term", flat=True)
-    prefix_regex_string = r"^(" + r" |".join(prefix_affiliate_terms) + r" )"
+class MatchCandidate(NamedTuple):
+    match: Match
+    # Index of the (home team, away team) hypothesis that found the match
+    hypothesis: int
+    score: float
 
-    suffix_affiliate_terms = AffiliateTerm.objects.filter(is_prefix=False).values_list("term", flat=True)
-    suffix_regex_string = r"( " + r"| ".join(suffix_affiliate_terms) + r")$"
 
-    prefix_affiliate_home = re.findall(prefix_regex_string, home_team)
-    prefix_affiliate_away = re.findall(prefix_regex_string, away_team)
+def _get_affiliate_q(team_field: str, team_name: str) -> Q:
+    # An affiliate team (e.g. U19) in the title must be the same affiliate team in the match, and a main team a main
+    # team. The affiliate terms of the teams are precomputed in Team.affiliate_prefix / affiliate_suffix
+    affiliate_matcher = AffiliateMatcher()
+    return Q(
+        **{
+            f"{team_field}__affiliate_prefix": affiliate_matcher.get_prefix(team_name),
+            f"{team_field}__affiliate_suffix": affiliate_matcher.get_suffix(team_name),
+        }
+    )
 
-    suffix_affiliate_home = re.findall(suffix_regex_string, home_team)
-    suffix_affiliate_away = re.findall(suffix_regex_string, away_team)
 
-    matches = Match.objects.filter(datetime__gte=(from_date - timedelta(hours=72)), datetime__lte=to_date).filter(
-        Q(home_team__name__unaccent__trigram_similar=home_team)
-        | Q(home_team__short_name__unaccent__trigram_similar=home_team)
-        | Q(home_team__alias__alias__unaccent__trigram_similar=home_team),
-        Q(away_team__name__unaccent__trigram_similar=away_team)
-        | Q(away_team__short_name__unaccent__trigram_similar=away_team)
-        | Q(away_team__alias__alias__unaccent__trigram_similar=away_team),
+def _get_similar_team_q(team_field: str, team_name: str) -> Q:
+    # On the normalized columns, so that the trigram indexes can be used
+    normalized_name = normalize_name(team_name)
+    return (
+        Q(**{f"{team_field}__normalized_name__trigram_similar": normalized_name})
+        | Q(**{f"{team_field}__normalized_short_name__trigram_similar": normalized_name})
+        | Q(
+            Exists(
+                TeamAlias.objects.filter(
+                    team_id=OuterRef(f"{team_field}_id"), normalized_alias__trigram_similar=normalized_name
+                )
+            )
+        )
     )
-    matches = process_prefix_suffix_home(
-        matches,
-        prefix_affiliate_home,
-        prefix_regex_string,
-        suffix_affiliate_home,
-        suffix_regex_string,
+
+
+def _get_team_similarity(team_field: str, team_name: str) -> Func:
+    value = Value(normalize_name(team_name))
+    alias_similarity = (
+        TeamAlias.objects.filter(team_id=OuterRef(f"{team_field}_id"))
+        .annotate(similarity=TrigramSimilarity("normalized_alias", value))
+        .order_by("-similarity")
+        .values("similarity")[:1]
     )
-    matches = process_prefix_suffix_away(
-        matches,
-        prefix_affiliate_away,
-        prefix_regex_string,
-        suffix_affiliate_away,
-        suffix_regex_string,
+    return Greatest(
+        TrigramSimilarity(f"{team_field}__normalized_name", value),
+        TrigramSimilarity(f"{team_field}__normalized_short_name", value),
+        Coalesce(Subquery(alias_similarity), 0.0),
     )
-    return matches.order_by("-datetime")
 
 
-def process_prefix_suffix_home(
-    matches: QuerySet,
-    prefix_affiliate: list[str],
-    prefix_affiliate_regex: str,
-    suffix_affiliate: list[str],
-    suffix_affiliate_regex: str,
-) -> QuerySet:
-    if len(prefix_affiliate) > 0:
-        matches = matches.filter(home_team__name__istartswith=prefix_affiliate[0])
-    else:
-        matches = matches.exclude(home_team__name__iregex=prefix_affiliate_regex)
-    if len(suffix_affiliate) > 0:
-        matches = matches.filter(home_team__name__iendswith=suffix_affiliate[0])
-    else:
-        matches = matches.exclude(home_team__name__iregex=suffix_affiliate_regex)
-    return matches
-
-
-def process_prefix_suffix_away(
-    matches: QuerySet,
-    prefix_affiliate: list[str],
-    prefix_affiliate_regex: str,
-    suffix_affiliate: list[str],
-    suffix_affiliate_regex: str,
-) -> QuerySet:
-    if len(prefix_affiliate) > 0:
-        matches = matches.filter(away_team__name__istartswith=prefix_affiliate[0])
-    else:
-        matches = matches.exclude(away_team__name__iregex=prefix_affiliate_regex)
-    if len(suffix_affiliate) > 0:
-        matches = matches.filter(away_team__name__iendswith=suffix_affiliate[0])
+def _get_candidates_queryset(
+    hypotheses: list[tuple[str, str]], to_date: date, from_date: date
+) -> tuple[QuerySet, list[Q], list[dict[int, float]] | None]:
+    """
+    Query of the matches of every (home team, away team) hypothesis, annotated with the index of the first
+    hypothesis that each match satisfies, and the condition of each hypothesis. The candidates are taken from the
+    team index when it covers the dates (and their scores returned), otherwise the teams are compared by the database.
+    """
+    index_scores: list[dict[int, float]] | None = None
+    if TEAM_INDEX_ENABLED:
+        team_index = TeamIndex()
+        index_scores = []
+        for home_team, away_team in hypotheses:
+            # None when the dates are not covered by the index (e.g. old posts)
+            scores = team_index.find_match_scores(home_team, away_team, from_date - timedelta(hours=72), to_date)
+            if scores is None:
+                index_scores = None
+                break
+            index_scores.append(scores)
+    hypotheses_q = []
+    for i, (home_team, away_team) in enumerate(hypotheses):
+        hypothesis_q = _get_affiliate_q("home_team", home_team) & _get_affiliate_q("away_team", away_team)
+        if index_scores is not None:
+            hypothesis_q &= Q(id__in=list(index_scores[i]))
+        else:
+            hypothesis_q &= _get_similar_team_q("home_team", home_team) & _get_similar_team_q("away_team", away_team)
+        hypotheses_q.append(hypothesis_q)
+    matches = Match.objects.filter(reduce(operator.or_, hypotheses_q)).annotate(
+        hypothesis=Case(*[When(q, then=Value(i)) for i, q in enumerate(hypotheses_q)], output_field=IntegerField())
+    )
+    if index_scores is None:
+        matches = matches.filter(datetime__gte=(from_date - timedelta(hours=72)), datetime__lte=to_date)
+    return matches, hypotheses_q, index_scores
+
+
+def _has_affiliate_terms(team: Team | None, team_name: str) -> bool:
+    # The same as _get_affiliate_q, for a team already loaded
+    affiliate_matcher = AffiliateMatcher()
+    return (
+        team is not None
+        and team.affiliate_prefix == affiliate_matcher.get_prefix(team_name)
+        and team.affiliate_suffix == affiliate_matcher.get_suffix(team_name)
+    )
+
+
+def _get_match_window_candidates(
+    match_window: MatchWindow, hypotheses: list[tuple[str, str]], index_scores: list[dict[int, float]]
+) -> tuple[list[MatchCandidate], set[int]]:
+    """
+    Candidates of the team index taken from the match window, with the first hypothesis that each one satisfies
+    (as the query does), and the ids of the candidates that are not in the window.
+    """
+    candidates: dict[int, MatchCandidate] = {}
+    missing_ids = set()
+    for i, (home_team, away_team) in enumerate(hypotheses):
+        for match_id, score in index_scores[i].items():
+            if match_id in candidates or match_id in missing_ids:
+                continue
+            match = match_window.get(match_id)
+            if match is None:
+                missing_ids.add(match_id)
+            elif _has_affiliate_terms(match.home_team, home_team) and _has_affiliate_terms(match.away_team, away_team):
+                candidates[match_id] = MatchCandidate(match, i, score)
+    return list(candidates.values()), missing_ids
+
+
+def _find_resolved_matches(hypotheses: list[tuple[str, str]], to_date: date, from_date: date) -> list[MatchCandidate]:
+    """
+    Matches of the hypotheses with both team names already resolved to teams (TeamResolution), with exact team ids
+    instead of the fuzzy matching.
+    """
+    resolutions = TeamResolver().resolve([team_name for hypothesis in hypotheses for team_name in hypothesis])
+    hypotheses_q = [
+        (
+            Q(home_team_id__in=resolutions[home_team], away_team_id__in=resolutions[away_team])
+            # The same affiliate terms as the fuzzy matching (e.g. "Benfica" not resolved to Benfica B's matches)
+            & _get_affiliate_q("home_team", home_team) & _get_affiliate_q("away_team", away_team)
+            if resolutions[home_team] and resolutions[away_team]
+            else None
+        )
+        for home_team, away_team in hypotheses
+    ]
+    resolved_q = [(i, q) for i, q in enumerate(hypotheses_q) if q is not None]
+    if len(resolved_q) == 0:
+        return []
+    match_window = get_match_window()
+    if match_window is not None and match_window.covers(from_date - timedelta(hours=72), to_date):
+        window_candidates: dict[int, MatchCandidate] = {}
+        for i, (home_team, away_team) in enumerate(hypotheses):
+            if hypotheses_q[i] is None:
+                continue
+            for match in match_window.find(
+                resolutions[home_team], resolutions[away_team], from_date - timedelta(hours=72), to_date
+            ):
+                if _has_affiliate_terms(match.home_team, home_team) and _has_affiliate_terms(
+                    match.away_team, away_team
+                ):
+                    window_candidates.setdefault(match.id, MatchCandidate(match, i, 2.0))
+        # A match created after the window was loaded is found by the fuzzy matching
+        return sorted(window_candidates.values(), key=lambda c: (c.hypothesis, -c.match.datetime.timestamp()))
+    matches = Match.objects.filter(
+        reduce(operator.or_, [q for _, q in resolved_q]),
+        datetime__gte=(from_date - timedelta(hours=72)),
+        datetime__lte=to_date,
+    ).annotate(hypothesis=Case(*[When(q, then=Value(i)) for i, q in resolved_q], output_field=IntegerField()))
+    # Both names are exact, the same score as two names with similarity 1
+    candidates = [MatchCandidate(match, match.hypothesis, 2.0) for match in matches]
+    return sorted(candidates, key=lambda c: (c.hypothesis, -c.match.datetime.timestamp()))
+
+
+def find_matches(
+    hypotheses: list[tuple[str, str]], to_date: date, from_date: date | None = None
+) -> list[MatchCandidate]:
+    """
+    Finds the matches of several (home team, away team) hypotheses of the same title in a single query.
+    Returns the matches ranked by hypothesis (in the given order, as the first one is the most trusted),
+    similarity score and date (the most recent first).
+    The names already resolved to teams are checked first, and the fuzzy matching is only done without results.
+    """
+    if len(hypotheses) == 0:
+        return []
+    if from_date is None:
+        from_date = date.today()
+    if TEAM_RESOLUTION_ENABLED:
+        resolved_candidates = _find_resolved_matches(hypotheses, to_date, from_date)
+        if len(resolved_candidates) > 0:
+            return resolved_candidates
+    matches, hypotheses_q, index_scores = _get_candidates_queryset(hypotheses, to_date, from_date)
+    candidates: list[MatchCandidate] = []
+    if index_scores is not None:
+        if not any(index_scores):
+            # No candidates in the index, no need to query the database
+            return []
+        match_window = get_match_window()
+        if match_window is not None:
+            candidates, missing_ids = _get_match_window_candidates(match_window, hypotheses, index_scores)
+            # Only the matches created after the window was loaded are left for the database
+            matches = matches.filter(id__in=missing_ids) if missing_ids else Match.objects.none()
     else:
-        matches = matches.exclude(away_team__name__iregex=suffix_affiliate_regex)
-    return matches
+        matches = matches.annotate(
+            similarity_score=Case(
+                *[
+                    When(
+                        q,
+                        then=(
+                            _get_team_similarity("home_team", home_team) + _get_team_similarity("away_team", away_team)
+                        ),
+                    )
+                    for q, (home_team, away_team) in zip(hypotheses_q, hypotheses)
+                ],
+                output_field=FloatField(),
+            )
+        )
+    candidates += [
+        MatchCandidate(
+            match,
+            match.hypothesis,
+            index_scores[match.hypothesis][match.id] if index_scores is not None else match.similarity_score,
+        )
+        for match in matches
+    ]
+    return sorted(candidates, key=lambda c: (c.hypothesis, -c.score, -c.match.datetime.timestamp()))
+
+
+def find_match(home_team: str | None, away_team: str | None, to_date: date, from_date: date | None = None) -> QuerySet:
+    if from_date is None:
+        from_date = date.today()
+    matches, _, _ = _get_candidates_queryset([(home_team or "", away_team or "")], to_date, from_date)
+    return matches.order_by("-datetime")
 
 
 def _fetch_data_from_reddit_api(after: str | None, subreddit: str, new_posts_to_fetch: int) -> requests.Response:
-    headers = RedditHeaders().get_headers()
     url = f"https://oauth.reddit.com/r/{subreddit}/new?limit={new_posts_to_fetch}"
     if after:
         url += f"&after={after}"
-    response = requests.get(url, headers=headers)
+    response = RedditClient().get(url, timeout=REDDIT_LISTING_TIMEOUT)
     return response
 
 
 def _make_reddit_api_request(link: str) -> requests.Response:
-    headers = RedditHeaders().get_headers()
-    response = requests.get(link, headers=headers, timeout=5)
+    response = RedditClient().get(link)
     return response
 
 
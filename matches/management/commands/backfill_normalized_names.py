@@ -0,0 +1,52 @@
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from matches.models import Team, TeamAlias
+from matches.utils import normalize_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the normalized names of the teams and aliases that the trigram lookups are made on "
+        "(after a change of normalize_name or an update that bypassed save())"
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        batch_size: int = options["batch_size"]  # type: ignore
+        self._backfill(Team, {"name": "normalized_name", "short_name": "normalized_short_name"}, batch_size)
+        self._backfill(TeamAlias, {"alias": "normalized_alias"}, batch_size)
+
+    def _backfill(self, model: type[models.Model], fields: dict[str, str], batch_size: int) -> None:
+        checked = 0
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_id)  # type: ignore
+                .only("pk", *fields.keys(), *fields.values())
+                .order_by("pk")[:batch_size]
+            )
+            if len(batch) == 0:
+                break
+            changed = []
+            for instance in batch:
+                is_changed = False
+                for field, normalized_field in fields.items():
+                    normalized = normalize_name(getattr(instance, field))
+                    if getattr(instance, normalized_field) != normalized:
+                        setattr(instance, normalized_field, normalized)
+                        is_changed = True
+                if is_changed:
+                    changed.append(instance)
+            if changed:
+                # Only the rows that changed, so that a re-run doesn't rewrite (and re-index) the whole table
+                model.objects.bulk_update(changed, list(fields.values()))  # type: ignore
+            checked += len(batch)
+            updated += len(changed)
+            last_id = batch[-1].pk
+            self.stdout.write(f"{model.__name__}: {checked} checked | {updated} normalized names updated")
@@ -0,0 +1,35 @@
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from matches.models import VideoGoal, VideoGoalMirror
+from matches.utils import get_url_hash
+
+
+class Command(BaseCommand):
+    help = "Fills the url_hash of the videos and mirrors saved before it existed"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        batch_size: int = options["batch_size"]  # type: ignore
+        models_to_backfill: list[type[models.Model]] = [VideoGoal, VideoGoalMirror]
+        for model in models_to_backfill:
+            updated = 0
+            last_id = 0
+            while True:
+                batch = list(
+                    model.objects.filter(id__gt=last_id, url_hash__isnull=True, url__isnull=False)
+                    .only("id", "url")
+                    .order_by("id")[:batch_size]
+                )
+                if len(batch) == 0:
+                    break
+                for instance in batch:
+                    instance.url_hash = get_url_hash(instance.url)
+                model.objects.bulk_update(batch, ["url_hash"])
+                updated += len(batch)
+                last_id = batch[-1].id
+                self.stdout.write(f"{model.__name__}: {updated} url hashes updated")
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import timeit
+from argparse import ArgumentParser
+from html import unescape
+from typing import Callable
+from xml.etree import ElementTree as ETree
+
+import markdown
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.mirror_links import extract_html_links, extract_reply_links
+
+CORPUS_PATH = os.path.join("goals_zone", "test", "mirror_links.json")
+
+
+def parse_html_with_beautifulsoup(html: str) -> list:
+    soup = BeautifulSoup(unescape(html), "html.parser")
+    return [(a.get_text(), a["href"]) for a in soup.find_all("a", href=True)]
+
+
+def parse_reply_with_markdown(body: str) -> list:
+    try:
+        return ETree.fromstring(markdown.markdown(os.linesep.join(s for s in body.splitlines() if s))).findall(".//a")
+    except ETree.ParseError:
+        return []
+
+
+def time_per_item(function: Callable, items: list[str], number: int) -> float:
+    """
+    Microseconds per item of the function over all the items.
+    """
+    seconds = timeit.timeit(lambda: [function(item) for item in items], number=number)
+    return seconds * 1_000_000 / (number * len(items))
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the mirror links extraction over the golden corpus, against the BeautifulSoup and markdown + "
+        "ElementTree parsing, and fails if its results differ from the corpus"
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--number", type=int, default=20, help="Passes over the corpus to time")
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        with open(os.path.join(settings.BASE_DIR, CORPUS_PATH)) as corpus_file:
+            corpus = json.load(corpus_file)
+        htmls = [case["html"] for case in corpus["html"]]
+        replies = [case["body"] for case in corpus["replies"]]
+
+        # The replies that are not valid markdown log an error on every call
+        logging.getLogger("matches.mirror_links").setLevel(logging.CRITICAL)
+        errors = [
+            f"Different links for html {case['html']!r}"
+            for case in corpus["html"]
+            if [list(link) for link in extract_html_links(case["html"])] != case["links"]
+        ]
+        errors += [
+            f"Different links for reply {case['body']!r}"
+            for case in corpus["replies"]
+            if [list(link) for link in extract_reply_links(case["body"])] != case["links"]
+        ]
+        if errors:
+            raise CommandError("\n".join(errors))
+
+        number: int = options["number"]  # type: ignore
+        timings: list[tuple[str, list[str], Callable, Callable]] = [
+            ("html", htmls, parse_html_with_beautifulsoup, extract_html_links),
+            ("replies", replies, parse_reply_with_markdown, extract_reply_links),
+        ]
+        self.stdout.write(f"{'corpus':>8} {'before [us]':>12} {'after [us]':>11} {'speedup':>8}")
+        for name, items, before, after in timings:
+            before_us = time_per_item(before, items, number)
+            after_us = time_per_item(after, items, number)
+            self.stdout.write(f"{name:>8} {before_us:>12.1f} {after_us:>11.1f} {before_us / after_us:>7.1f}x")
+        self.stdout.write(self.style.SUCCESS("Mirror links match the golden corpus"))
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loads what a web worker loads before serving the first request
+WEB_STARTUP_CODE = (
+    "from goals_zone.wsgi import application\n"
+    "from django.urls import get_resolver\n"
+    "from django_hosts.resolvers import get_host_patterns\n"
+    "get_resolver().url_patterns\n"
+    "get_host_patterns()\n"
+)
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int, bool]]:
+    """
+    Parses the stderr of `python -X importtime` into (module, self_us, cumulative_us, is_top_level).
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:") :].split("|", 2)
+            # Nested imports are indented by two extra spaces per level
+            is_top_level = not module.startswith("  ")
+            imports.append((module.strip(), int(self_us), int(cumulative_us), is_top_level))
+        except ValueError:
+            # Header line ("self [us] | cumulative | imported package")
+            continue
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Profiles the imports of a web worker startup (python -X importtime) "
+        "and fails if modules that only the ingestion worker needs are imported"
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to show")
+        parser.add_argument(
+            "--max-ms",
+            type=float,
+            default=None,
+            help="Fail if the total import time is higher than this (in milliseconds)",
+        )
+        parser.add_argument(
+            "--forbidden",
+            nargs="*",
+            default=None,
+            help="Top-level modules that should not be imported (defaults to WEB_FORBIDDEN_IMPORTS)",
+        )
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        forbidden = options["forbidden"] if options["forbidden"] is not None else settings.WEB_FORBIDDEN_IMPORTS
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "goals_zone.settings")}
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", WEB_STARTUP_CODE],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Error loading the web application:\n{process.stderr[-5000:]}")
+        imports = parse_importtime(process.stderr)
+        # Cumulative times of the top-level imports add up to the total import time
+        total_us = sum(cumulative_us for _, _, cumulative_us, is_top_level in imports if is_top_level)
+
+        self.stdout.write(f"{len(imports)} modules imported in {total_us / 1000:.1f}ms")
+        self.stdout.write(f"{'cumulative [ms]':>16} {'self [ms]':>10}  module")
+        slowest_imports = sorted(imports, key=lambda i: i[2], reverse=True)[: options["top"]]  # type: ignore
+        for module, self_us, cumulative_us, _ in slowest_imports:
+            self.stdout.write(f"{cumulative_us / 1000:>16.1f} {self_us / 1000:>10.1f}  {module}")
+
+        errors = []
+        imported_roots = {module.split(".")[0] for module, _, _, _ in imports}
+        forbidden_imported = sorted(set(forbidden) & imported_roots)  # type: ignore
+        if forbidden_imported:
+            errors.append(f"Forbidden modules imported by the web startup: {', '.join(forbidden_imported)}")
+        if options["max_ms"] is not None and total_us / 1000 > options["max_ms"]:  # type: ignore
+            errors.append(f"Total import time {total_us / 1000:.1f}ms is higher than {options['max_ms']}ms")
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("Web startup imports OK"))
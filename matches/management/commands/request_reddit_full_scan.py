@@ -0,0 +1,20 @@
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from matches.models import RedditListingCursor
+
+SUBREDDITS = ["soccer", "footballhighlights"]
+
+
+class Command(BaseCommand):
+    help = "Makes the next Reddit ingestion run of the subreddits a full scan of their /new listing (to recover a gap)"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("subreddits", nargs="*", choices=SUBREDDITS, default=SUBREDDITS)
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        subreddits: list[str] = options["subreddits"]  # type: ignore
+        for subreddit in subreddits:
+            RedditListingCursor.objects.update_or_create(subreddit=subreddit, defaults={"needs_full_scan": True})
+            self.stdout.write(f"r/{subreddit}: full scan requested")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from matches.scheduling import RECURRING_TASKS, schedule_recurring_tasks
+
+
+class Command(BaseCommand):
+    help = "Schedules the recurring background tasks that are not scheduled yet (safe to run more than once)"
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        scheduled = schedule_recurring_tasks()
+        for verbose_name in scheduled:
+            self.stdout.write(f"Scheduled {verbose_name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(scheduled)} tasks scheduled, {len(RECURRING_TASKS) - len(scheduled)} already existed"
+            )
+        )
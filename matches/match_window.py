@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import copy
+import datetime
+import logging
+import timeit
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import MappingProxyType
+
+from django.conf import settings
+from django.utils import timezone
+
+from matches.models import Match
+from matches.utils import to_aware_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class MatchWindow:
+    """
+    Immutable snapshot of the matches around now, with their teams, tournament and category, loaded once at the start
+    of a Reddit ingestion cycle and shared by all its threads, so that the matching and the messages of every post
+    don't query them again.
+
+    The matches are handed out as copies, so that a thread can update (and save) its own copy.
+    """
+
+    def __init__(self, from_datetime: datetime.datetime, to_datetime: datetime.datetime) -> None:
+        start = timeit.default_timer()
+        matches = Match.objects.filter(datetime__gte=from_datetime, datetime__lte=to_datetime).select_related(
+            "home_team", "away_team", "tournament", "category"
+        )
+        self._matches = MappingProxyType({match.id: match for match in matches})
+        matches_by_home_team: dict[int, list[int]] = defaultdict(list)
+        for match in self._matches.values():
+            if match.home_team_id is not None:
+                matches_by_home_team[match.home_team_id].append(match.id)
+        self._matches_by_home_team = MappingProxyType(
+            {team_id: tuple(match_ids) for team_id, match_ids in matches_by_home_team.items()}
+        )
+        self.from_datetime = from_datetime
+        self.to_datetime = to_datetime
+        self.built_at = timezone.now()
+        self.build_seconds = timeit.default_timer() - start
+
+    @staticmethod
+    def build() -> MatchWindow:
+        now = timezone.now()
+        return MatchWindow(
+            now - datetime.timedelta(hours=settings.MATCH_WINDOW_PAST_HOURS),
+            now + datetime.timedelta(hours=settings.MATCH_WINDOW_FUTURE_HOURS),
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self._matches)
+
+    def covers(self, from_date: datetime.date, to_date: datetime.date) -> bool:
+        return self.from_datetime <= to_aware_datetime(from_date) and to_aware_datetime(to_date) <= self.to_datetime
+
+    def get(self, match_id: int) -> Match | None:
+        match = self._matches.get(match_id)
+        return copy.copy(match) if match is not None else None
+
+    def find(
+        self,
+        home_team_ids: frozenset[int],
+        away_team_ids: frozenset[int],
+        from_date: datetime.date,
+        to_date: datetime.date,
+    ) -> list[Match]:
+        """
+        Matches between from_date and to_date of any of the home teams against any of the away teams.
+        """
+        from_datetime = to_aware_datetime(from_date)
+        to_datetime = to_aware_datetime(to_date)
+        return [
+            copy.copy(self._matches[match_id])
+            for home_team_id in home_team_ids
+            for match_id in self._matches_by_home_team.get(home_team_id, ())
+            if self._matches[match_id].away_team_id in away_team_ids
+            and from_datetime <= self._matches[match_id].datetime <= to_datetime
+        ]
+
+
+_current_match_window: MatchWindow | None = None
+
+
+def get_match_window() -> MatchWindow | None:
+    """
+    The match window of the running ingestion cycle (None outside of one).
+    """
+    return _current_match_window
+
+
+@contextmanager
+def preloaded_match_window() -> Iterator[MatchWindow | None]:
+    """
+    Loads the match window for the duration of an ingestion cycle. Without it (disabled or failed to load), the
+    matches are read from the database as always.
+    """
+    global _current_match_window
+    match_window = None
+    if settings.MATCH_WINDOW_ENABLED:
+        try:
+            match_window = MatchWindow.build()
+            logger.info(f"Match window loaded: {match_window.size} matches | {match_window.build_seconds:.2f} elapsed")
+        except Exception as ex:
+            logger.error(f"Error loading match window: {ex}")
+    _current_match_window = match_window
+    try:
+        yield match_window
+    finally:
+        _current_match_window = None
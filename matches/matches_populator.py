@@ -6,7 +6,8 @@ from json import JSONDecodeError
 
 import requests
 from background_task import background
-from background_task.models import CompletedTask, Task
+from background_task.models import Task
+from django.conf import settings
 from django.db.models import Count
 from fake_headers import Headers
 
@@ -16,6 +17,8 @@ from msg_events.models import MessageObject
 from .goals_populator import _handle_messages_to_send, send_monitoring_message
 from .models import Category, Match, Season, Team, Tournament
 from .proxy_request import ProxyRequest
+from .scheduling import claim_if_due, mark_as_run, record_task_run
+from .team_index import TeamIndex
 
 logger = logging.getLogger(__name__)
 
@@ -171,14 +174,22 @@ def is_true_data(
     return True
 
 
-def fetch_data(completed: int, browse_scraping: bool = False) -> list:
+def get_scan_type() -> str:
+    if claim_if_due("sofascore_full_day_inverse", settings.SOFASCORE_FULL_DAY_INVERSE_SCAN_INTERVAL):
+        # Every 3 hours. It also covers the full day scan
+        mark_as_run("sofascore_full_day")
+        return "full_day_inverse"
+    if claim_if_due("sofascore_full_day", settings.SOFASCORE_FULL_DAY_SCAN_INTERVAL):
+        # Every 30 minutes
+        return "full_day"
+    return "live"
+
+
+def fetch_data(scan_type: str, browse_scraping: bool = False) -> list:
     start = timeit.default_timer()
-    # The task is now every 10 minutes
-    if completed % 36 == 0:
-        # Every 6 hours (360 minutes)
+    if scan_type == "full_day_inverse":
         events = fetch_full_day(inverse=True, browse_scraping=browse_scraping)
-    elif completed % 6 == 0:
-        # Every hour (60 minutes)
+    elif scan_type == "full_day":
         events = fetch_full_day(inverse=False, browse_scraping=browse_scraping)
     else:
         events = fetch_live(browse_scraping=browse_scraping)
@@ -191,13 +202,15 @@ def fetch_data(completed: int, browse_scraping: bool = False) -> list:
 # To fetch yesterday and today: days_ago=1, days_amount=2
 # To fetch today and tomorrow: days_ago=0, days_amount=2
 def fetch_matches_from_sofascore() -> None:
-    completed = CompletedTask.objects.filter(task_name="matches.matches_populator.fetch_new_matches").count()
+    runs = record_task_run("matches.matches_populator.fetch_new_matches")
+    scan_type = get_scan_type()
+    logger.info(f"fetch_matches_from_sofascore runs: {runs} | Scan: {scan_type}")
 
-    events = fetch_data(completed)
+    events = fetch_data(scan_type)
     true_data = is_true_data(events)
     if not true_data:
         logger.info("Going to try with browse scraping...")
-        events = fetch_data(completed, browse_scraping=True)
+        events = fetch_data(scan_type, browse_scraping=True)
         true_data = is_true_data(events, is_fallback=True)
 
     if true_data:
@@ -444,6 +457,8 @@ def _save_or_update_match(match: Match) -> None:
             status=match.status,
         )
         for i_match in matches:
+            # update() doesn't send post_save
+            TeamIndex().update_match(i_match)
             _handle_messages_to_send(i_match, videogoal=None)
     else:
         match.save()
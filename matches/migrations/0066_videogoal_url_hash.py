@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0065_videogoal_link_title"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videogoal",
+            name="url_hash",
+            field=models.CharField(db_index=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name="videogoalmirror",
+            name="url_hash",
+            field=models.CharField(db_index=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0066_videogoal_url_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SchedulerState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("run_count", models.PositiveIntegerField(default=0)),
+                ("last_run_at", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
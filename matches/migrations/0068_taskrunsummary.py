@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0067_schedulerstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskRunSummary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("task_name", models.CharField(max_length=190)),
+                ("day", models.DateField()),
+                ("run_count", models.PositiveIntegerField(default=0)),
+                ("failed_count", models.PositiveIntegerField(default=0)),
+                ("mean_start_delay_seconds", models.FloatField(default=0)),
+                ("p95_start_delay_seconds", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="taskrunsummary",
+            constraint=models.UniqueConstraint(fields=("task_name", "day"), name="unique_task_run_summary_day"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:45
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+
+def classify_teams_forward(apps: list, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Same as matches.affiliates.classify_teams_affiliates, with the models of this migration
+    team_model = apps.get_model("matches", "Team")  # type: ignore
+    affiliate_term_model = apps.get_model("matches", "AffiliateTerm")  # type: ignore
+    terms = sorted(affiliate_term_model.objects.values_list("term", "is_prefix"), key=lambda t: len(t[0]))
+    for term, is_prefix in terms:
+        if is_prefix:
+            team_model.objects.filter(name__istartswith=f"{term} ").update(affiliate_prefix=term)
+        else:
+            team_model.objects.filter(name__iendswith=f" {term}").update(affiliate_suffix=term)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0068_taskrunsummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="affiliate_prefix",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=25),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="affiliate_suffix",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=25),
+        ),
+        migrations.RunPython(classify_teams_forward, migrations.RunPython.noop),
+    ]
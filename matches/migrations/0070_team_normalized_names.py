@@ -0,0 +1,81 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:48
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+from matches.utils import normalize_name
+
+
+def normalize_names_forward(apps: list, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Same as the backfill_normalized_names command, before the indexes are built
+    team_model = apps.get_model("matches", "Team")  # type: ignore
+    team_alias_model = apps.get_model("matches", "TeamAlias")  # type: ignore
+    teams = list(team_model.objects.only("id", "name", "short_name"))
+    for team in teams:
+        team.normalized_name = normalize_name(team.name)
+        team.normalized_short_name = normalize_name(team.short_name)
+    team_model.objects.bulk_update(teams, ["normalized_name", "normalized_short_name"], batch_size=2000)
+    aliases = list(team_alias_model.objects.only("id", "alias"))
+    for alias in aliases:
+        alias.normalized_alias = normalize_name(alias.alias)
+    team_alias_model.objects.bulk_update(aliases, ["normalized_alias"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0069_team_affiliate_terms"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="team",
+            name="team_name_ln_gin_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="team",
+            name="team_short_name_ln_gin_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="teamalias",
+            name="team_alias_ln_gin_idx",
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="normalized_name",
+            field=models.CharField(blank=True, default="", max_length=256),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="normalized_short_name",
+            field=models.CharField(blank=True, default="", max_length=256),
+        ),
+        migrations.AddField(
+            model_name="teamalias",
+            name="normalized_alias",
+            field=models.CharField(blank=True, default="", max_length=256),
+        ),
+        migrations.RunPython(normalize_names_forward, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="team",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass("normalized_name", name="gin_trgm_ops"),
+                name="team_norm_name_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="team",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass("normalized_short_name", name="gin_trgm_ops"),
+                name="team_norm_short_name_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="teamalias",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass("normalized_alias", name="gin_trgm_ops"),
+                name="team_alias_norm_trgm_idx",
+            ),
+        ),
+    ]
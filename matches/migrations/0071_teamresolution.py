@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-17 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0070_team_normalized_names"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamResolution",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fragment", models.CharField(max_length=256)),
+                ("hit_count", models.PositiveIntegerField(default=0)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+                (
+                    "team",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="resolutions", to="matches.team"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="teamresolution",
+            constraint=models.UniqueConstraint(fields=("fragment", "team"), name="unique_team_resolution"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-17 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0071_teamresolution"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RedditListingCursor",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subreddit", models.CharField(max_length=50, unique=True)),
+                ("last_fullname", models.CharField(blank=True, default="", max_length=20)),
+                ("last_created_utc", models.FloatField(null=True)),
+                ("needs_full_scan", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
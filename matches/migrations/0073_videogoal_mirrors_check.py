@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0072_redditlistingcursor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videogoal",
+            name="mirrors_checks_without_new",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="videogoal",
+            index=models.Index(fields=["created_at", "next_mirrors_check"], name="videogoal_mirrors_check_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matches", "0073_videogoal_mirrors_check"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videogoal",
+            name="mirrors_scanned_until",
+            field=models.FloatField(null=True),
+        ),
+    ]
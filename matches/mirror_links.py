@@ -0,0 +1,163 @@
+"""
+Extraction of the (text, url) mirror links of the Reddit comments: from their rendered html (body_html) and from their
+markdown (body), with the same results as the BeautifulSoup and markdown + ElementTree parsing it replaces (see the
+golden corpus in goals_zone/test/mirror_links.json and the benchmark_mirror_links command).
+"""
+
+import logging
+import re
+import threading
+from html import unescape
+
+import markdown
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from lxml import etree
+from lxml import html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+# The urls written as plain text (when a reply has no markdown links)
+TEXT_URL_REGEX = re.compile(r"https?://(?:[a-zA-Z0-9%=.,-_]|[!*(),]|%[0-9a-fA-F][0-9a-fA-F])+")
+# A markdown inline link without title, spaces or parentheses in its url: [text](url)
+SIMPLE_LINK_REGEX = re.compile(r"\[([^\[\]\n]*)\]\(([^\s()<>\"'\\]+)\)")
+# Anything else of the markdown syntax (emphasis, code, html, escapes, entities, images) needs the markdown parser
+MARKDOWN_SYNTAX_REGEX = re.compile(r"[*_`\\<>&]|!\[")
+# Lines that can start a block other than a paragraph (headers, quotes, lists, code, setext underlines)
+MARKDOWN_BLOCK_REGEX = re.compile(r"^(?:\s|[#>+=\-|]|\d)")
+
+ASCII_SPACES = str.maketrans("", "", " \n\t\x0c\r")
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+
+# Stateless once created, so shared by all the threads
+_url_validator = URLValidator()
+_local = threading.local()
+
+
+def is_valid_url(url: str | None) -> bool:
+    try:
+        _url_validator(url)
+    except ValidationError:
+        return False
+    return True
+
+
+def _normalize_text(text: str, preserve_whitespace: bool) -> str:
+    # As BeautifulSoup does, a string of only whitespace becomes a single newline or space
+    if preserve_whitespace or text.translate(ASCII_SPACES) != "":
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _get_element_text(element: lxml_html.HtmlElement, preserve_whitespace: bool, parts: list[str]) -> None:
+    preserve_whitespace = preserve_whitespace or element.tag in PRESERVE_WHITESPACE_TAGS
+    if element.text:
+        parts.append(_normalize_text(element.text, preserve_whitespace))
+    for child in element:
+        # Without the comments
+        if isinstance(child.tag, str):
+            _get_element_text(child, preserve_whitespace, parts)
+        if child.tail:
+            parts.append(_normalize_text(child.tail, preserve_whitespace))
+
+
+def extract_html_links(html: str) -> list[tuple[str, str]]:
+    """
+    (text, url) of the links (with an href) of an escaped html, as Reddit's body_html and selftext_html.
+    """
+    unescaped_html = unescape(html)
+    if "<a" not in unescaped_html.lower():
+        return []
+    root = lxml_html.fragment_fromstring(unescaped_html, create_parent="div")
+    links = []
+    for link in root.iterdescendants("a"):
+        if link.get("href") is None:
+            continue
+        parts: list[str] = []
+        preserve_whitespace = any(parent.tag in PRESERVE_WHITESPACE_TAGS for parent in link.iterancestors())
+        _get_element_text(link, preserve_whitespace, parts)
+        links.append(("".join(parts), link.get("href")))
+    return links
+
+
+def extract_text_links(body: str) -> list[tuple[str, str]]:
+    """
+    (text, url) of the urls written as plain text, the text being the rest of their line until a colon.
+    """
+    links = []
+    for line in body.splitlines():
+        for url in TEXT_URL_REGEX.findall(line):
+            if not is_valid_url(url):
+                continue
+            text = line.replace(url, "")
+            if ":" in text:
+                text = text.split(":", 1)[0]
+            if text.endswith("(") and url.endswith(")"):
+                text = text[:-1]
+                url = url[:-1]
+            links.append((text, url))
+    return links
+
+
+def _get_markdown() -> markdown.Markdown:
+    md = getattr(_local, "markdown", None)
+    if md is None:
+        md = _local.markdown = markdown.Markdown()
+    return md.reset()
+
+
+def _get_markdown_links(lines: list[str]) -> list[tuple[str | None, str | None]] | None:
+    """
+    The links of the markdown rendered as a single element (None if it can't be parsed as such).
+    """
+    try:
+        root = etree.fromstring(_get_markdown().convert("\n".join(lines)))
+    except (etree.XMLSyntaxError, ValueError) as ex:
+        # More than one block (e.g. a header and a paragraph)
+        if "Extra content at the end of the document" not in str(ex):
+            logger.error(f"Error parsing reply markdown: {ex}")
+        return None
+    links: list[tuple[str | None, str | None]] = []
+    for link in root.iterdescendants("a"):
+        text = link.text
+        # A link whose text is an url followed by more markup: the text after the link instead
+        if len(link) > 0 and text and "http" in text and link.tail:
+            text = link.tail
+        links.append((text, link.get("href")))
+    return links
+
+
+def _get_simple_links(lines: list[str]) -> list[tuple[str | None, str | None]] | None:
+    """
+    The links of a markdown that is a single paragraph of text and [text](url) links, without the markdown parser
+    (None if it's not one).
+    """
+    if any(MARKDOWN_BLOCK_REGEX.match(line) for line in lines):
+        return None
+    text = "\n".join(lines)
+    if MARKDOWN_SYNTAX_REGEX.search(text):
+        return None
+    links: list[tuple[str | None, str | None]] = [
+        (link_text or None, url) for link_text, url in SIMPLE_LINK_REGEX.findall(text)
+    ]
+    # Brackets that are not simple links (references, titles, nested brackets, ...)
+    rest = SIMPLE_LINK_REGEX.sub("", text)
+    if "[" in rest or "]" in rest:
+        return None
+    return links
+
+
+def extract_reply_links(body: str) -> list[tuple[str | None, str]]:
+    """
+    (text, url) of the valid links of a reply: its markdown links or, if it has none, its plain text urls.
+    """
+    links: list[tuple[str | None, str | None]] | None = None
+    # Without brackets or angle brackets the markdown can't have links
+    if "[" in body or "<" in body:
+        lines = [line for line in body.splitlines() if line]
+        links = _get_simple_links(lines)
+        if links is None:
+            links = _get_markdown_links(lines)
+    if not links:
+        return list(extract_text_links(body))
+    return [(text, url) for text, url in links if url is not None and is_valid_url(url)]
@@ -0,0 +1,114 @@
+import json
+import logging
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from background_task import background
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from matches.goals_populator import (
+    RedditClient,
+    find_footballhighlights_mirrors,
+    find_soccer_mirrors,
+    get_mirrors_comments_url,
+)
+from matches.models import VideoGoal
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=settings.MIRRORS_CHECK_WORKERS)
+
+
+@background(schedule=90)
+def check_mirrors() -> None:
+    if not settings.MIRRORS_SCHEDULER_ENABLED:
+        return
+    check_due_mirrors()
+
+
+def claim_due_videogoals(batch_size: int) -> list[VideoGoal]:
+    """
+    The recent videos whose mirror search is due, the most overdue first. They are leased (their next_mirrors_check
+    moved MIRRORS_CHECK_LEASE_SECONDS ahead) and locked rows are skipped, so that concurrent runs don't claim the same
+    videos.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        videogoals = list(
+            VideoGoal.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                created_at__gte=now - timedelta(hours=settings.MIRRORS_CHECK_MAX_AGE_HOURS),
+                next_mirrors_check__lte=now,
+                post_match__isnull=False,
+            )
+            .select_related("post_match", "match__home_team", "match__away_team")
+            .order_by("next_mirrors_check")[:batch_size]
+        )
+        VideoGoal.objects.filter(id__in=[videogoal.id for videogoal in videogoals]).update(
+            next_mirrors_check=now + timedelta(seconds=settings.MIRRORS_CHECK_LEASE_SECONDS)
+        )
+    return videogoals
+
+
+def fetch_comments(url: str) -> list | None:
+    try:
+        response = RedditClient().get(url)
+        if response.status_code >= 300:
+            logger.error(f"Status Code {response.status_code} fetching {url}")
+            return None
+        return json.loads(response.content)
+    except Exception as ex:
+        # The search will request it again
+        logger.error(f"Error fetching {url}: {ex}")
+        return None
+
+
+def fetch_batch_comments(videogoals: list[VideoGoal]) -> dict[str, list | None]:
+    """
+    The first comments page of the mirror search of each video (get_mirrors_comments_url), the same url once,
+    fetched at the same time through the pooled RedditClient.
+    """
+    urls = list(dict.fromkeys(get_mirrors_comments_url(videogoal) for videogoal in videogoals))
+    return dict(zip(urls, executor.map(fetch_comments, urls)))
+
+
+def find_mirrors(videogoal: VideoGoal, comments: list | None = None) -> bool:
+    if videogoal.source == VideoGoal.RedditSource.FootballHighlights:
+        return find_footballhighlights_mirrors(videogoal, comments=comments)
+    return find_soccer_mirrors(videogoal, comments)
+
+
+def check_due_mirrors() -> int:
+    """
+    Runs the mirror searches of the due videos, a batch at a time with at most MIRRORS_CHECK_WORKERS at the same time,
+    until none is due or MIRRORS_CHECK_MAX_SECONDS have passed. Returns the number of videos searched.
+
+    The first comments page of every video of a batch is fetched before the searches, which only make the follow-up
+    requests (e.g. the AutoModerator comment replies, when its id is not known yet).
+    """
+    start = timeit.default_timer()
+    checked = 0
+    while timeit.default_timer() - start < settings.MIRRORS_CHECK_MAX_SECONDS:
+        videogoals = claim_due_videogoals(settings.MIRRORS_CHECK_BATCH_SIZE)
+        if len(videogoals) == 0:
+            break
+        batch_start = timeit.default_timer()
+        request_count = RedditClient().request_count
+        comments = fetch_batch_comments(videogoals)
+        fetched = timeit.default_timer()
+        pages = [comments.get(get_mirrors_comments_url(videogoal)) for videogoal in videogoals]
+        list(executor.map(find_mirrors, videogoals, pages))
+        batch_end = timeit.default_timer()
+        logger.info(
+            f"Mirrors batch: {len(videogoals)} videos | {len(comments)} pages prefetched "
+            f"({sum(page is None for page in comments.values())} failed) | "
+            f"{RedditClient().request_count - request_count} Reddit requests | "
+            f"fetch {(fetched - batch_start):.2f}s | search {(batch_end - fetched):.2f}s"
+        )
+        checked += len(videogoals)
+    end = timeit.default_timer()
+    logger.info(f"Mirrors searched for {checked} videos | {(end - start):.2f} elapsed")
+    return checked
@@ -9,12 +9,13 @@ from io import BytesIO
 from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.files import File
 from django.db import models
-from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.text import slugify
 
-from matches.proxy_request import ProxyRequest
-from matches.utils import random_string
+from matches.affiliates import AffiliateMatcher, handle_affiliate_terms_change
+from matches.utils import get_url_hash, normalize_name, random_string
 
 logger = logging.getLogger(__name__)
 
@@ -29,16 +30,22 @@ class Team(models.Model):
     slug = models.SlugField(max_length=200, unique=True)
     updated_at = models.DateTimeField(auto_now=True)
     logo_updated_at = models.DateTimeField(default=datetime.datetime.now)
+    # Affiliate terms (AffiliateTerm) at the start / end of the name, "" for a main team
+    affiliate_prefix = models.CharField(max_length=25, blank=True, default="", db_index=True)
+    affiliate_suffix = models.CharField(max_length=25, blank=True, default="", db_index=True)
+    # normalize_name of name / short_name, the columns that the trigram lookups are made on
+    normalized_name = models.CharField(max_length=256, blank=True, default="")
+    normalized_short_name = models.CharField(max_length=256, blank=True, default="")
 
     class Meta:
         indexes = [
             GinIndex(
-                OpClass(Upper("name"), name="gin_trgm_ops"),
-                name="team_name_ln_gin_idx",
+                OpClass("normalized_name", name="gin_trgm_ops"),
+                name="team_norm_name_trgm_idx",
             ),
             GinIndex(
-                OpClass(Upper("short_name"), name="gin_trgm_ops"),
-                name="team_short_name_ln_gin_idx",
+                OpClass("normalized_short_name", name="gin_trgm_ops"),
+                name="team_norm_short_name_trgm_idx",
             ),
         ]
 
@@ -63,6 +70,7 @@ class Team(models.Model):
         ) - self.logo_updated_at.replace(tzinfo=None) > datetime.timedelta(days=90):
             logger.info(f"Going to update team logo: {self.name} | {self.logo_url}")
             from matches.matches_populator import get_sofascore_headers
+            from matches.proxy_request import ProxyRequest
 
             headers = get_sofascore_headers()
             response = ProxyRequest.get_instance().make_request(
@@ -79,12 +87,23 @@ class Team(models.Model):
     # noinspection PyBroadException
     def save(self, *args: dict, **kwargs: dict) -> None:
         self._check_slug()
+        affiliate_matcher = AffiliateMatcher()
+        self.affiliate_prefix = affiliate_matcher.get_prefix(self.name, ignore_case=True)
+        self.affiliate_suffix = affiliate_matcher.get_suffix(self.name, ignore_case=True)
         super().save(*args, **kwargs)
 
 
+@receiver(pre_save, sender=Team)
+def team_pre_save(sender: type, instance: Team, **kwargs: dict) -> None:
+    # Also when loading fixtures (raw), which doesn't call save()
+    instance.normalized_name = normalize_name(instance.name)
+    instance.normalized_short_name = normalize_name(instance.short_name)
+
+
 class TeamAlias(models.Model):
     alias = models.CharField(max_length=256)
     team = models.ForeignKey(Team, related_name="alias", on_delete=models.CASCADE)
+    normalized_alias = models.CharField(max_length=256, blank=True, default="")
 
     class Meta:
         constraints = [
@@ -92,8 +111,8 @@ class TeamAlias(models.Model):
         ]
         indexes = [
             GinIndex(
-                OpClass(Upper("alias"), name="gin_trgm_ops"),
-                name="team_alias_ln_gin_idx",
+                OpClass("normalized_alias", name="gin_trgm_ops"),
+                name="team_alias_norm_trgm_idx",
             )
         ]
 
@@ -101,6 +120,12 @@ class TeamAlias(models.Model):
         return str(self.alias) + " - Original: " + str(self.team.name)
 
 
+@receiver(pre_save, sender=TeamAlias)
+def team_alias_pre_save(sender: type, instance: TeamAlias, **kwargs: dict) -> None:
+    # Also when loading fixtures (raw), which doesn't call save()
+    instance.normalized_alias = normalize_name(instance.alias)
+
+
 class Category(models.Model):
     id = models.IntegerField(unique=True, primary_key=True)
     priority = models.IntegerField(default=None, null=True)
@@ -252,6 +277,7 @@ class VideoGoal(models.Model):
 
     match = models.ForeignKey(Match, on_delete=models.CASCADE)
     url = models.CharField(max_length=1024, null=True)
+    url_hash = models.CharField(max_length=40, null=True, db_index=True)
     title = models.CharField(max_length=200, null=True)
     link_title = models.CharField(max_length=200, null=True)
     minute = models.CharField(max_length=12, null=True)
@@ -261,6 +287,17 @@ class VideoGoal(models.Model):
     next_mirrors_check = models.DateTimeField(default=datetime.datetime.now)
     auto_moderator_comment_id = models.CharField(max_length=20, null=True)
     source = models.IntegerField(choices=RedditSource.choices, default=RedditSource.Soccer)
+    # Mirror searches in a row that found no new mirrors (each one spaces out the next search more)
+    mirrors_checks_without_new = models.PositiveSmallIntegerField(default=0)
+    # Time (created_utc, or edited) of the newest comment scanned for mirrors: the next searches skip the older ones
+    mirrors_scanned_until = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            # The due mirror searches of the recent videos (created_at first, so that the old videos, which are no
+            # longer searched but stay due, are not scanned)
+            models.Index(fields=["created_at", "next_mirrors_check"], name="videogoal_mirrors_check_idx"),
+        ]
 
     @property
     def minute_int(self) -> float | int:
@@ -295,17 +332,26 @@ class VideoGoal(models.Model):
     def get_absolute_url(self) -> str:
         return reverse("match-detail", kwargs={"slug": self.match.slug}) + f"?v={self.simple_permalink}"
 
+    def save(self, *args: dict, **kwargs: dict) -> None:
+        self.url_hash = get_url_hash(self.url)
+        super().save(*args, **kwargs)
+
 
 class VideoGoalMirror(models.Model):
     videogoal = models.ForeignKey(VideoGoal, related_name="mirrors", on_delete=models.CASCADE)
     title = models.CharField(max_length=200, null=True)
     url = models.CharField(max_length=1024, null=True)
+    url_hash = models.CharField(max_length=40, null=True, db_index=True)
     msg_sent = models.BooleanField(default=False)
     author = models.CharField(max_length=200, null=True)
 
     def __str__(self) -> str:
         return str(self.title)
 
+    def save(self, *args: dict, **kwargs: dict) -> None:
+        self.url_hash = get_url_hash(self.url)
+        super().save(*args, **kwargs)
+
 
 class AffiliateTerm(models.Model):
     term = models.CharField(max_length=25, unique=True)
@@ -315,6 +361,13 @@ class AffiliateTerm(models.Model):
         return str(self.term)
 
 
+@receiver(post_save, sender=AffiliateTerm)
+@receiver(post_delete, sender=AffiliateTerm)
+def affiliate_terms_changed(sender: type, instance: AffiliateTerm, **kwargs: dict) -> None:
+    # Also when loading fixtures (raw), so that the teams loaded before the terms are classified
+    handle_affiliate_terms_change()
+
+
 class PostMatch(models.Model):
     permalink = models.CharField(max_length=1024, unique=True)
     videogoal = models.OneToOneField(VideoGoal, related_name="post_match", on_delete=models.CASCADE, null=True)
@@ -323,7 +376,107 @@ class PostMatch(models.Model):
     home_team_str = models.CharField(max_length=256, null=True)
     away_team_str = models.CharField(max_length=256, null=True)
 
+    # The video it was linked to when loaded (or last saved), see post_match_saved
+    _saved_videogoal_id: int | None = None
+
     class Meta:
         indexes = [
             models.Index(fields=["permalink"]),
         ]
+
+    @classmethod
+    def from_db(cls: type[PostMatch], db: str | None, field_names: list[str], values: list) -> PostMatch:
+        instance = super().from_db(db, field_names, values)
+        instance._saved_videogoal_id = instance.__dict__.get("videogoal_id")
+        return instance
+
+
+@receiver(post_save, sender=PostMatch)
+def post_match_saved(sender: type, instance: PostMatch, **kwargs: dict) -> None:
+    # A post that was not found (with the team names taken from its title) and was then linked to its video: the
+    # names are learned as resolutions of the teams of the match (in the orientation they are written). Only when it's
+    # first linked, not on every later save of the post
+    first_linked = instance._saved_videogoal_id is None and instance.videogoal_id is not None
+    instance._saved_videogoal_id = instance.videogoal_id
+    if kwargs.get("raw") or not first_linked or not (instance.home_team_str or instance.away_team_str):
+        return
+    from matches.team_resolution import TeamResolver
+
+    match = Match.objects.filter(videogoal__id=instance.videogoal_id).only("home_team_id", "away_team_id").first()
+    if match is not None:
+        TeamResolver().learn_match(
+            instance.home_team_str, instance.away_team_str, match.home_team_id, match.away_team_id
+        )
+
+
+class TeamResolution(models.Model):
+    """
+    A title fragment (normalized with normalize_name) that was resolved to a team, by a found match or a correction.
+    """
+
+    fragment = models.CharField(max_length=256)
+    team = models.ForeignKey(Team, related_name="resolutions", on_delete=models.CASCADE)
+    hit_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fragment", "team"], name="unique_team_resolution"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.fragment} => {self.team_id}"
+
+
+class RedditListingCursor(models.Model):
+    """
+    High-water mark of the /new listing of a subreddit: the newest post seen by the last complete run, so that the
+    next run only pages until it reaches the posts already seen.
+    """
+
+    subreddit = models.CharField(max_length=50, unique=True)
+    # Reddit fullname of the post (e.g. t3_1abcde)
+    last_fullname = models.CharField(max_length=20, blank=True, default="")
+    last_created_utc = models.FloatField(null=True)
+    # Set when a run couldn't reach the mark (or by hand, see request_reddit_full_scan), so that the next run of the
+    # subreddit is a full scan
+    needs_full_scan = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"r/{self.subreddit} | {self.last_fullname}"
+
+
+class SchedulerState(models.Model):
+    """
+    Persistent state of the recurring jobs: how many times a task ran and when a job (e.g. a full scan) last ran.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    run_count = models.PositiveIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True)
+
+    def __str__(self) -> str:
+        return str(self.name)
+
+
+class TaskRunSummary(models.Model):
+    """
+    Daily run statistics of a background task, kept when its completed tasks are deleted.
+    """
+
+    task_name = models.CharField(max_length=190)
+    day = models.DateField()
+    run_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    # Seconds between the scheduled time (run_at) and the start of the run (locked_at)
+    mean_start_delay_seconds = models.FloatField(default=0)
+    p95_start_delay_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["task_name", "day"], name="unique_task_run_summary_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.task_name} | {self.day}"
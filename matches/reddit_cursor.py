@@ -0,0 +1,90 @@
+import logging
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from matches.models import RedditListingCursor
+
+logger = logging.getLogger(__name__)
+
+
+class ListingPlan(NamedTuple):
+    subreddit: str
+    full_scan: bool
+    # The newest post seen by the last complete run (empty/None on a full scan)
+    last_fullname: str
+    last_created_utc: float | None
+
+    @property
+    def pages(self) -> int:
+        return settings.REDDIT_LISTING_FULL_SCAN_PAGES if self.full_scan else settings.REDDIT_LISTING_MAX_PAGES
+
+
+def get_listing_plan(subreddit: str) -> ListingPlan:
+    """
+    How the next run of a subreddit pages its /new listing: until the posts already seen, or a full scan when there is
+    no mark yet, it was requested (needs_full_scan) or the last complete run is older than
+    REDDIT_LISTING_RECOVERY_GAP_SECONDS (downtime), so that the posts of the gap are not missed.
+    """
+    cursor = RedditListingCursor.objects.filter(subreddit=subreddit).first()
+    reason = None
+    if cursor is None or cursor.last_created_utc is None:
+        reason = "no listing cursor"
+    elif cursor.needs_full_scan:
+        reason = "requested"
+    elif cursor.updated_at < timezone.now() - timedelta(seconds=settings.REDDIT_LISTING_RECOVERY_GAP_SECONDS):
+        reason = f"last complete run at {cursor.updated_at}"
+    if reason is not None or cursor is None:
+        logger.info(f"r/{subreddit}: full scan ({reason})")
+        return ListingPlan(subreddit, True, "", None)
+    return ListingPlan(subreddit, False, cursor.last_fullname, cursor.last_created_utc)
+
+
+def reaches_known_posts(plan: ListingPlan, children: list[dict]) -> bool:
+    """
+    True if a listing page reaches the posts seen by the previous runs (never on a full scan).
+
+    The posts a bit older than the mark (REDDIT_LISTING_CURSOR_OVERLAP_SECONDS) are still paged, as a post can show up
+    in /new after newer ones (e.g. approved from the spam filter).
+    """
+    if plan.full_scan or plan.last_created_utc is None:
+        return False
+    known_before = plan.last_created_utc - settings.REDDIT_LISTING_CURSOR_OVERLAP_SECONDS
+    return any(
+        post["data"].get("name") == plan.last_fullname or post["data"].get("created_utc", 0) <= known_before
+        for post in children
+    )
+
+
+def get_newest_post(newest: dict | None, children: list[dict]) -> dict | None:
+    for post in children:
+        if newest is None or post["data"].get("created_utc", 0) > newest.get("created_utc", 0):
+            newest = post["data"]
+    return newest
+
+
+def save_listing_cursor(plan: ListingPlan, newest: dict | None, reached_known_posts: bool) -> None:
+    """
+    Moves the mark of a subreddit to the newest post of a run that finished paging its listing.
+
+    An incremental run that used all its pages without reaching the posts already seen left a gap behind, so the
+    next run is a full scan.
+    """
+    # Saved even when the mark doesn't move (updated_at is when the last complete run was)
+    defaults: dict = {"updated_at": timezone.now()}
+    if (
+        newest is not None
+        and newest.get("name")
+        and newest.get("created_utc") is not None
+        and (plan.last_created_utc is None or newest["created_utc"] >= plan.last_created_utc)
+    ):
+        defaults["last_fullname"] = newest["name"]
+        defaults["last_created_utc"] = newest["created_utc"]
+    if plan.full_scan:
+        defaults["needs_full_scan"] = False
+    elif not reached_known_posts:
+        logger.warning(f"r/{plan.subreddit}: posts seen by the last run not reached, next run will be a full scan")
+        defaults["needs_full_scan"] = True
+    RedditListingCursor.objects.update_or_create(subreddit=plan.subreddit, defaults=defaults)
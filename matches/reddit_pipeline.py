@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import logging
+import timeit
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from threading import Lock
+from typing import NamedTuple, TypeVar
+
+import aiohttp
+from django.conf import settings
+from django.db import models
+
+from matches.goals_populator import (
+    RedditHeaders,
+    RedditRateLimiter,
+    _prepare_new_posts,
+    _split_footballhighlights_posts,
+    _split_soccer_posts,
+    find_and_store_videogoal,
+    send_reddit_response_heartbeat,
+)
+from matches.models import VideoGoal
+from matches.reddit_cursor import ListingPlan, get_newest_post, reaches_known_posts, save_listing_cursor
+from matches.title_parse_cache import TitleParseResult
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+T = TypeVar("T")
+
+
+class SubredditSpec(NamedTuple):
+    name: str
+    plan: ListingPlan
+    source: models.IntegerChoices
+    pages: int
+    posts_per_page: int
+    # Listing page => (mirror searches of the posts already saved, new posts)
+    split_posts: Callable[[list[dict]], tuple[list[Callable[[], bool]], list[tuple[dict, str, datetime.datetime]]]]
+    send_heartbeat: bool
+
+
+def get_subreddit_spec(plan: ListingPlan) -> SubredditSpec:
+    # The same pages as _fetch_reddit_soccer_videos / _fetch_reddit_footballhighlights_videos
+    if plan.subreddit == "soccer":
+        return SubredditSpec(
+            "soccer",
+            plan,
+            VideoGoal.RedditSource.Soccer,
+            plan.pages,
+            100 if plan.full_scan else 25,
+            _split_soccer_posts,
+            True,
+        )
+    if plan.subreddit == "footballhighlights":
+        return SubredditSpec(
+            "footballhighlights",
+            plan,
+            VideoGoal.RedditSource.FootballHighlights,
+            plan.pages,
+            50 if plan.full_scan else 10,
+            _split_footballhighlights_posts,
+            False,
+        )
+    raise ValueError(f"Unknown subreddit: {plan.subreddit}")
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    errors: int = 0
+    # Sum of the time spent on each item (the items of a stage may run at the same time)
+    busy_seconds: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def record(self, start: float, items: int = 1, error: bool = False) -> None:
+        end = timeit.default_timer()
+        self.items += items
+        self.errors += int(error)
+        self.busy_seconds += end - start
+        self.started_at = start if self.started_at is None else min(self.started_at, start)
+        self.finished_at = end if self.finished_at is None else max(self.finished_at, end)
+
+    @property
+    def throughput(self) -> float | None:
+        """
+        Items per second, from the start of the first item to the end of the last one.
+        """
+        if self.started_at is None or self.finished_at is None or self.finished_at <= self.started_at:
+            return None
+        return self.items / (self.finished_at - self.started_at)
+
+    def __str__(self) -> str:
+        throughput = f"{self.throughput:.2f}/s" if self.throughput is not None else "-"
+        return f"{self.name}: {self.items} items | {self.errors} errors | {throughput} | {self.busy_seconds:.2f}s busy"
+
+
+class RedditPipeline:
+    """
+    Asyncio pipeline of a Reddit ingestion cycle, with its stages joined by bounded queues:
+
+    listing (pages of each subreddit, fetched ahead) => parse (known posts, titles) => match (find the match, save the
+    video and send its messages) / mirrors (comment trees of the posts already saved).
+
+    The listings are fetched by the event loop, so the next page is downloaded while the previous ones are processed,
+    and the blocking work runs in thread pools of the pipeline: the match / mirrors jobs at most
+    REDDIT_PIPELINE_WORKERS at a time, and the page parses (NER) and other calls in a pool of their own, so that they
+    don't wait for the jobs. Every Reddit request waits for the shared RedditRateLimiter.
+    """
+
+    STAGES = ("listing", "parse", "match", "mirrors")
+
+    def __init__(self, specs: list[SubredditSpec]) -> None:
+        self._specs = specs
+        self.stats = {stage: StageStats(stage) for stage in self.STAGES}
+        # The pages are processed at the same time, so the messages of all their videos are sent one at a time (two
+        # videos of the same match may be in different pages)
+        self._messages_lock = Lock()
+        # Listing cursors to save once their posts are processed: (plan, newest post, reached known posts)
+        self._listing_cursors: list[tuple[ListingPlan, dict | None, bool]] = []
+        # Thread pools of a run: the match / mirrors jobs, and the rest of the blocking calls (page parse, headers,
+        # heartbeat, cursors), so that a pool full of jobs doesn't keep the next page from being fetched and parsed
+        self._jobs_executor: ThreadPoolExecutor | None = None
+        self._io_executor: ThreadPoolExecutor | None = None
+
+    def run(self) -> dict[str, StageStats]:
+        start = timeit.default_timer()
+        asyncio.run(self._run())
+        end = timeit.default_timer()
+        for stats in self.stats.values():
+            logger.info(f"Reddit pipeline stage {stats}")
+        logger.info(
+            f"Finished Reddit pipeline ({', '.join(spec.name for spec in self._specs)}) | {end - start:.2f} elapsed"
+        )
+        return self.stats
+
+    async def _run(self) -> None:
+        with (
+            ThreadPoolExecutor(max_workers=settings.REDDIT_PIPELINE_WORKERS) as self._jobs_executor,
+            ThreadPoolExecutor(max_workers=settings.REDDIT_PIPELINE_IO_WORKERS) as self._io_executor,
+        ):
+            await self._run_stages()
+
+    async def _run_stages(self) -> None:
+        pages: asyncio.Queue = asyncio.Queue(maxsize=settings.REDDIT_PIPELINE_PAGES_QUEUE_SIZE)
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=settings.REDDIT_PIPELINE_JOBS_QUEUE_SIZE)
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=settings.REDDIT_LISTING_TIMEOUT, sock_read=settings.REDDIT_LISTING_TIMEOUT
+        )
+        connector = aiohttp.TCPConnector(limit=settings.REDDIT_HTTP_POOL_SIZE)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            parser = asyncio.create_task(self._parse_pages(pages, jobs))
+            workers = [asyncio.create_task(self._work(jobs)) for _ in range(settings.REDDIT_PIPELINE_WORKERS)]
+            try:
+                await asyncio.gather(*[self._fetch_listing(session, spec, pages) for spec in self._specs])
+            finally:
+                # The pages already fetched are processed even if a listing failed
+                await pages.put(None)
+                await parser
+                await asyncio.gather(*workers)
+        # Only when all the jobs are done, so that the posts of an interrupted run are paged again by the next one
+        for plan, newest, reached_known_posts in self._listing_cursors:
+            await self._run_blocking(save_listing_cursor, plan, newest, reached_known_posts)
+
+    async def _run_blocking(self, function: Callable[..., T], *args: object) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, partial(function, *args))
+
+    async def _run_job(self, function: Callable[[], object]) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._jobs_executor, function)
+
+    async def _fetch_listing(self, session: aiohttp.ClientSession, spec: SubredditSpec, pages: asyncio.Queue) -> None:
+        try:
+            await self._fetch_listing_pages(session, spec, pages)
+        except Exception as ex:
+            # Without saving the cursor, as when a page can't be fetched
+            self.stats["listing"].errors += 1
+            logger.error(f"ERROR: Error fetching r/{spec.name} listing: {ex!r}")
+
+    async def _fetch_listing_pages(
+        self, session: aiohttp.ClientSession, spec: SubredditSpec, pages: asyncio.Queue
+    ) -> None:
+        after = None
+        newest = None
+        reached_known_posts = False
+        for i in range(spec.pages):
+            logger.info(
+                f"Fetching Reddit r/{spec.name} Videos {i + 1}/{spec.pages} | New Posts to fetch {spec.posts_per_page}"
+            )
+            url = f"https://oauth.reddit.com/r/{spec.name}/new?limit={spec.posts_per_page}"
+            if after:
+                url += f"&after={after}"
+            start = timeit.default_timer()
+            data = await self._get_listing_page(session, url)
+            self.stats["listing"].record(start, error=data is None)
+            if data is None:
+                logger.error(f"ERROR: Finished fetching r/{spec.name} videos")
+                return
+            if spec.send_heartbeat:
+                await self._run_blocking(send_reddit_response_heartbeat)
+            logger.info(f"r/{spec.name}: {data['data']['dist']} posts fetched...")
+            await pages.put((spec, data["data"]["children"]))
+            newest = get_newest_post(newest, data["data"]["children"])
+            reached_known_posts = reaches_known_posts(spec.plan, data["data"]["children"])
+            after = data["data"]["after"]
+            if reached_known_posts or not after:
+                break
+        self._listing_cursors.append((spec.plan, newest, reached_known_posts or not after))
+        logger.info(f"Finished fetching r/{spec.name} listing")
+
+    async def _get_listing_page(self, session: aiohttp.ClientSession, url: str) -> dict | None:
+        rate_limiter = RedditRateLimiter()
+        headers = await self._run_blocking(RedditHeaders().get_headers)
+        for attempt in range(settings.REDDIT_HTTP_RETRIES + 1):
+            backoff = settings.REDDIT_HTTP_BACKOFF_FACTOR * (2**attempt)
+            delay = rate_limiter.get_delay()
+            if delay > 0:
+                logger.info(f"Reddit rate limit reached, waiting {delay:.1f}s")
+                await asyncio.sleep(delay)
+            try:
+                async with session.get(url, headers=headers) as response:  # type: ignore
+                    rate_limiter.update(response.status, response.headers)
+                    content = await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                if attempt < settings.REDDIT_HTTP_RETRIES:
+                    logger.warning(f"Error fetching {url} (retrying in {backoff}s): {ex!r}")
+                    await asyncio.sleep(backoff)
+                    continue
+                logger.error(f"Error fetching {url}: {ex!r}")
+                return None
+            if status in RETRY_STATUS_CODES and attempt < settings.REDDIT_HTTP_RETRIES:
+                logger.warning(f"Status Code {status} from {url} (retrying in {backoff}s)")
+                await asyncio.sleep(backoff)
+                continue
+            if status >= 300:
+                logger.error("####### ERROR from reddit.com! #######")
+                logger.error(f"Status Code: {status}")
+                logger.error(f"{content!r}")
+                return None
+            try:
+                data = json.loads(content)
+            except ValueError as ex:
+                logger.error(f"Invalid JSON from {url}: {ex} | {content!r}")
+                return None
+            if "data" not in data:
+                logger.error(f"No data in response: {content!r}")
+                return None
+            return data
+        return None
+
+    @staticmethod
+    def _parse_page(spec: SubredditSpec, children: list[dict]) -> tuple[
+        list[Callable[[], bool]],
+        list[tuple[dict, str, datetime.datetime]],
+        list[tuple[int | None, TitleParseResult | None]],
+    ]:
+        mirror_checks, new_posts = spec.split_posts(children)
+        # All the new titles of the page at once (NER runs in a single batch)
+        prepared_posts = _prepare_new_posts([(post, title) for post, title, _ in new_posts], spec.source)
+        logger.info(
+            f"r/{spec.name}: {len(new_posts)} new posts | "
+            f"{len(mirror_checks)}/{len(children) - len(new_posts)} old posts with mirror search"
+        )
+        return mirror_checks, new_posts, prepared_posts
+
+    async def _parse_pages(self, pages: asyncio.Queue, jobs: asyncio.Queue) -> None:
+        while (page := await pages.get()) is not None:
+            spec, children = page
+            start = timeit.default_timer()
+            try:
+                mirror_checks, new_posts, prepared_posts = await self._run_blocking(self._parse_page, spec, children)
+            except Exception as ex:
+                self.stats["parse"].record(start, items=len(children), error=True)
+                logger.error(f"Error parsing r/{spec.name} listing page: {ex}")
+                continue
+            self.stats["parse"].record(start, items=len(children))
+            for mirror_check in mirror_checks:
+                await jobs.put(("mirrors", mirror_check))
+            for (post, title, search_matches_until), (known_match_id, parse_result) in zip(new_posts, prepared_posts):
+                job = partial(
+                    find_and_store_videogoal,
+                    post,
+                    title,
+                    search_matches_until,
+                    self._messages_lock,
+                    spec.source,
+                    None,
+                    parse_result,
+                    known_match_id,
+                )
+                await jobs.put(("match", job))
+        for _ in range(settings.REDDIT_PIPELINE_WORKERS):
+            await jobs.put(None)
+
+    async def _work(self, jobs: asyncio.Queue) -> None:
+        while (job := await jobs.get()) is not None:
+            stage, function = job
+            start = timeit.default_timer()
+            try:
+                await self._run_job(function)
+                self.stats[stage].record(start)
+            except Exception as ex:
+                self.stats[stage].record(start, error=True)
+                logger.error(f"Error in Reddit pipeline {stage} stage: {ex}")
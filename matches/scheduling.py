@@ -0,0 +1,91 @@
+import logging
+from datetime import timedelta
+
+from background_task.models import Task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from matches.models import SchedulerState
+
+logger = logging.getLogger(__name__)
+
+# (task_name, verbose_name, first run delay in seconds, repeat in seconds)
+# The task functions are only imported by the worker (see matches/tasks.py), so that the web processes
+# don't have to load the ingestion modules and their dependencies to schedule them.
+RECURRING_TASKS = [
+    ("matches.matches_populator.fetch_new_matches", "fetch_new_matches", 60 * 10, 60 * 5),
+    ("matches.goals_populator.fetch_videogoals", "fetch_videogoals", 60, 60),
+    ("matches.mirrors_scheduler.check_mirrors", "check_mirrors", 90, 60),
+    ("matches.task_retention.compact_completed_tasks", "compact_completed_tasks", 60 * 30, 60 * 60),
+]
+
+# Key of the Postgres advisory lock held while the recurring tasks are scheduled
+SCHEDULE_LOCK_KEY = 7_201_001
+
+
+def schedule_recurring_tasks() -> list[str]:
+    """
+    Schedules the recurring tasks that are not scheduled yet and returns their verbose names.
+
+    Runs in a transaction holding an advisory lock, so that concurrent runs (e.g. several workers starting at the
+    same time) can't create duplicated tasks.
+    """
+    scheduled = []
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SCHEDULE_LOCK_KEY])
+        existing = set(
+            Task.objects.filter(verbose_name__in=[task[1] for task in RECURRING_TASKS]).values_list(
+                "verbose_name", flat=True
+            )
+        )
+        for task_name, verbose_name, schedule, repeat in RECURRING_TASKS:
+            if verbose_name in existing:
+                continue
+            logger.info(f"Scheduling recurring task {verbose_name} [{task_name}] every {repeat} seconds")
+            task = Task.objects.new_task(
+                task_name,
+                run_at=timezone.now() + timedelta(seconds=schedule),
+                verbose_name=verbose_name,
+                repeat=repeat,
+                repeat_until=None,
+            )
+            task.save()
+            scheduled.append(verbose_name)
+    return scheduled
+
+
+def record_task_run(name: str) -> int:
+    """
+    Increments the run counter of a task and returns the number of runs, including this one.
+    """
+    now = timezone.now()
+    state, created = SchedulerState.objects.get_or_create(name=name, defaults={"run_count": 1, "last_run_at": now})
+    if created:
+        return 1
+    SchedulerState.objects.filter(id=state.id).update(run_count=F("run_count") + 1, last_run_at=now)
+    state.refresh_from_db(fields=["run_count"])
+    return state.run_count
+
+
+def claim_if_due(name: str, interval_seconds: int) -> bool:
+    """
+    Returns True (and marks it as run now) if the job didn't run in the last interval_seconds.
+
+    The check and the update are a single conditional UPDATE, so only one of several concurrent callers claims it.
+    """
+    now = timezone.now()
+    SchedulerState.objects.get_or_create(name=name)
+    due_before = now - timedelta(seconds=interval_seconds - settings.SCHEDULER_DUE_GRACE_SECONDS)
+    return (
+        SchedulerState.objects.filter(name=name)
+        .filter(Q(last_run_at__isnull=True) | Q(last_run_at__lte=due_before))
+        .update(last_run_at=now)
+        > 0
+    )
+
+
+def mark_as_run(name: str) -> None:
+    SchedulerState.objects.update_or_create(name=name, defaults={"last_run_at": timezone.now()})
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import datetime
+import timeit
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+
+class SeenPosts:
+    """
+    Permalinks of the Reddit posts already processed (with a PostMatch), kept across the ingestion cycles, so that the
+    posts seen again in the listings don't need a query.
+
+    Each permalink keeps when the mirrors of its video are due (None if the post has no video), so a post is only
+    looked up again when its mirror search is due. Entries are bounded (LRU) and expire after SEEN_POSTS_CACHE_SECONDS,
+    so that the changes made elsewhere (e.g. a post linked to its video in the admin) are eventually seen.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> SeenPosts:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = Lock()
+        # permalink => (expiration, next mirrors check of its video)
+        self._entries: OrderedDict[str, tuple[float, datetime.datetime | None]] = OrderedDict()
+        self.max_size: int = settings.SEEN_POSTS_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_not_due(self, permalinks: list[str], now: datetime.datetime) -> set[str]:
+        """
+        The permalinks already processed that don't need a lookup: no video, or its mirror search is not due yet.
+        """
+        timer = timeit.default_timer()
+        not_due = set()
+        with self._lock:
+            for permalink in permalinks:
+                entry = self._entries.get(permalink)
+                if entry is not None and entry[0] > timer and (entry[1] is None or entry[1] >= now):
+                    self._entries.move_to_end(permalink)
+                    not_due.add(permalink)
+            self.hits += len(not_due)
+            self.misses += len(permalinks) - len(not_due)
+        return not_due
+
+    def add(self, posts: dict[str, datetime.datetime | None]) -> None:
+        expiration = timeit.default_timer() + settings.SEEN_POSTS_CACHE_SECONDS
+        with self._lock:
+            for permalink, next_mirrors_check in posts.items():
+                self._entries[permalink] = (expiration, next_mirrors_check)
+                self._entries.move_to_end(permalink)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups > 0 else None,
+            }
@@ -0,0 +1,82 @@
+import logging
+import math
+import timeit
+from collections import defaultdict
+from datetime import timedelta
+
+from background_task import background
+from background_task.models import CompletedTask
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from matches.models import TaskRunSummary
+
+logger = logging.getLogger(__name__)
+
+
+@background(schedule=60 * 30)
+def compact_completed_tasks() -> None:
+    logger.info("Compacting completed tasks...")
+    compact_completed_tasks_older_than(settings.COMPLETED_TASKS_RETENTION_DAYS)
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    return values[max(math.ceil(percentile * len(values)) - 1, 0)]
+
+
+def _merge_summary(summary: TaskRunSummary, delays: list[float], failed_count: int) -> None:
+    delays.sort()
+    mean_delay = sum(delays) / len(delays)
+    p95_delay = _percentile(delays, 0.95)
+    if summary.run_count > 0:
+        mean_delay = (summary.mean_start_delay_seconds * summary.run_count + mean_delay * len(delays)) / (
+            summary.run_count + len(delays)
+        )
+        # A day split between chunks keeps the highest p95 (an upper bound of the real one)
+        p95_delay = max(p95_delay, summary.p95_start_delay_seconds)
+    summary.run_count += len(delays)
+    summary.mean_start_delay_seconds = mean_delay
+    summary.p95_start_delay_seconds = p95_delay
+    summary.failed_count += failed_count
+
+
+def compact_completed_tasks_older_than(days: int) -> int:
+    """
+    Deletes the completed tasks that ran more than `days` ago, in chunks of COMPLETED_TASKS_RETENTION_CHUNK_SIZE rows
+    (at most COMPLETED_TASKS_RETENTION_MAX_CHUNKS per call), after adding them to the daily TaskRunSummary of their
+    task. Each chunk is summarized and deleted in its own short transaction. Returns the number of deleted rows.
+    """
+    start = timeit.default_timer()
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for _ in range(settings.COMPLETED_TASKS_RETENTION_MAX_CHUNKS):
+        with transaction.atomic():
+            rows = list(
+                CompletedTask.objects.filter(run_at__lt=cutoff)
+                .order_by("id")
+                .values_list("id", "task_name", "run_at", "locked_at", "failed_at")[
+                    : settings.COMPLETED_TASKS_RETENTION_CHUNK_SIZE
+                ]
+            )
+            if not rows:
+                break
+            delays: dict[tuple, list[float]] = defaultdict(list)
+            failures: dict[tuple, int] = defaultdict(int)
+            for _id, task_name, run_at, locked_at, failed_at in rows:
+                key = (task_name, run_at.date())
+                # The task started running when it was locked (background_task doesn't store when it ended)
+                delays[key].append(max(((locked_at or run_at) - run_at).total_seconds(), 0.0))
+                if failed_at is not None:
+                    failures[key] += 1
+            for (task_name, day), task_delays in delays.items():
+                summary, _created = TaskRunSummary.objects.select_for_update().get_or_create(
+                    task_name=task_name, day=day
+                )
+                _merge_summary(summary, task_delays, failures[(task_name, day)])
+                summary.save()
+            deleted += CompletedTask.objects.filter(id__in=[row[0] for row in rows]).delete()[0]
+    end = timeit.default_timer()
+    logger.info(f"Deleted {deleted} completed tasks older than {days} days | {(end - start):.2f} elapsed")
+    return deleted
@@ -0,0 +1,8 @@
+# Imported by the background_task worker (process_tasks autodiscovers the `tasks` module of each app)
+# to register the task functions. It should not be imported by the web processes.
+from matches.goals_populator import fetch_videogoals
+from matches.matches_populator import fetch_new_matches
+from matches.mirrors_scheduler import check_mirrors
+from matches.task_retention import compact_completed_tasks
+
+__all__ = ["check_mirrors", "compact_completed_tasks", "fetch_new_matches", "fetch_videogoals"]
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import timeit
+from collections import defaultdict
+from threading import Lock, RLock
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from matches.models import Match, Team, TeamAlias
+from matches.utils import normalize_name, to_aware_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def get_trigrams(value: str) -> frozenset[str]:
+    """
+    Trigrams of a string, extracted the same way as pg_trgm: lowercase alphanumeric words, each one padded with
+    two spaces at the start and one at the end.
+    """
+    trigrams: set[str] = set()
+    for word in normalize_name(value).split():
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+class TeamIndex:
+    """
+    In-memory trigram index of the names, short names and aliases of the teams that play in the matches around now.
+
+    It replaces the `unaccent__trigram_similar` lookups of find_match for the recent matches: the candidate teams
+    are scored with the pg_trgm similarity of their names and only the ids of the matches between candidates are
+    sent to the database. The index is rebuilt every TEAM_INDEX_REFRESH_SECONDS and updated in place when a Match,
+    Team or TeamAlias is saved or deleted in this process.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> TeamIndex:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = RLock()
+        self._build_lock = Lock()
+        self._built_at: float | None = None
+        self._from_datetime: datetime.datetime | None = None
+        self._to_datetime: datetime.datetime | None = None
+        # match id => (datetime, home team id, away team id)
+        self._matches: dict[int, tuple[datetime.datetime, int | None, int | None]] = {}
+        self._matches_by_team: dict[int, set[int]] = defaultdict(set)
+        # team id => trigrams of each of its names
+        self._team_names: dict[int, list[frozenset[str]]] = {}
+        # trigram => (team id, index of the name in _team_names) of the names with it
+        self._postings: dict[str, set[tuple[int, int]]] = defaultdict(set)
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def _is_stale(self) -> bool:
+        return self._built_at is None or timeit.default_timer() - self._built_at >= settings.TEAM_INDEX_REFRESH_SECONDS
+
+    def _refresh_if_stale(self) -> None:
+        if self._is_stale():
+            with self._build_lock:
+                # Another thread may have refreshed it while we were waiting
+                if self._is_stale():
+                    self._build()
+
+    def refresh(self) -> None:
+        with self._build_lock:
+            self._build()
+
+    def _build(self) -> None:
+        start = timeit.default_timer()
+        now = timezone.now()
+        from_datetime = now - datetime.timedelta(hours=settings.TEAM_INDEX_PAST_HOURS)
+        to_datetime = now + datetime.timedelta(hours=settings.TEAM_INDEX_FUTURE_HOURS)
+        matches = list(
+            Match.objects.filter(datetime__gte=from_datetime, datetime__lte=to_datetime).values_list(
+                "id", "datetime", "home_team_id", "away_team_id"
+            )
+        )
+        team_ids = {team_id for _, _, home, away in matches for team_id in (home, away) if team_id is not None}
+        names = self._load_team_names(team_ids)
+        with self._lock:
+            self._matches = {}
+            self._matches_by_team = defaultdict(set)
+            self._team_names = {}
+            self._postings = defaultdict(set)
+            for team_id, team_names in names.items():
+                self._set_team_names(team_id, team_names)
+            for match_id, match_datetime, home_team_id, away_team_id in matches:
+                self._set_match(match_id, match_datetime, home_team_id, away_team_id)
+            self._from_datetime = from_datetime
+            self._to_datetime = to_datetime
+            self._built_at = timeit.default_timer()
+        end = timeit.default_timer()
+        logger.info(
+            f"Team index built: {len(self._matches)} matches | {len(self._team_names)} teams | "
+            f"{(end - start):.2f} elapsed"
+        )
+
+    @staticmethod
+    def _load_team_names(team_ids: set[int]) -> dict[int, list[str]]:
+        names: dict[int, list[str]] = defaultdict(list)
+        for team_id, name, short_name in Team.objects.filter(id__in=team_ids).values_list("id", "name", "short_name"):
+            names[team_id] += [name, short_name]
+        for team_id, alias in TeamAlias.objects.filter(team_id__in=team_ids).values_list("team_id", "alias"):
+            names[team_id].append(alias)
+        return names
+
+    def _remove_team_names(self, team_id: int) -> None:
+        for i, trigrams in enumerate(self._team_names.pop(team_id, [])):
+            for trigram in trigrams:
+                self._postings[trigram].discard((team_id, i))
+
+    def _set_team_names(self, team_id: int, names: list[str]) -> None:
+        self._remove_team_names(team_id)
+        team_trigrams = [get_trigrams(name) for name in names if name]
+        self._team_names[team_id] = team_trigrams
+        for i, trigrams in enumerate(team_trigrams):
+            for trigram in trigrams:
+                self._postings[trigram].add((team_id, i))
+
+    def _remove_match(self, match_id: int) -> None:
+        match = self._matches.pop(match_id, None)
+        if match is not None:
+            for team_id in match[1:]:
+                if team_id is not None:
+                    self._matches_by_team[team_id].discard(match_id)
+
+    def _set_match(
+        self, match_id: int, match_datetime: datetime.datetime, home_team_id: int | None, away_team_id: int | None
+    ) -> None:
+        self._remove_match(match_id)
+        self._matches[match_id] = (match_datetime, home_team_id, away_team_id)
+        for team_id in (home_team_id, away_team_id):
+            if team_id is not None:
+                self._matches_by_team[team_id].add(match_id)
+
+    def _covers(self, from_datetime: datetime.datetime, to_datetime: datetime.datetime) -> bool:
+        return (
+            self._from_datetime is not None
+            and self._to_datetime is not None
+            and self._from_datetime <= from_datetime
+            and to_datetime <= self._to_datetime
+        )
+
+    def find_teams(self, name: str) -> dict[int, float]:
+        """
+        Returns the similarity (as pg_trgm similarity()) of the best name of each team that is similar to `name`.
+        """
+        trigrams = get_trigrams(name)
+        if not trigrams:
+            return {}
+        with self._lock:
+            shared: dict[tuple[int, int], int] = defaultdict(int)
+            for trigram in trigrams:
+                for entry in self._postings.get(trigram, ()):
+                    shared[entry] += 1
+            teams: dict[int, float] = {}
+            for (team_id, i), count in shared.items():
+                similarity = count / (len(trigrams) + len(self._team_names[team_id][i]) - count)
+                if similarity >= settings.TRIGRAM_SIMILARITY_THRESHOLD and similarity > teams.get(team_id, 0):
+                    teams[team_id] = similarity
+            return teams
+
+    def find_match_scores(
+        self, home_team: str, away_team: str, from_date: datetime.date, to_date: datetime.date
+    ) -> dict[int, float] | None:
+        """
+        Ids of the matches between from_date and to_date with a home team similar to home_team and an away team
+        similar to away_team, with their score (sum of both similarities), best scored first.
+        None if the dates are not covered by the index.
+        """
+        self._refresh_if_stale()
+        from_datetime = to_aware_datetime(from_date)
+        to_datetime = to_aware_datetime(to_date)
+        if not self._covers(from_datetime, to_datetime):
+            return None
+        home_teams = self.find_teams(home_team)
+        away_teams = self.find_teams(away_team)
+        candidates = []
+        with self._lock:
+            for home_team_id, home_similarity in home_teams.items():
+                for match_id in self._matches_by_team.get(home_team_id, ()):
+                    match_datetime, match_home_team_id, away_team_id = self._matches[match_id]
+                    if (
+                        match_home_team_id == home_team_id
+                        and away_team_id in away_teams
+                        and from_datetime <= match_datetime <= to_datetime
+                    ):
+                        candidates.append((home_similarity + away_teams[away_team_id], match_id))
+        return {match_id: score for score, match_id in sorted(candidates, reverse=True)}
+
+    def update_match(self, match: Match) -> None:
+        match_datetime = to_aware_datetime(match.datetime) if match.datetime is not None else None
+        with self._lock:
+            if not self.is_built:
+                return
+            if match_datetime is None or not self._covers(match_datetime, match_datetime):
+                self._remove_match(match.id)
+                return
+            missing_team_ids = {
+                team_id
+                for team_id in (match.home_team_id, match.away_team_id)
+                if team_id is not None and team_id not in self._team_names
+            }
+        names = self._load_team_names(missing_team_ids) if missing_team_ids else {}
+        with self._lock:
+            for team_id, team_names in names.items():
+                self._set_team_names(team_id, team_names)
+            self._set_match(match.id, match_datetime, match.home_team_id, match.away_team_id)
+
+    def remove_match(self, match_id: int) -> None:
+        with self._lock:
+            self._remove_match(match_id)
+
+    def update_team(self, team_id: int) -> None:
+        with self._lock:
+            if team_id not in self._team_names:
+                return
+        names = self._load_team_names({team_id})
+        with self._lock:
+            if team_id in self._team_names:
+                self._set_team_names(team_id, names.get(team_id, []))
+
+    def remove_team(self, team_id: int) -> None:
+        with self._lock:
+            self._remove_team_names(team_id)
+            for match_id in list(self._matches_by_team.pop(team_id, ())):
+                self._remove_match(match_id)
+
+
+# Only connected in the processes that import this module (the ingestion worker). Errors are logged, so that
+# they never fail the save that triggered them (the index is rebuilt anyway every TEAM_INDEX_REFRESH_SECONDS)
+@receiver(post_save, sender=Match)
+def _match_saved(sender: type, instance: Match, **kwargs: dict) -> None:
+    try:
+        TeamIndex().update_match(instance)
+    except Exception as ex:
+        logger.error(f"Error updating match {instance.id} in team index: {ex}")
+
+
+@receiver(post_delete, sender=Match)
+def _match_deleted(sender: type, instance: Match, **kwargs: dict) -> None:
+    TeamIndex().remove_match(instance.id)
+
+
+@receiver(post_save, sender=Team)
+def _team_saved(sender: type, instance: Team, **kwargs: dict) -> None:
+    try:
+        TeamIndex().update_team(instance.id)
+    except Exception as ex:
+        logger.error(f"Error updating team {instance.id} in team index: {ex}")
+
+
+@receiver(post_delete, sender=Team)
+def _team_deleted(sender: type, instance: Team, **kwargs: dict) -> None:
+    TeamIndex().remove_team(instance.id)
+
+
+@receiver(post_save, sender=TeamAlias)
+@receiver(post_delete, sender=TeamAlias)
+def _team_alias_changed(sender: type, instance: TeamAlias, **kwargs: dict) -> None:
+    try:
+        TeamIndex().update_team(instance.team_id)
+    except Exception as ex:
+        logger.error(f"Error updating team {instance.team_id} in team index: {ex}")
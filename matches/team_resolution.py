@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import logging
+import timeit
+from collections import OrderedDict, defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+
+from matches.models import Team, TeamAlias, TeamResolution
+from matches.team_index import get_trigrams
+from matches.utils import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+def get_name_similarity(name: str | None, team_names: list[str]) -> float:
+    """
+    Trigram similarity (as pg_trgm similarity()) of a name to the most similar of the names of a team.
+    """
+    trigrams = get_trigrams(name or "")
+    if not trigrams:
+        return 0.0
+    return max(
+        (
+            len(trigrams & team_trigrams) / len(trigrams | team_trigrams)
+            for team_trigrams in map(get_trigrams, team_names)
+        ),
+        default=0.0,
+    )
+
+
+class TeamResolver:
+    """
+    Title fragments (e.g. "Man Utd", "Barça") already resolved to a team, so that the next post with the same
+    fragment doesn't need the fuzzy matching.
+
+    The resolutions are persisted in TeamResolution and cached in a bounded LRU (also the fragments without
+    resolutions). Entries expire after TEAM_RESOLUTION_CACHE_SECONDS, so that the resolutions learned by other
+    processes are eventually used.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> TeamResolver:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = Lock()
+        # normalized fragment => (expiration, ids of the teams it was resolved to)
+        self._entries: OrderedDict[str, tuple[float, frozenset[int]]] = OrderedDict()
+        self.max_size: int = settings.TEAM_RESOLUTION_CACHE_SIZE
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _set_local(self, fragment: str, team_ids: frozenset[int], now: float) -> None:
+        self._entries[fragment] = (now + settings.TEAM_RESOLUTION_CACHE_SECONDS, team_ids)
+        self._entries.move_to_end(fragment)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def resolve(self, fragments: list[str]) -> dict[str, frozenset[int]]:
+        """
+        Ids of the teams each fragment was resolved to (empty if none), with a single query for the fragments
+        that are not cached.
+        """
+        now = timeit.default_timer()
+        normalized = {fragment: normalize_name(fragment) for fragment in fragments}
+        cached: dict[str, frozenset[int]] = {}
+        with self._lock:
+            for fragment in set(normalized.values()):
+                entry = self._entries.get(fragment)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(fragment)
+                    cached[fragment] = entry[1]
+        missing = set(normalized.values()) - set(cached)
+        if missing:
+            found: dict[str, set[int]] = {fragment: set() for fragment in missing}
+            for fragment, team_id in TeamResolution.objects.filter(fragment__in=missing).values_list(
+                "fragment", "team_id"
+            ):
+                found[fragment].add(team_id)
+            with self._lock:
+                for fragment, team_ids in found.items():
+                    cached[fragment] = frozenset(team_ids)
+                    self._set_local(fragment, cached[fragment], now)
+        return {fragment: cached[normalized_fragment] for fragment, normalized_fragment in normalized.items()}
+
+    def learn(self, resolutions: list[tuple[str | None, int | None]]) -> None:
+        """
+        Stores (fragment, team id) resolutions, counting a hit for the ones already known.
+        """
+        rows = {
+            (normalize_name(fragment), team_id)
+            for fragment, team_id in resolutions
+            if fragment and team_id is not None and normalize_name(fragment)
+        }
+        if not rows:
+            return
+        # A single upsert, so that the hits of concurrent processes are all counted
+        table = TeamResolution._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (fragment, team_id, hit_count, last_used_at) "
+                f"VALUES {', '.join(['(%s, %s, 1, NOW())'] * len(rows))} "
+                f"ON CONFLICT (fragment, team_id) DO UPDATE "
+                f"SET hit_count = {table}.hit_count + 1, last_used_at = EXCLUDED.last_used_at",
+                [value for row in sorted(rows) for value in row],
+            )
+        now = timeit.default_timer()
+        with self._lock:
+            for fragment, team_id in rows:
+                entry = self._entries.get(fragment)
+                if entry is not None and entry[0] > now:
+                    self._entries[fragment] = (entry[0], entry[1] | {team_id})
+                else:
+                    # Not cached: the other resolutions of the fragment are loaded by the next resolve
+                    self._entries.pop(fragment, None)
+
+    def learn_match(
+        self, home_team: str | None, away_team: str | None, home_team_id: int | None, away_team_id: int | None
+    ) -> None:
+        """
+        Learns the team names of a title as resolutions of the teams of its match. Titles are often written with the
+        teams swapped, so the names are learned in the orientation in which they are the most similar to the names
+        and aliases of the teams, and not learned when neither one is clearly more similar.
+        """
+        team_names: dict[int | None, list[str]] = defaultdict(list)
+        team_ids = {home_team_id, away_team_id} - {None}
+        for team_id, name, short_name in Team.objects.filter(id__in=team_ids).values_list("id", "name", "short_name"):
+            team_names[team_id] += [name, short_name]
+        for team_id, alias in TeamAlias.objects.filter(team_id__in=team_ids).values_list("team_id", "alias"):
+            team_names[team_id].append(alias)
+        straight = get_name_similarity(home_team, team_names[home_team_id]) + get_name_similarity(
+            away_team, team_names[away_team_id]
+        )
+        swapped = get_name_similarity(home_team, team_names[away_team_id]) + get_name_similarity(
+            away_team, team_names[home_team_id]
+        )
+        margin = settings.TEAM_RESOLUTION_ORIENTATION_MARGIN
+        if straight >= swapped + margin:
+            self.learn([(home_team, home_team_id), (away_team, away_team_id)])
+        elif swapped >= straight + margin:
+            self.learn([(home_team, away_team_id), (away_team, home_team_id)])
+        else:
+            logger.info(
+                f"Not learning {home_team!r} / {away_team!r}: ambiguous orientation ({straight:.2f} / {swapped:.2f})"
+            )
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ner.utils import get_ner_model_version
+
+logger = logging.getLogger(__name__)
+
+
+class TitleParseResult(NamedTuple):
+    regex_home_team: str | None
+    regex_away_team: str | None
+    regex_minute: str | None
+    ner_home_team: str | None
+    ner_away_team: str | None
+    ner_player: str | None
+    ner_minute: str | None
+
+
+def normalize_title(title: str) -> str:
+    # Case is kept on purpose: the extracted names (and the affiliate terms found on them) are case-sensitive
+    title = unicodedata.normalize("NFC", title)
+    return re.sub(r"\s+", " ", title).strip()
+
+
+class TitleParseCache:
+    """
+    Bounded LRU cache of the regex + NER extraction of Reddit titles, keyed by the normalized title.
+
+    Optionally backed by the default Django cache (memcached) so that the results are shared between processes.
+    Entries are scoped by the NER model version, so a new model invalidates every cached result.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> TitleParseCache:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._lock = Lock()
+        self._entries: OrderedDict[str, TitleParseResult] = OrderedDict()
+        self._version: str | None = None
+        self.max_size: int = settings.TITLE_PARSE_CACHE_SIZE
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _get_key(self, title: str) -> str:
+        version = get_ner_model_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        logger.info(f"NER model version changed ({self._version} => {version}). Clearing title cache")
+                    self._entries.clear()
+                    self._version = version
+        title_hash = hashlib.sha1(normalize_title(title).encode("utf-8")).hexdigest()
+        return f"title_parse:{version}:{title_hash}"
+
+    def get(self, title: str) -> TitleParseResult | None:
+        key = self._get_key(title)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+        if settings.TITLE_PARSE_CACHE_SHARED:
+            try:
+                shared_result = caches["default"].get(key)
+            except Exception as ex:
+                logger.warning(f"Error reading title parse result from shared cache: {ex}")
+                shared_result = None
+            if shared_result is not None:
+                result = TitleParseResult(*shared_result)
+                self._set_local(key, result)
+                with self._lock:
+                    self.shared_hits += 1
+                return result
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _set_local(self, key: str, result: TitleParseResult) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def set(self, title: str, result: TitleParseResult) -> None:
+        key = self._get_key(title)
+        self._set_local(key, result)
+        if settings.TITLE_PARSE_CACHE_SHARED:
+            try:
+                caches["default"].set(key, tuple(result), timeout=settings.TITLE_PARSE_CACHE_TIMEOUT)
+            except Exception as ex:
+                logger.warning(f"Error writing title parse result to shared cache: {ex}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": ((self.hits + self.shared_hits) / lookups) if lookups > 0 else None,
+            }
@@ -1,10 +1,13 @@
 import base64
+import hashlib
 import json
 import logging
 import random
 import re
 import string
-from datetime import datetime
+import unicodedata
+from datetime import date, datetime, time
+from urllib.parse import urlsplit, urlunsplit
 
 import requests
 from django.utils import timezone
@@ -19,6 +22,45 @@ def random_string(length: int) -> str:
     return "".join(random.choice(letters) for _ in range(length))
 
 
+# Letters that unaccent maps to something other than the letter without its combining marks
+_UNACCENT_EXTRA = str.maketrans(
+    {"ø": "o", "Ø": "O", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "ß": "ss", "æ": "ae", "Æ": "AE", "œ": "oe", "ı": "i"}
+)
+
+
+def unaccent(value: str) -> str:
+    value = unicodedata.normalize("NFKD", value.translate(_UNACCENT_EXTRA))
+    return "".join(c for c in value if not unicodedata.combining(c))
+
+
+def normalize_name(value: str) -> str:
+    """
+    Unaccented, casefolded, alphanumeric words of a name separated by single spaces (the words pg_trgm extracts
+    trigrams from), e.g. "1. FC Köln" => "1 fc koln".
+    """
+    return " ".join(re.findall(r"[^\W_]+", unaccent(value).casefold()))
+
+
+def normalize_url(url: str) -> str:
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    scheme = "https" if parts.scheme.lower() in ("http", "https") else parts.scheme.lower()
+    # The fragment is never sent to the server, so it doesn't identify a different video
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), parts.query, ""))
+
+
+def get_url_hash(url: str | None) -> str | None:
+    if not url:
+        return None
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+
 def localize_date(date: datetime) -> datetime:
     try:
         current_timezone = timezone.get_current_timezone()
@@ -28,6 +70,14 @@ def localize_date(date: datetime) -> datetime:
     return date
 
 
+def to_aware_datetime(value: date) -> datetime:
+    value_datetime = value if isinstance(value, datetime) else datetime.combine(value, time.min)
+    if timezone.is_naive(value_datetime):
+        # The same as Django does for naive datetimes in a query
+        value_datetime = timezone.make_aware(value_datetime)
+    return value_datetime
+
+
 def get_proxies_sslproxies() -> list[str]:
     url = "https://sslproxies.org/"
     try:
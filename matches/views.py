@@ -17,7 +17,7 @@ from .serializers import (
     TeamDetailSerializer,
     TeamSerializer,
 )
-from .utils import localize_date
+from .utils import localize_date, normalize_name
 
 
 class MatchesHistoryListView(generic.ListView):
@@ -93,8 +93,13 @@ class MatchWeekSearchView(generics.ListAPIView):
             Match.objects.filter(datetime__gte=start_date, videogoal__isnull=False).distinct().order_by("-datetime")
         )
         if filter_q is not None:
+            normalized_filter = normalize_name(filter_q)
+            # Only punctuation / spaces: it would be contained in all the names
+            if not normalized_filter:
+                return queryset.none()
             queryset = queryset.filter(
-                Q(home_team__name__unaccent__icontains=filter_q) | Q(away_team__name__unaccent__icontains=filter_q)
+                Q(home_team__normalized_name__contains=normalized_filter)
+                | Q(away_team__normalized_name__contains=normalized_filter)
             )
         return queryset
 
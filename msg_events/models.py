@@ -1,12 +1,9 @@
 import logging
 
 import requests
-import tweepy
-from discord_webhook import DiscordWebhook
 from django.db import models
 from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
-from slack_webhook import Slack
 
 from matches.models import Category, Team, Tournament, VideoGoal
 
@@ -65,6 +62,8 @@ class Tweet(MessageObject):
         return self._send_tweet_message_v2(message)
 
     def _send_tweet_message_v1(self, message: str) -> dict | requests.Response:
+        import tweepy
+
         auth = tweepy.OAuthHandler(self.consumer_key, self.consumer_secret)
         auth.set_access_token(self.access_token_key, self.access_token_secret)
         api = tweepy.API(auth)
@@ -73,6 +72,8 @@ class Tweet(MessageObject):
         return result
 
     def _send_tweet_message_v2(self, message: str) -> dict | requests.Response:
+        import tweepy
+
         client = tweepy.Client(
             consumer_key=self.consumer_key,
             consumer_secret=self.consumer_secret,
@@ -116,6 +117,10 @@ class CustomMessage(models.Model):
 def send_message_webhook(sender: CustomMessage, instance: CustomMessage, **kwargs: dict) -> None:
     if kwargs["action"] != "post_add":
         return
+    # Imported here to keep the messaging libraries out of the startup of the web processes
+    from discord_webhook import DiscordWebhook
+    from slack_webhook import Slack
+
     result = instance.result or ""
     for wh in instance.webhooks.all():
         if not wh.active:
@@ -1,5 +1,19 @@
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class NerConfig(AppConfig):
     name = "ner"
+
+    def ready(self) -> None:
+        if len(sys.argv) > 1 and sys.argv[1] in settings.NER_WARM_UP_COMMANDS and not settings.NER_SERVICE_URL:
+            if settings.NER_ENGINE_WORKERS > 0:
+                from ner.engine import NerEngine
+
+                NerEngine().warm_up()
+            else:
+                from ner.utils import NerModelRegistry
+
+                NerModelRegistry().warm_up()
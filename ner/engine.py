@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.synchronize import Barrier
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+
+from ner.utils import NerModelRegistry, extract_names_from_titles_ner, get_doc_result
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+logger = logging.getLogger(__name__)
+
+# Model loaded by each child process of the pool
+_worker_model: Language | None = None
+_worker_batch_size = 100
+# Shared by the workers of a pool, so that a warm-up waits for all of them to be started
+_worker_barrier: Barrier | None = None
+
+
+def _init_worker(model_folder: str, batch_size: int, barrier: Barrier) -> None:
+    import spacy
+
+    global _worker_model, _worker_batch_size, _worker_barrier
+    _worker_model = spacy.load(model_folder)
+    _worker_batch_size = batch_size
+    _worker_barrier = barrier
+    # The first call initializes the rest of the pipeline
+    list(_worker_model.pipe([""]))
+
+
+def _wait_for_workers(timeout: float) -> int:
+    """
+    Blocks the worker until all the workers of the pool are started (and their models loaded). Returns its pid.
+    """
+    if _worker_barrier is None:
+        raise RuntimeError("NER worker process was not initialized")
+    _worker_barrier.wait(timeout)
+    return os.getpid()
+
+
+def _extract_chunk(titles: list[str]) -> list[tuple[str | None, str | None, str | None, str | None]]:
+    if _worker_model is None:
+        raise RuntimeError("NER worker process was not initialized")
+    return [get_doc_result(doc) for doc in _worker_model.pipe(titles, batch_size=_worker_batch_size)]
+
+
+class NerEngine:
+    """
+    Runs NER for batches of titles.
+
+    With NER_ENGINE_WORKERS > 0 the titles are split in chunks and processed by a pool of processes, each one with
+    its own copy of the model, so that NER is not bound to the GIL of the ingest process. Otherwise, or if the pool
+    fails, the titles are processed by extract_names_from_titles_ner (the NER service, if configured, or the shared
+    NerModelRegistry model).
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> NerEngine:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._pool_lock = Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        # Version (and reload count) of the model loaded by the workers of the pool
+        self._pool_version: tuple[str, int] | None = None
+        self.workers: int = settings.NER_ENGINE_WORKERS
+        self.chunk_size: int = settings.NER_ENGINE_CHUNK_SIZE
+        atexit.register(self.shutdown)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # The workers don't see the reloads of the model (NerModelRegistry), so the pool is recycled on a new version
+        registry = NerModelRegistry()
+        version = (registry.get_version(), registry.reload_count)
+        with self._pool_lock:
+            if self._pool is not None and version != self._pool_version:
+                logger.info(f"NER model version changed ({self._pool_version} => {version}). Recycling process pool")
+                self._shutdown_pool()
+            if self._pool is None:
+                logger.info(f"Starting NER process pool with {self.workers} workers")
+                context = multiprocessing.get_context(settings.NER_ENGINE_START_METHOD)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(settings.NER_MODEL_FOLDER, settings.NER_BATCH_SIZE, context.Barrier(self.workers)),
+                )
+                self._pool_version = version
+            return self._pool
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_version = None
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            self._shutdown_pool()
+
+    def warm_up(self) -> set[int]:
+        """
+        Starts all the workers of the pool, each one loading its model in the pool initializer. Returns their pids.
+        """
+        if self.workers <= 0:
+            return set()
+        try:
+            pool = self._get_pool()
+            # Each task waits for the others, so that no worker takes two of them and all the workers are started
+            pids = set(pool.map(_wait_for_workers, [settings.NER_ENGINE_WARM_UP_TIMEOUT] * self.workers))
+        except Exception as ex:
+            logger.error(f"Error warming up NER process pool: {ex}")
+            self.shutdown()
+            return set()
+        logger.info(f"NER process pool warmed up: {len(pids)} workers")
+        return pids
+
+    def extract(self, titles: list[str]) -> list[tuple[str | None, str | None, str | None, str | None]]:
+        if not titles:
+            return []
+        if self.workers <= 0 or settings.NER_SERVICE_URL:
+            return extract_names_from_titles_ner(titles)
+        start = timeit.default_timer()
+        chunks = [titles[i : i + self.chunk_size] for i in range(0, len(titles), self.chunk_size)]
+        try:
+            results = []
+            for chunk_results in self._get_pool().map(_extract_chunk, chunks):
+                results += chunk_results
+        except Exception as ex:
+            logger.error(f"Error running NER in process pool. Falling back to in-process NER: {ex}")
+            # The pool is recreated on the next call
+            self.shutdown()
+            return extract_names_from_titles_ner(titles)
+        end = timeit.default_timer()
+        logger.info(f"NER process pool: {len(titles)} titles in {len(chunks)} chunks | {(end - start):.2f} elapsed")
+        return results
@@ -0,0 +1,16 @@
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from ner.service import run_server
+
+
+class Command(BaseCommand):
+    help = "Runs the local NER service shared by the web and worker processes (see NER_SERVICE_URL)"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args: dict, **options: dict) -> None:
+        run_server(options["host"], options["port"])  # type: ignore
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import logging
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ner.utils import NerModelRegistry, extract_names_from_titles_ner_local
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the size of a request body, to protect the service from bogus clients
+MAX_REQUEST_BYTES = 5 * 1024 * 1024
+
+
+class NerRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the NER model of this process to other local processes.
+
+    POST /extract with {"titles": [...]} returns {"results": [[home, away, player, minute], ...], "version": ...}
+    GET /health returns the model registry metrics.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, content: dict) -> None:
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa N802
+        if self.path.rstrip("/") != "/health":
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(200, NerModelRegistry().get_metrics())
+
+    def do_POST(self) -> None:  # noqa N802
+        if self.path.rstrip("/") != "/extract":
+            self._send_json(404, {"error": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self._send_json(400, {"error": "Invalid request size"})
+            return
+        try:
+            titles = json.loads(self.rfile.read(length))["titles"]
+            if not isinstance(titles, list) or not all(isinstance(title, str) for title in titles):
+                raise ValueError("titles must be a list of strings")
+        except (ValueError, KeyError, TypeError) as ex:
+            self._send_json(400, {"error": f"Invalid request: {ex}"})
+            return
+        try:
+            start = timeit.default_timer()
+            results = extract_names_from_titles_ner_local(titles)
+            end = timeit.default_timer()
+        except Exception as ex:
+            logger.error(f"Error running NER for {len(titles)} titles: {ex}")
+            self._send_json(500, {"error": str(ex)})
+            return
+        logger.debug(f"NER service: {len(titles)} titles | {(end - start):.3f} elapsed")
+        self._send_json(200, {"results": results, "version": NerModelRegistry().version})
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa A002
+        logger.debug(f"NER service {self.address_string()} - {format % args}")
+
+
+def run_server(host: str, port: int) -> None:
+    NerModelRegistry().warm_up()
+    server = ThreadingHTTPServer((host, port), NerRequestHandler)
+    server.daemon_threads = True
+    logger.info(f"NER service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -1,6 +1,177 @@
-import spacy
+from __future__ import annotations
+
+import json
+import logging
+import os
+import resource
+import sys
+import timeit
+from threading import Lock
+from typing import TYPE_CHECKING
+
+import requests
 from django.conf import settings
-from spacy.tokens import Doc
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens import Doc
+
+logger = logging.getLogger(__name__)
+
+# Kept alive between calls to the NER service
+_service_session = requests.Session()
+
+
+class NerUnavailableError(Exception):
+    """
+    The NER service failed and the local model is not used instead (NER_SERVICE_LOCAL_FALLBACK), so there are no NER
+    results (as opposed to titles without entities).
+    """
+
+
+def _get_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Fallback for systems without procfs (peak RSS, in KB on Linux and bytes on macOS)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class NerModelRegistry:
+    """
+    Process-wide holder of the spaCy NER model.
+
+    The model is loaded once per process and shared by every thread. The model folder is checked for changes
+    at most every NER_MODEL_RELOAD_CHECK_SECONDS, and a changed model is loaded aside and swapped in atomically,
+    so that in-flight inferences keep using the previous instance.
+    """
+
+    __instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls) -> NerModelRegistry:
+        if cls.__instance is None:
+            with cls._instance_lock:
+                if cls.__instance is None:
+                    instance = super().__new__(cls)
+                    instance._init()
+                    cls.__instance = instance
+        return cls.__instance
+
+    def _init(self) -> None:
+        self._load_lock = Lock()
+        self._model: Language | None = None
+        self._model_folder: str = settings.NER_MODEL_FOLDER
+        self._fingerprint: float | None = None
+        self._version: str | None = None
+        self._last_check: float = 0.0
+        self._folder_version: tuple[float, str] | None = None
+        self._load_count = 0
+        # Reloads forced with reload() (even of the same model files)
+        self._reload_count = 0
+        self._load_seconds: float | None = None
+        self._load_memory_bytes: int | None = None
+
+    def _get_folder_fingerprint(self) -> float | None:
+        try:
+            mtimes = [os.stat(self._model_folder).st_mtime]
+            for entry in os.scandir(self._model_folder):
+                mtimes.append(entry.stat().st_mtime)
+            return max(mtimes)
+        except OSError as ex:
+            logger.error(f"Error reading NER model folder {self._model_folder}: {ex}")
+            return None
+
+    @staticmethod
+    def _build_version(meta: dict, fingerprint: float | None) -> str:
+        return f"{meta.get('name')}-{meta.get('version')}-{int(fingerprint or 0)}"
+
+    def _load(self, fingerprint: float | None) -> Language:
+        with self._load_lock:
+            if self._model is not None and fingerprint == self._fingerprint:
+                # Another thread already loaded this version while we were waiting
+                return self._model
+            # Only imported by the processes that load the model (not by the web processes with the NER service)
+            import spacy
+
+            rss_before = _get_rss_bytes()
+            start = timeit.default_timer()
+            model = spacy.load(self._model_folder)
+            end = timeit.default_timer()
+            self._load_seconds = end - start
+            self._load_memory_bytes = max(_get_rss_bytes() - rss_before, 0)
+            self._load_count += 1
+            self._version = self._build_version(model.meta, fingerprint)
+            self._fingerprint = fingerprint
+            self._model = model
+            logger.info(
+                f"NER model loaded [version: {self._version}] | "
+                f"{self._load_seconds:.2f}s | {self._load_memory_bytes / (1024 * 1024):.1f}MB | "
+                f"Load #{self._load_count}"
+            )
+            return model
+
+    def get_model(self) -> Language:
+        model = self._model
+        now = timeit.default_timer()
+        if model is not None and now - self._last_check < settings.NER_MODEL_RELOAD_CHECK_SECONDS:
+            return model
+        self._last_check = now
+        fingerprint = self._get_folder_fingerprint()
+        if model is not None and (fingerprint is None or fingerprint == self._fingerprint):
+            return model
+        if model is not None:
+            logger.info(f"NER model folder changed. Reloading... [{self._model_folder}]")
+        return self._load(fingerprint)
+
+    def reload(self) -> Language:
+        self._last_check = timeit.default_timer()
+        self._fingerprint = None
+        self._reload_count += 1
+        return self._load(self._get_folder_fingerprint())
+
+    def warm_up(self) -> None:
+        try:
+            self.get_model()
+        except Exception as ex:
+            logger.error(f"Error warming up NER model: {ex}")
+
+    @property
+    def version(self) -> str | None:
+        return self._version
+
+    @property
+    def reload_count(self) -> int:
+        return self._reload_count
+
+    def get_version(self) -> str:
+        """
+        Version of the current model, without loading it if it is not loaded in this process yet.
+        """
+        if self._model is not None:
+            self.get_model()
+            return self._version  # type: ignore
+        now = timeit.default_timer()
+        if self._folder_version is None or now - self._folder_version[0] >= settings.NER_MODEL_RELOAD_CHECK_SECONDS:
+            try:
+                with open(os.path.join(self._model_folder, "meta.json")) as meta_file:
+                    meta = json.load(meta_file)
+            except (OSError, ValueError) as ex:
+                logger.error(f"Error reading NER model meta: {ex}")
+                meta = {}
+            self._folder_version = (now, self._build_version(meta, self._get_folder_fingerprint()))
+        return self._folder_version[1]
+
+    def get_metrics(self) -> dict:
+        return {
+            "loaded": self._model is not None,
+            "version": self._version,
+            "load_count": self._load_count,
+            "load_seconds": self._load_seconds,
+            "load_memory_bytes": self._load_memory_bytes,
+        }
 
 
 def get_doc_result(doc: Doc) -> tuple[str | None, str | None, str | None, str | None]:
@@ -23,7 +194,51 @@ def get_doc_result(doc: Doc) -> tuple[str | None, str | None, str | None, str |
     return home_team, away_team, player, minute
 
 
+def get_ner_model_version() -> str:
+    # Also with the NER service, which serves the model of the same folder: read from the folder (without loading the
+    # model), so that it is known before the first response
+    return NerModelRegistry().get_version()
+
+
 def extract_names_from_title_ner(title: str) -> tuple[str | None, str | None, str | None, str | None]:
-    nlp_model = spacy.load(settings.NER_MODEL_FOLDER)
+    if settings.NER_SERVICE_URL:
+        return extract_names_from_titles_ner([title])[0]
+    nlp_model = NerModelRegistry().get_model()
     doc = nlp_model(title)
     return get_doc_result(doc)
+
+
+def extract_names_from_titles_ner(titles: list[str]) -> list[tuple[str | None, str | None, str | None, str | None]]:
+    if not titles:
+        return []
+    if settings.NER_SERVICE_URL:
+        try:
+            return _extract_names_from_titles_service(titles)
+        except Exception as ex:
+            if not settings.NER_SERVICE_LOCAL_FALLBACK:
+                # Without NER results (the titles are still parsed by the regex), instead of loading the model here
+                raise NerUnavailableError(f"Error calling NER service: {ex}") from ex
+            logger.error(f"Error calling NER service. Falling back to local model: {ex}")
+    return extract_names_from_titles_ner_local(titles)
+
+
+def extract_names_from_titles_ner_local(
+    titles: list[str],
+) -> list[tuple[str | None, str | None, str | None, str | None]]:
+    nlp_model = NerModelRegistry().get_model()
+    return [get_doc_result(doc) for doc in nlp_model.pipe(titles, batch_size=settings.NER_BATCH_SIZE)]
+
+
+def _extract_names_from_titles_service(
+    titles: list[str],
+) -> list[tuple[str | None, str | None, str | None, str | None]]:
+    response = _service_session.post(
+        settings.NER_SERVICE_URL.rstrip("/") + "/extract",
+        json={"titles": titles},
+        timeout=settings.NER_SERVICE_TIMEOUT,
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    if len(results) != len(titles):
+        raise ValueError(f"NER service returned {len(results)} results for {len(titles)} titles")
+    return [tuple(result) for result in results]  # type: ignore